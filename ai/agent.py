@@ -0,0 +1,355 @@
+"""
+Gemini + MCP tool loop shared by the assistant and app_mention listeners
+"""
+import asyncio
+import inspect
+import logging
+import os
+from logging import Logger
+from typing import Any, Callable, List, Optional, Tuple
+
+from google.genai import errors, types
+
+from ai.answer_cache import ANSWER_CACHE_ENABLED, answer_cache
+from ai.context_cache import context_cache, is_stale_cache_error
+from ai.conversation_store import CONVERSATION_STORE_ENABLED, conversation_store
+from ai.gemini_client import get_gemini_client
+from ai.history_compaction import HISTORY_COMPACTION_ENABLED, history_compactor
+from ai.tools import tool_cache
+
+GEMINI_MODEL = "gemini-2.5-flash"
+
+# Cap on tool calls from one model turn running at the same time
+MAX_CONCURRENT_TOOL_CALLS = int(os.environ.get("GEMINI_MAX_CONCURRENT_TOOL_CALLS", "4"))
+# Seconds before a single tool call is abandoned and reported to the model as an error
+TOOL_CALL_TIMEOUT = float(os.environ.get("GEMINI_TOOL_CALL_TIMEOUT", "30"))
+# Tool rounds allowed per turn before the model must answer with what it has
+MAX_TOOL_ROUNDS = int(os.environ.get("GEMINI_MAX_TOOL_ROUNDS", "5"))
+# Total tokens (prompt + output, summed over model calls) a turn may spend on tool rounds
+MAX_TURN_TOKENS = int(os.environ.get("GEMINI_MAX_TURN_TOKENS", "200000"))
+
+# Used for the final call once a budget runs out, tools stay declared but cannot be called
+_ANSWER_NOW = types.ToolConfig(function_calling_config=types.FunctionCallingConfig(mode="NONE"))
+
+logger = logging.getLogger(__name__)
+
+
+async def execute_function_calls(
+    function_calls: List[types.FunctionCall],
+    mcp_client,
+    logger: Logger,
+    max_concurrency: int = MAX_CONCURRENT_TOOL_CALLS,
+    timeout: float = TOOL_CALL_TIMEOUT,
+) -> List[types.Part]:
+    """
+    Run every function call from one model turn concurrently
+
+    Args:
+        function_calls: Function calls from a single candidate, in order
+        mcp_client: Connected MCPClient or pooled session lease
+        logger: Logger instance for error tracking
+        max_concurrency: Maximum tool calls in flight at once
+        timeout: Per-call timeout in seconds
+
+    Returns:
+        One function_response part per call, in the same order as the calls.
+        Failures and timeouts become error responses so the model can react.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def _call(fc: types.FunctionCall) -> types.Part:
+        async with semaphore:
+            try:
+                result = await asyncio.wait_for(mcp_client.call_tool(fc.name, fc.args), timeout=timeout)
+                response = {"result": result}
+            except asyncio.TimeoutError:
+                logger.warning(f"Tool {fc.name} timed out after {timeout}s")
+                response = {"error": f"Tool {fc.name} timed out after {timeout} seconds"}
+            except Exception as e:
+                logger.exception(f"Tool {fc.name} failed")
+                response = {"error": f"Tool error: {e}"}
+        return types.Part(function_response=types.FunctionResponse(id=fc.id, name=fc.name, response=response))
+
+    return list(await asyncio.gather(*(_call(fc) for fc in function_calls)))
+
+
+class TurnResult:
+    """Outcome of one user turn through the tool loop"""
+
+    def __init__(
+        self,
+        text: str,
+        contents: List[types.Content],
+        model_calls: int,
+        tool_rounds: int,
+        total_tokens: int,
+        tools_called: List[str],
+    ):
+        self.text = text
+        self.contents = contents
+        self.model_calls = model_calls
+        self.tool_rounds = tool_rounds
+        self.total_tokens = total_tokens
+        self.tools_called = tools_called
+
+
+async def _maybe_await(value: Any):
+    """Await the result of a callback that may be sync or async (e.g. ChatStream vs AsyncChatStream)"""
+    if inspect.isawaitable(value):
+        await value
+
+
+def _content_text(content: Optional[types.Content]) -> str:
+    """Join the answer text parts of a model content, skipping thoughts"""
+    if content is None or not content.parts:
+        return ""
+    return "".join(part.text for part in content.parts if part.text and not part.thought)
+
+
+async def _generate(
+    gemini_client,
+    config: types.GenerateContentConfig,
+    conversation: List[types.Content],
+    on_text: Optional[Callable[[str], Any]] = None,
+) -> Tuple[Optional[types.Content], int]:
+    """
+    Make one model call, streaming answer text to on_text as it arrives
+
+    Parts from every chunk are kept as-is (thought signatures included) so
+    the model content can be sent back verbatim. Function call parts are
+    picked up whichever chunk they arrive in.
+
+    Returns:
+        The model content (None if the model returned nothing) and the tokens used
+    """
+    parts: List[types.Part] = []
+
+    async def _request(request_config: types.GenerateContentConfig):
+        if on_text is None:
+            response = await gemini_client.aio.models.generate_content(
+                model=GEMINI_MODEL,
+                config=request_config,
+                contents=conversation,
+            )
+            if response.candidates and response.candidates[0].content:
+                parts.extend(response.candidates[0].content.parts or [])
+            return response.usage_metadata
+
+        usage = None
+        stream = await gemini_client.aio.models.generate_content_stream(
+            model=GEMINI_MODEL,
+            config=request_config,
+            contents=conversation,
+        )
+        async for chunk in stream:
+            # Usage is cumulative, the last chunk carries the total
+            if chunk.usage_metadata:
+                usage = chunk.usage_metadata
+            if not chunk.candidates or not chunk.candidates[0].content:
+                continue
+            for part in chunk.candidates[0].content.parts or []:
+                parts.append(part)
+                if part.text and not part.thought:
+                    await _maybe_await(on_text(part.text))
+        return usage
+
+    # Reference the cached system instruction + tools instead of resending them
+    request_config = await context_cache.apply_async(gemini_client, GEMINI_MODEL, config)
+    try:
+        usage = await _request(request_config)
+    except errors.APIError as e:
+        if request_config is config or parts or not is_stale_cache_error(e, request_config.cached_content):
+            raise
+        # Cached prefix expired or was evicted, resend it in full this time
+        logger.info(f"Cached content {request_config.cached_content} rejected ({e.code}), retrying uncached")
+        context_cache.invalidate(request_config.cached_content)
+        usage = await _request(config)
+
+    content = types.Content(role="model", parts=parts) if parts else None
+    tokens = usage.total_token_count if usage and usage.total_token_count else 0
+    return content, tokens
+
+
+async def run_tool_loop(
+    conversation: List[types.Content],
+    config: types.GenerateContentConfig,
+    mcp_client,
+    logger: Logger,
+    gemini_client=None,
+    max_rounds: int = MAX_TOOL_ROUNDS,
+    max_tokens: int = MAX_TURN_TOKENS,
+    on_text: Optional[Callable[[str], Any]] = None,
+) -> TurnResult:
+    """
+    Multi-turn function calling with exactly one model call per round
+
+    Each round makes one generate_content call. If the model asks for tools,
+    its content and one content with all function responses are appended and
+    the next round starts. Once max_rounds tool rounds have run or max_tokens
+    is spent, the next call has function calling disabled so the model answers.
+
+    Args:
+        conversation: History plus the new user content, extended in place
+        config: Generation config with the MCP tool declarations
+        mcp_client: Connected MCPClient or pooled session lease
+        logger: Logger instance for error tracking
+        gemini_client: Client with aio.models.generate_content, defaults to the shared one
+        max_rounds: Maximum tool rounds before forcing an answer
+        max_tokens: Token budget for the turn before forcing an answer
+        on_text: Receives answer text deltas as they stream in, sync or async. When given
+            every round uses generate_content_stream
+
+    Returns:
+        TurnResult with the answer text and the accumulated contents
+    """
+    gemini_client = gemini_client or get_gemini_client()
+    model_calls = 0
+    tool_rounds = 0
+    total_tokens = 0
+    tools_called: List[str] = []
+    streamed_any = False
+    round_started = True
+
+    def _forward(text: str):
+        # Keep text from separate rounds ("Let me look that up" then the answer) in separate paragraphs
+        nonlocal streamed_any, round_started
+        if round_started and streamed_any:
+            text = "\n\n" + text
+        round_started = False
+        streamed_any = True
+        return on_text(text)
+
+    while True:
+        out_of_budget = tool_rounds >= max_rounds or total_tokens >= max_tokens
+        round_config = config.model_copy(update={"tool_config": _ANSWER_NOW}) if out_of_budget else config
+
+        round_started = True
+        model_content, tokens = await _generate(gemini_client, round_config, conversation, _forward if on_text else None)
+        model_calls += 1
+        total_tokens += tokens
+
+        if model_content is not None:
+            conversation.append(model_content)
+
+        parts = model_content.parts if model_content and model_content.parts else []
+        function_calls = [part.function_call for part in parts if part.function_call]
+
+        # If model didn't request any tool, we're done
+        if not function_calls or out_of_budget:
+            if function_calls:
+                logger.warning("Model still requested tools after its budget ran out, ignoring them")
+            return TurnResult(
+                _content_text(model_content), conversation, model_calls, tool_rounds, total_tokens, tools_called
+            )
+
+        # Run this round's tool calls together and answer them in one follow-up content
+        tools_called.extend(fc.name for fc in function_calls)
+        tool_parts = await execute_function_calls(function_calls, mcp_client, logger)
+        conversation.append(types.Content(role="user", parts=tool_parts))
+        tool_rounds += 1
+
+
+def _prior_contents(
+    store_key: Optional[str],
+    history: List[types.Content],
+    history_since: Optional[Callable[[str], List[types.Content]]],
+) -> List[types.Content]:
+    """The thread's stored conversation caught up with newer Slack messages, or the Slack history"""
+    # Resume the thread's own conversation so earlier tool results can be reused
+    stored = conversation_store.get(store_key) if store_key else None
+    if stored is None:
+        return history
+    if history_since is not None:
+        # Messages posted by people between bot turns are only in Slack
+        last_ts = conversation_store.last_ts(store_key)
+        if last_ts:
+            stored.extend(history_since(last_ts))
+    return stored
+
+
+async def run_gemini_with_tools(
+    user_query: str,
+    history: List[types.Content],
+    mcp_client,
+    streamer,
+    logger: Logger,
+    conversation_key: Optional[str] = None,
+    message_ts: Optional[str] = None,
+    history_since: Optional[Callable[[str], List[types.Content]]] = None,
+) -> Optional[str]:
+    """
+    Answer a user query with Gemini, calling MCP tools as the model requests them
+
+    Args:
+        user_query: Latest user message
+        history: Earlier thread messages as Gemini contents
+        mcp_client: Connected MCPClient or pooled session lease
+        streamer: Slack ChatStream or AsyncChatStream the answer is appended to
+        logger: Logger instance for error tracking
+        conversation_key: Thread the turn belongs to, e.g. "channel:thread_ts". When given the
+            thread's stored conversation, tool calls and results included, is resumed instead
+            of history and the finished turn is stored back.
+        message_ts: ts of the message being answered, stored with the conversation
+        history_since: Returns the user messages of the thread posted after a ts, used to
+            add what others said since the stored conversation's last turn
+
+    Returns:
+        The answer text streamed to Slack, or None if the turn failed
+    """
+    try:
+        store_key = conversation_key if CONVERSATION_STORE_ENABLED else None
+        question = types.Content(role="user", parts=[types.Part(text=user_query)])
+
+        # Repeated read-only questions are answered without Gemini or Salesforce
+        cache_key = answer_cache.key(user_query, history) if ANSWER_CACHE_ENABLED else None
+        cached_answer = answer_cache.get(cache_key) if cache_key else None
+        if cached_answer is not None:
+            logger.debug(f"Answer cache hit: {answer_cache.stats()}")
+            await _maybe_await(streamer.append(markdown_text=cached_answer))
+            if store_key:
+                answer = types.Content(role="model", parts=[types.Part(text=cached_answer)])
+                prior = _prior_contents(store_key, history, history_since)
+                conversation_store.put(store_key, prior + [question, answer], message_ts)
+            return cached_answer
+
+        prior = _prior_contents(store_key, history, history_since)
+        # Older turns beyond the model's token budget are folded into the thread's rolling summary
+        if HISTORY_COMPACTION_ENABLED:
+            compacted = await history_compactor.compact(conversation_key, prior, GEMINI_MODEL, get_gemini_client())
+        else:
+            compacted = prior
+
+        # Track conversation state
+        conversation: List[types.Content] = []
+        conversation.extend(compacted)
+        conversation.append(question)
+
+        # Load MCP tools (cached per server until the tool list changes)
+        config = await tool_cache.get_config(mcp_client)
+
+        # Answer text goes to Slack as it streams in
+        result = await run_tool_loop(
+            conversation,
+            config,
+            mcp_client,
+            logger,
+            on_text=lambda text: streamer.append(markdown_text=text),
+        )
+        logger.debug(
+            f"Turn finished: {result.model_calls} model calls, {result.tool_rounds} tool rounds, "
+            f"{result.total_tokens} tokens"
+        )
+        if cache_key:
+            answer_cache.put(cache_key, result.text, result.tools_called)
+            logger.debug(f"Answer cache miss: {answer_cache.stats()}")
+        if store_key:
+            # The full conversation is stored, the summary only stands in for it in requests
+            conversation_store.put(store_key, prior + result.contents[len(compacted):], message_ts)
+        return result.text
+
+    except Exception as e:
+        logger.exception("Error in Gemini + MCP tool loop")
+        await _maybe_await(streamer.append(
+            markdown_text=f":warning: Something went wrong: {e}"
+        ))
+        return None
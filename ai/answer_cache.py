@@ -0,0 +1,119 @@
+"""
+Exact-match cache of final answers for repeated read-only questions
+Keyed on the normalized query, the earlier thread messages and a Salesforce
+data-version stamp that moves whenever a turn calls a mutating tool.
+
+The data version is per process. Bot workers sharing one MCP server
+(MCP_TRANSPORT=http) would not see each other's writes, so the cache is off
+by default in that mode.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+# A write through another worker cannot invalidate this worker's answers
+_SHARED_SERVER = os.environ.get("MCP_TRANSPORT") == "http"
+ANSWER_CACHE_ENABLED = os.environ.get(
+    "ANSWER_CACHE_ENABLED", "0" if _SHARED_SERVER else "1"
+).lower() not in ("0", "false", "no")
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", "300"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "512"))
+
+# Tools that change Salesforce data, a turn calling any of them is never cached
+MUTATING_TOOLS = {
+    "create_account", "update_account", "delete_account",
+    "create_accounts", "update_accounts", "delete_accounts",
+}
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.rstrip("?!. ")
+
+
+def _history_digest(history: List[types.Content]) -> str:
+    digest = hashlib.sha256()
+    for content in history:
+        digest.update((content.role or "").encode())
+        for part in content.parts or []:
+            if part.text:
+                digest.update(part.text.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class AnswerCache:
+    """LRU + TTL cache of answer text"""
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_MAX_ENTRIES, ttl: float = ANSWER_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Bumped on every mutating tool call, part of every key
+        self.data_version = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    def key(self, user_query: str, history: List[types.Content]) -> str:
+        raw = f"{self.data_version}\0{_history_digest(history)}\0{normalize_query(user_query)}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, answer: str, tools_called: Iterable[str]):
+        """Store an answer unless the turn wrote to Salesforce, which invalidates everything"""
+        if MUTATING_TOOLS.intersection(tools_called):
+            self.invalidate()
+            with self._lock:
+                self.bypasses += 1
+            return
+        if not answer:
+            return
+        with self._lock:
+            self._entries[key] = (answer, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Move to a new data version, every existing entry becomes unreachable"""
+        with self._lock:
+            self.data_version += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "data_version": self.data_version,
+            }
+
+
+answer_cache = AnswerCache()
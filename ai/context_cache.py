@@ -0,0 +1,205 @@
+"""
+Explicit Gemini context caching for the static request prefix
+The system instruction and tool declarations are the same on every call, so
+they are stored once as cached content and requests reference it by name.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from google.genai import errors, types
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_CACHE_ENABLED = os.environ.get("GEMINI_CONTEXT_CACHE", "1").lower() not in ("0", "false", "no")
+# Lifetime requested for cached content, renewed while in use
+CONTEXT_CACHE_TTL = int(os.environ.get("GEMINI_CONTEXT_CACHE_TTL", "3600"))
+# Renew the TTL when less than this many seconds are left
+CONTEXT_CACHE_RENEW_MARGIN = int(os.environ.get("GEMINI_CONTEXT_CACHE_RENEW_MARGIN", "300"))
+
+# Errors that mean a cache name is no longer usable (expired, deleted, wrong model)
+STALE_CACHE_CODES = {400, 403, 404}
+
+
+def is_stale_cache_error(error: errors.APIError, name: str) -> bool:
+    """Whether a request referencing cached content name failed because of that cache
+
+    Other errors with the same codes (a malformed tool schema, oversized contents)
+    would fail the same way uncached and are not retried.
+    """
+    if error.code not in STALE_CACHE_CODES:
+        return False
+    text = f"{error.message or ''} {error.details or ''}".lower()
+    compact = text.replace(" ", "").replace("_", "")
+    # Gemini names the cache by id or says "cached content" / "cache content"
+    return name.rsplit("/", 1)[-1].lower() in text or "cachedcontent" in compact or "cachecontent" in compact
+
+
+class _Entry:
+    def __init__(self, name: Optional[str], expires_at: float):
+        # name is None for prefixes Gemini refused to cache (e.g. below the minimum size)
+        self.name = name
+        self.expires_at = expires_at
+
+
+def _prefix_key(model: str, config: types.GenerateContentConfig) -> Tuple[str, str]:
+    payload = config.model_dump_json(include={"system_instruction", "tools"}, exclude_none=True)
+    return model, hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ContextCache:
+    """Cached content per (model, system instruction + tools)"""
+
+    def __init__(self, ttl: int = CONTEXT_CACHE_TTL, renew_margin: int = CONTEXT_CACHE_RENEW_MARGIN):
+        self.ttl = ttl
+        self.renew_margin = renew_margin
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._lock = threading.Lock()
+
+    def apply(self, gemini_client, model: str, config: types.GenerateContentConfig) -> types.GenerateContentConfig:
+        """
+        Swap the static prefix of a config for a cached content reference
+
+        Configs with a tool_config are returned unchanged, cached content cannot
+        be combined with a per-request tool_config. Any failure to create or
+        renew the cache also falls back to the uncached config.
+
+        Args:
+            gemini_client: Client used to create and renew cached content
+            model: Model the requests go to, cached content is per model
+            config: Full config with system_instruction and tools
+
+        Returns:
+            Config referencing cached content, or the original config
+        """
+        if not self._cacheable(config):
+            return config
+
+        key = _prefix_key(model, config)
+        # One thread creates or renews a given prefix at a time
+        with self._lock:
+            entry = self._entries.get(key)
+            if self._needs_create(entry):
+                entry = self._create(gemini_client, model, config)
+                self._entries[key] = entry
+            elif self._needs_renew(entry):
+                entry = self._renew(gemini_client, model, config, entry)
+                self._entries[key] = entry
+        return self._with_entry(config, entry)
+
+    async def apply_async(
+        self, gemini_client, model: str, config: types.GenerateContentConfig
+    ) -> types.GenerateContentConfig:
+        """
+        Same as apply, creating and renewing through gemini_client.aio
+
+        The lock is not held across the API call, so two loops racing on a new
+        prefix may both create one. The loser's cache simply expires.
+        """
+        if not self._cacheable(config):
+            return config
+
+        key = _prefix_key(model, config)
+        with self._lock:
+            entry = self._entries.get(key)
+        if self._needs_create(entry):
+            entry = await self._create_async(gemini_client, model, config)
+        elif self._needs_renew(entry):
+            entry = await self._renew_async(gemini_client, model, config, entry)
+        else:
+            return self._with_entry(config, entry)
+        with self._lock:
+            self._entries[key] = entry
+        return self._with_entry(config, entry)
+
+    def invalidate(self, name: str):
+        """Forget a cached content that the API no longer accepts"""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.name == name]:
+                del self._entries[key]
+
+    @staticmethod
+    def _cacheable(config: types.GenerateContentConfig) -> bool:
+        if not CONTEXT_CACHE_ENABLED or config.cached_content or config.tool_config:
+            return False
+        return bool(config.system_instruction or config.tools)
+
+    @staticmethod
+    def _needs_create(entry: Optional[_Entry]) -> bool:
+        return entry is None or entry.expires_at <= time.time()
+
+    def _needs_renew(self, entry: _Entry) -> bool:
+        return bool(entry.name) and entry.expires_at - time.time() < self.renew_margin
+
+    @staticmethod
+    def _with_entry(config: types.GenerateContentConfig, entry: _Entry) -> types.GenerateContentConfig:
+        if entry.name is None:
+            return config
+        return config.model_copy(
+            update={"cached_content": entry.name, "system_instruction": None, "tools": None}
+        )
+
+    def _create_config(self, config: types.GenerateContentConfig) -> types.CreateCachedContentConfig:
+        return types.CreateCachedContentConfig(
+            display_name="slack-salesforce-bot-prefix",
+            system_instruction=config.system_instruction,
+            tools=config.tools,
+            ttl=f"{self.ttl}s",
+        )
+
+    def _created(self, model: str, cached: Optional[types.CachedContent], error: Optional[Exception]) -> _Entry:
+        if error is not None:
+            # Don't retry every call, try again after one TTL
+            logger.warning(f"Gemini context cache unavailable for {model}, sending the full prefix: {error}")
+            return _Entry(None, time.time() + self.ttl)
+        logger.info(f"Created Gemini cached content {cached.name} for {model}")
+        return _Entry(cached.name, self._expiry(cached))
+
+    def _create(self, gemini_client, model: str, config: types.GenerateContentConfig) -> _Entry:
+        try:
+            cached = gemini_client.caches.create(model=model, config=self._create_config(config))
+        except errors.APIError as e:
+            return self._created(model, None, e)
+        return self._created(model, cached, None)
+
+    async def _create_async(self, gemini_client, model: str, config: types.GenerateContentConfig) -> _Entry:
+        try:
+            cached = await gemini_client.aio.caches.create(model=model, config=self._create_config(config))
+        except errors.APIError as e:
+            return self._created(model, None, e)
+        return self._created(model, cached, None)
+
+    def _renew(self, gemini_client, model: str, config: types.GenerateContentConfig, entry: _Entry) -> _Entry:
+        try:
+            cached = gemini_client.caches.update(
+                name=entry.name,
+                config=types.UpdateCachedContentConfig(ttl=f"{self.ttl}s"),
+            )
+        except errors.APIError as e:
+            logger.info(f"Could not renew cached content {entry.name}, recreating: {e}")
+            return self._create(gemini_client, model, config)
+        return _Entry(cached.name or entry.name, self._expiry(cached))
+
+    async def _renew_async(
+        self, gemini_client, model: str, config: types.GenerateContentConfig, entry: _Entry
+    ) -> _Entry:
+        try:
+            cached = await gemini_client.aio.caches.update(
+                name=entry.name,
+                config=types.UpdateCachedContentConfig(ttl=f"{self.ttl}s"),
+            )
+        except errors.APIError as e:
+            logger.info(f"Could not renew cached content {entry.name}, recreating: {e}")
+            return await self._create_async(gemini_client, model, config)
+        return _Entry(cached.name or entry.name, self._expiry(cached))
+
+    def _expiry(self, cached: types.CachedContent) -> float:
+        if cached.expire_time is not None:
+            return cached.expire_time.timestamp()
+        return time.time() + self.ttl
+
+
+context_cache = ContextCache()
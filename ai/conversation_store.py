@@ -0,0 +1,142 @@
+"""
+Per-thread Gemini conversation state
+Keeps the full contents of each Slack thread's conversation, including
+function calls and tool results, so follow-up turns resume with the data
+already fetched instead of only the Slack message text.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+CONVERSATION_STORE_ENABLED = os.environ.get("CONVERSATION_STORE_ENABLED", "1").lower() not in ("0", "false", "no")
+# SQLite file to persist conversations across restarts, memory only when unset
+CONVERSATION_STORE_PATH = os.environ.get("CONVERSATION_STORE_PATH")
+# Threads kept by the in-memory store
+CONVERSATION_STORE_MAX_THREADS = int(os.environ.get("CONVERSATION_STORE_MAX_THREADS", "500"))
+# Seconds a conversation is kept after its last turn
+CONVERSATION_STORE_TTL = float(os.environ.get("CONVERSATION_STORE_TTL", "86400"))
+
+
+def dump_contents(contents: List[types.Content]) -> str:
+    """Serialize contents to JSON, bytes such as thought signatures become base64"""
+    return json.dumps([content.model_dump(mode="json", exclude_none=True) for content in contents])
+
+
+def load_contents(payload: str) -> List[types.Content]:
+    return [types.Content.model_validate(item) for item in json.loads(payload)]
+
+
+class InMemoryConversationStore:
+    """LRU + TTL of conversations"""
+
+    def __init__(self, max_threads: int = CONVERSATION_STORE_MAX_THREADS, ttl: float = CONVERSATION_STORE_TTL):
+        self.max_threads = max_threads
+        self.ttl = ttl
+        self._conversations: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[List[types.Content]]:
+        with self._lock:
+            entry = self._conversations.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._conversations[key]
+                return None
+            self._conversations.move_to_end(key)
+            return list(entry[0])
+
+    def last_ts(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._conversations.get(key)
+            return entry[2] if entry is not None else None
+
+    def put(self, key: str, contents: List[types.Content], last_ts: Optional[str] = None):
+        with self._lock:
+            self._conversations[key] = (list(contents), time.monotonic() + self.ttl, last_ts)
+            self._conversations.move_to_end(key)
+            while len(self._conversations) > self.max_threads:
+                self._conversations.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conversations.pop(key, None)
+
+
+class SQLiteConversationStore:
+    """Conversations in a SQLite file, shared by restarts and by processes on one host"""
+
+    def __init__(self, path: str, ttl: float = CONVERSATION_STORE_TTL):
+        """
+        Args:
+            path: SQLite database file, created if missing
+            ttl: Seconds a conversation is kept after its last turn
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "key TEXT PRIMARY KEY, contents TEXT NOT NULL, updated_at REAL NOT NULL, last_ts TEXT)"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(conversations)")}
+            if "last_ts" not in columns:
+                # Files written before last_ts was tracked
+                self._db.execute("ALTER TABLE conversations ADD COLUMN last_ts TEXT")
+
+    def get(self, key: str) -> Optional[List[types.Content]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT contents, updated_at FROM conversations WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] + self.ttl < time.time():
+            return None
+        try:
+            return load_contents(row[0])
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Dropping unreadable conversation {key}: {e}")
+            self.delete(key)
+            return None
+
+    def last_ts(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT last_ts FROM conversations WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def put(self, key: str, contents: List[types.Content], last_ts: Optional[str] = None):
+        payload = dump_contents(contents)
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO conversations (key, contents, updated_at, last_ts) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET contents = excluded.contents, updated_at = excluded.updated_at, "
+                "last_ts = excluded.last_ts",
+                (key, payload, now, last_ts),
+            )
+            # Expired conversations are pruned as new ones are written
+            self._db.execute("DELETE FROM conversations WHERE updated_at < ?", (now - self.ttl,))
+
+    def delete(self, key: str):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM conversations WHERE key = ?", (key,))
+
+
+def _create_store():
+    if CONVERSATION_STORE_PATH:
+        logger.info(f"Persisting Gemini conversations to {CONVERSATION_STORE_PATH}")
+        return SQLiteConversationStore(CONVERSATION_STORE_PATH)
+    return InMemoryConversationStore()
+
+
+conversation_store = _create_store()
@@ -0,0 +1,69 @@
+"""
+Shared Gemini client
+Created lazily on first use and reused so HTTP connections stay pooled. The
+async transport is bound to the event loop that first uses it, so there is
+one client per running loop plus one for synchronous callers.
+"""
+import asyncio
+import os
+import threading
+import weakref
+from typing import Optional
+
+import httpx
+from google import genai
+from google.genai import types
+
+GEMINI_MAX_CONNECTIONS = int(os.environ.get("GEMINI_MAX_CONNECTIONS", "20"))
+GEMINI_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("GEMINI_MAX_KEEPALIVE_CONNECTIONS", "10"))
+GEMINI_KEEPALIVE_EXPIRY = float(os.environ.get("GEMINI_KEEPALIVE_EXPIRY", "60"))
+
+_lock = threading.Lock()
+_sync_client: Optional[genai.Client] = None
+_loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, genai.Client]" = weakref.WeakKeyDictionary()
+
+
+def _new_client() -> genai.Client:
+    limits = httpx.Limits(
+        max_connections=GEMINI_MAX_CONNECTIONS,
+        max_keepalive_connections=GEMINI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=GEMINI_KEEPALIVE_EXPIRY,
+    )
+    return genai.Client(
+        api_key=os.environ.get("GOOGLE_API_KEY"),
+        http_options=types.HttpOptions(
+            client_args={"limits": limits},
+            async_client_args={"limits": limits},
+        ),
+    )
+
+
+def get_gemini_client() -> genai.Client:
+    """Get the shared Gemini client for the running event loop
+
+    Use client.aio inside coroutines and the sync surface elsewhere.
+    """
+    global _sync_client
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    with _lock:
+        if loop is None:
+            if _sync_client is None:
+                _sync_client = _new_client()
+            return _sync_client
+        client = _loop_clients.get(loop)
+        if client is None:
+            client = _new_client()
+            _loop_clients[loop] = client
+        return client
+
+
+async def aclose_gemini_client():
+    """Close the running loop's client and its pooled connections"""
+    with _lock:
+        client = _loop_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aio.aclose()
@@ -0,0 +1,273 @@
+"""
+Token-budgeted history for agent turns
+Keeps the most recent turns of a thread verbatim within a per-model token
+budget and folds older turns into a summary that is extended incrementally
+and kept per thread, so long threads stop inflating every model call.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+HISTORY_COMPACTION_ENABLED = os.environ.get("HISTORY_COMPACTION_ENABLED", "1").lower() not in ("0", "false", "no")
+# Estimated tokens of earlier history sent with each turn, for models without their own budget
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", "16000"))
+# Per-model budgets, e.g. "gemini-2.5-flash=16000,gemini-2.0-flash-exp=8000"
+HISTORY_TOKEN_BUDGETS = os.environ.get("HISTORY_TOKEN_BUDGETS", "")
+# Longest summary the model may write, reserved out of the budget
+HISTORY_SUMMARY_MAX_TOKENS = int(os.environ.get("HISTORY_SUMMARY_MAX_TOKENS", "1024"))
+# Model writing the summaries, defaults to the model answering the turn
+HISTORY_SUMMARY_MODEL = os.environ.get("HISTORY_SUMMARY_MODEL")
+# Threads whose summary is kept in memory
+HISTORY_SUMMARY_MAX_THREADS = int(os.environ.get("HISTORY_SUMMARY_MAX_THREADS", "500"))
+
+# Rough characters per token for English text and JSON, avoids a count_tokens call per turn
+CHARS_PER_TOKEN = 4
+# Longest tool result quoted to the summarizer
+_MAX_TOOL_RESULT_CHARS = 4000
+
+SUMMARY_PREFIX = "Summary of the earlier conversation in this thread:\n"
+
+SUMMARY_INSTRUCTION = """
+You maintain a running summary of a Slack conversation between a user and a Salesforce assistant.
+Merge the new messages into the existing summary and return only the updated summary.
+Keep every fact a follow-up question could need: record names and Ids, figures, filters,
+decisions and open questions. Drop greetings and repetition. Write plain sentences or bullets.
+"""
+
+
+def _parse_budgets(raw: str) -> Dict[str, int]:
+    budgets = {}
+    for item in raw.split(","):
+        model, _, tokens = item.partition("=")
+        if model.strip() and tokens.strip():
+            budgets[model.strip()] = int(tokens)
+    return budgets
+
+
+_BUDGETS = _parse_budgets(HISTORY_TOKEN_BUDGETS)
+
+
+def history_budget(model: str) -> int:
+    """Token budget for the earlier history of a turn answered by model"""
+    return _BUDGETS.get(model, HISTORY_TOKEN_BUDGET)
+
+
+def _part_chars(part: types.Part) -> int:
+    if part.text:
+        return len(part.text)
+    if part.function_call:
+        return len(part.function_call.name or "") + len(json.dumps(part.function_call.args or {}, default=str))
+    if part.function_response:
+        return len(part.function_response.name or "") + len(json.dumps(part.function_response.response or {}, default=str))
+    return 0
+
+
+def estimate_tokens(contents: List[types.Content]) -> int:
+    """Approximate token count of contents, text and tool payloads included"""
+    chars = sum(_part_chars(part) for content in contents for part in content.parts or [])
+    return chars // CHARS_PER_TOKEN + len(contents)
+
+
+def _starts_turn(content: types.Content) -> bool:
+    """A user message, as opposed to the function responses sent back for a tool round"""
+    return content.role == "user" and any(part.text for part in content.parts or [])
+
+
+def split_turns(contents: List[types.Content]) -> List[List[types.Content]]:
+    """Group contents into turns so a function call is never separated from its response"""
+    turns: List[List[types.Content]] = []
+    for content in contents:
+        if not turns or _starts_turn(content):
+            turns.append([])
+        turns[-1].append(content)
+    return turns
+
+
+def _fingerprint(content: types.Content) -> str:
+    return hashlib.sha256(content.model_dump_json(exclude_none=True).encode()).hexdigest()
+
+
+def _transcript(contents: List[types.Content]) -> str:
+    """Render contents as plain text for the summarizer"""
+    lines = []
+    for content in contents:
+        speaker = "Assistant" if content.role == "model" else "User"
+        for part in content.parts or []:
+            if part.thought:
+                continue
+            if part.text:
+                lines.append(f"{speaker}: {part.text}")
+            elif part.function_call:
+                lines.append(f"Tool call {part.function_call.name}: {json.dumps(part.function_call.args or {}, default=str)}")
+            elif part.function_response:
+                result = json.dumps(part.function_response.response or {}, default=str)
+                if len(result) > _MAX_TOOL_RESULT_CHARS:
+                    result = result[:_MAX_TOOL_RESULT_CHARS] + " ...(truncated)"
+                lines.append(f"Tool result {part.function_response.name}: {result}")
+    return "\n".join(lines)
+
+
+class _Summary:
+    def __init__(self, text: str, folded: int, last_fingerprint: str):
+        self.text = text
+        # Leading contents of the thread's history covered by text
+        self.folded = folded
+        # Fingerprint of the last folded content, to tell the history still starts the same way
+        self.last_fingerprint = last_fingerprint
+
+
+class HistoryCompactor:
+    """Rolling per-thread summaries of history that no longer fits the budget"""
+
+    def __init__(
+        self,
+        max_threads: int = HISTORY_SUMMARY_MAX_THREADS,
+        summary_max_tokens: int = HISTORY_SUMMARY_MAX_TOKENS,
+        summary_model: Optional[str] = HISTORY_SUMMARY_MODEL,
+    ):
+        """
+        Args:
+            max_threads: Threads whose summary is kept (HISTORY_SUMMARY_MAX_THREADS, default 500)
+            summary_max_tokens: Longest summary, reserved out of the budget (HISTORY_SUMMARY_MAX_TOKENS, default 1024)
+            summary_model: Model writing summaries, None to use the turn's model
+        """
+        self.max_threads = max_threads
+        self.summary_max_tokens = summary_max_tokens
+        self.summary_model = summary_model
+        self._summaries: "OrderedDict[str, _Summary]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.summarized = 0
+
+    async def compact(
+        self,
+        thread_key: Optional[str],
+        history: List[types.Content],
+        model: str,
+        gemini_client,
+        budget: Optional[int] = None,
+    ) -> List[types.Content]:
+        """
+        Fit the earlier history of a turn into the model's token budget
+
+        Whole turns are kept verbatim from the newest backwards while they fit
+        (the newest turn always is). Everything older is covered by the thread's
+        summary, which only has to take in the turns that fell out of the window
+        since it was last written.
+
+        Args:
+            thread_key: Thread the history belongs to, e.g. "channel:thread_ts", None to not keep a summary
+            history: Earlier contents of the thread, oldest first
+            model: Model answering the turn, selects the budget
+            gemini_client: Client with aio.models.generate_content for writing summaries
+            budget: Token budget, defaults to history_budget(model)
+
+        Returns:
+            history unchanged if it fits, otherwise a summary content followed by the recent turns
+        """
+        budget = history_budget(model) if budget is None else budget
+        summary = self._get(thread_key, history)
+        folded = summary.folded if summary else 0
+
+        if folded == 0 and estimate_tokens(history) <= budget:
+            return history
+
+        # Newest turns first, until the budget left after the summary runs out
+        turns = split_turns(history[folded:])
+        keep = 0
+        kept_tokens = 0
+        for turn in reversed(turns):
+            tokens = estimate_tokens(turn)
+            if keep and kept_tokens + tokens > budget - self.summary_max_tokens:
+                break
+            keep += 1
+            kept_tokens += tokens
+        to_fold = [content for turn in turns[:len(turns) - keep] for content in turn]
+
+        if to_fold:
+            try:
+                text = await self._summarize(gemini_client, self.summary_model or model, summary, to_fold)
+            except Exception:
+                # Better a long prompt than a turn that fails
+                logger.exception(f"Could not summarize history of {thread_key}, sending it in full")
+                return history
+            folded += len(to_fold)
+            summary = _Summary(text, folded, _fingerprint(history[folded - 1]))
+            self._put(thread_key, summary)
+            logger.info(
+                f"Folded {len(to_fold)} contents of {thread_key} into its summary, "
+                f"{len(history) - folded} kept verbatim (~{kept_tokens} tokens)"
+            )
+
+        if summary is None:
+            # A single turn over the budget, nothing older to fold
+            return history
+        return [types.Content(role="user", parts=[types.Part(text=SUMMARY_PREFIX + summary.text)])] + history[folded:]
+
+    def invalidate(self, thread_key: str):
+        with self._lock:
+            self._summaries.pop(thread_key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"threads": len(self._summaries), "summarized": self.summarized}
+
+    def _get(self, thread_key: Optional[str], history: List[types.Content]) -> Optional[_Summary]:
+        """The thread's summary if it still describes the start of history"""
+        if thread_key is None:
+            return None
+        with self._lock:
+            summary = self._summaries.get(thread_key)
+            if summary is None:
+                return None
+            self._summaries.move_to_end(thread_key)
+        if summary.folded > len(history) or _fingerprint(history[summary.folded - 1]) != summary.last_fingerprint:
+            # History was rebuilt differently (e.g. older Slack messages trimmed), start over
+            self.invalidate(thread_key)
+            return None
+        return summary
+
+    def _put(self, thread_key: Optional[str], summary: _Summary):
+        if thread_key is None:
+            return
+        with self._lock:
+            self._summaries[thread_key] = summary
+            self._summaries.move_to_end(thread_key)
+            while len(self._summaries) > self.max_threads:
+                self._summaries.popitem(last=False)
+
+    async def _summarize(
+        self,
+        gemini_client,
+        model: str,
+        previous: Optional[_Summary],
+        contents: List[types.Content],
+    ) -> str:
+        prompt = (
+            f"Existing summary:\n{previous.text if previous else '(none)'}\n\n"
+            f"New messages:\n{_transcript(contents)}"
+        )
+        response = await gemini_client.aio.models.generate_content(
+            model=model,
+            config=types.GenerateContentConfig(
+                system_instruction=SUMMARY_INSTRUCTION,
+                max_output_tokens=self.summary_max_tokens,
+                thinking_config=types.ThinkingConfig(thinking_budget=0),
+            ),
+            contents=[types.Content(role="user", parts=[types.Part(text=prompt)])],
+        )
+        text = (response.text or "").strip()
+        if not text:
+            raise ValueError("Empty summary")
+        self.summarized += 1
+        return text
+
+
+history_compactor = HistoryCompactor()
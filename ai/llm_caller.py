@@ -1,11 +1,15 @@
-import os
 from typing import Dict, List, Iterator, Any
 
-from google import genai
+from google.genai import types
 from dotenv import load_dotenv
 
+from ai.context_cache import context_cache
+from ai.gemini_client import get_gemini_client
+
 load_dotenv()
 
+LLM_MODEL = "gemini-2.0-flash-exp"
+
 DEFAULT_SYSTEM_CONTENT = """
 You're an assistant in a Slack workspace.
 Users in the workspace will ask you to help them write something or to think better about a specific topic.
@@ -25,33 +29,24 @@ def call_llm(
     
     Args:
         messages_in_thread: List of message dicts with 'role' and 'content' keys
-        system_content: System prompt to prepend to the conversation
+        system_content: System prompt, sent as the system instruction
+        tools: Optional Gemini tool declarations
     
     Returns:
-        Iterator of GenerateContentResponse objects for streaming
+        Iterator of GenerateContentResponse objects, each yielded as soon as it arrives
     """
     # Convert OpenAI-style messages to Gemini format
     # Gemini uses dict format: {'role': 'user'|'model', 'parts': [{'text': '...'}]}
+    # The system prompt goes in system_instruction so it can be served from context cache
     gemini_contents = []
     
-    # Add system content as the first user/model exchange
-    if system_content:
-        gemini_contents.append({
-            'role': 'user',
-            'parts': [{'text': system_content}]
-        })
-        gemini_contents.append({
-            'role': 'model',
-            'parts': [{'text': "Understood. I'll assist users in the Slack workspace professionally."}]
-        })
-    
-    # Convert remaining messages to Gemini format
+    # Convert messages to Gemini format
     for msg in messages_in_thread:
         role = msg.get("role", "user")
         content = msg.get("content", "")
         
         # Map roles: 'assistant' -> 'model', 'user' stays 'user'
-        # Skip 'system' role if any (already handled above)
+        # Skip 'system' role if any (system_content is sent as system_instruction)
         if role == "system":
             continue
         elif role == "assistant":
@@ -64,20 +59,15 @@ def call_llm(
             'parts': [{'text': content}]
         })
     
-    # Use context manager to ensure client stays open during streaming
-    with genai.Client(api_key=os.environ.get("GOOGLE_API_KEY")) as client:
-        # Generate streaming response
-        response_stream = client.models.generate_content_stream(
-            model="gemini-2.0-flash-exp",
-            contents=gemini_contents,
-            config={'tools': tools} if tools else None,
-        )
-        
-        # Consume and cache all chunks immediately while client is alive
-        cached_chunks = []
-        for chunk in response_stream:
-            cached_chunks.append(chunk)
-    
-    # Return a generator that yields the cached chunks
-    # Client is now safely closed after stream consumption
-    return iter(cached_chunks)
+    config = types.GenerateContentConfig(system_instruction=system_content or None, tools=tools or None)
+    return _stream(gemini_contents, config)
+
+
+def _stream(gemini_contents: List[Dict[str, Any]], config: types.GenerateContentConfig) -> Iterator[Any]:
+    """Yield chunks as Gemini produces them, over the shared client's pooled connections"""
+    client = get_gemini_client()
+    yield from client.models.generate_content_stream(
+        model=LLM_MODEL,
+        contents=gemini_contents,
+        config=context_cache.apply(client, LLM_MODEL, config),
+    )
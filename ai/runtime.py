@@ -0,0 +1,160 @@
+"""
+Long-lived asyncio runtime for agent turns
+Slack listeners are synchronous, they submit each turn here instead of
+running it with asyncio.run, so the MCP pool, the Gemini client and caches
+live on one event loop for the lifetime of the process.
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import os
+import threading
+from typing import Any, Awaitable, Callable, Coroutine, List, Optional, Set
+
+from ai.gemini_client import aclose_gemini_client
+from salesforce.mcp_pool import get_mcp_pool
+
+logger = logging.getLogger(__name__)
+
+# Seconds shutdown waits for in-flight turns before cancelling them
+DRAIN_TIMEOUT = float(os.environ.get("AGENT_RUNTIME_DRAIN_TIMEOUT", "30"))
+# Worker threads for the blocking calls turns make (sync Slack client, asyncio.to_thread)
+IO_THREADS = int(os.environ.get("AGENT_RUNTIME_IO_THREADS", "32"))
+
+
+class AgentRuntime:
+    """Background thread running one event loop that turns are submitted to"""
+
+    def __init__(self, name: str = "agent-runtime"):
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._in_flight: Set[concurrent.futures.Future] = set()
+        self._shutdown_hooks: List[Callable[[], Awaitable[Any]]] = []
+        self._closing = False
+
+    def start(self):
+        """Start the loop thread, does nothing if already running"""
+        with self._lock:
+            if self.loop is not None:
+                return
+            self.loop = asyncio.new_event_loop()
+            self.loop.set_default_executor(
+                concurrent.futures.ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix=f"{self.name}-io")
+            )
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """
+        Schedule a coroutine on the runtime loop without waiting for it
+
+        Args:
+            coro: Coroutine to run, typically one Slack turn
+
+        Returns:
+            Future for the coroutine's result, exceptions are also logged
+
+        Raises:
+            RuntimeError: If the runtime is shutting down
+        """
+        with self._lock:
+            if self._closing or self.loop is None:
+                coro.close()
+                raise RuntimeError("Agent runtime is not accepting new work")
+            future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+            self._in_flight.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the runtime loop and block until it finishes"""
+        return self.submit(coro).result(timeout=timeout)
+
+    def add_shutdown_hook(self, hook: Callable[[], Awaitable[Any]]):
+        """Register a coroutine function awaited on the loop after turns drain"""
+        self._shutdown_hooks.append(hook)
+
+    def in_flight(self) -> int:
+        """Number of submitted coroutines that have not finished"""
+        with self._lock:
+            return len(self._in_flight)
+
+    def shutdown(self, timeout: float = DRAIN_TIMEOUT):
+        """
+        Stop accepting work, drain in-flight turns, close resources and stop the loop
+
+        Turns still running after timeout seconds are cancelled.
+        """
+        with self._lock:
+            if self._closing or self.loop is None:
+                self._closing = True
+                return
+            self._closing = True
+            pending = set(self._in_flight)
+
+        if pending:
+            logger.info(f"Draining {len(pending)} in-flight turns")
+            _, not_done = concurrent.futures.wait(pending, timeout=timeout)
+            if not_done:
+                logger.warning(f"Cancelling {len(not_done)} turns still running after {timeout}s")
+                for future in not_done:
+                    future.cancel()
+                concurrent.futures.wait(not_done, timeout=1)
+
+        closing = asyncio.run_coroutine_threadsafe(self._run_shutdown_hooks(), self.loop)
+        try:
+            closing.result(timeout=timeout)
+        except Exception as e:
+            logger.warning(f"Agent runtime resources did not close cleanly: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=timeout)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def _done(self, future: concurrent.futures.Future):
+        with self._lock:
+            self._in_flight.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Agent runtime task failed", exc_info=future.exception())
+
+    async def _run_shutdown_hooks(self):
+        # Close in reverse order of registration, like atexit
+        for hook in reversed(self._shutdown_hooks):
+            try:
+                await hook()
+            except Exception:
+                logger.exception(f"Agent runtime shutdown hook {hook} failed")
+
+
+_runtime: Optional[AgentRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> AgentRuntime:
+    """Get or start the process-wide runtime, with the MCP pool living on its loop"""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = AgentRuntime()
+            _runtime.start()
+            pool = get_mcp_pool(loop=_runtime.loop)
+            _runtime.add_shutdown_hook(pool.aclose)
+            _runtime.add_shutdown_hook(aclose_gemini_client)
+            atexit.register(_runtime.shutdown)
+        return _runtime
+
+
+def shutdown_runtime(timeout: float = DRAIN_TIMEOUT):
+    """Drain and stop the process-wide runtime if it was ever started"""
+    with _runtime_lock:
+        runtime = _runtime
+    if runtime is not None:
+        runtime.shutdown(timeout=timeout)
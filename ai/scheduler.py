@@ -0,0 +1,356 @@
+"""
+Admission control for agent turns
+Caps how many turns run at once, runs turns of one Slack thread one after
+another, shares free slots round-robin between users and bounds the queue.
+"""
+import asyncio
+import inspect
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Turns running at the same time across all users, each holds an MCP pool session so it defaults to the pool size
+TURN_MAX_CONCURRENT = int(os.environ.get("TURN_MAX_CONCURRENT", os.environ.get("MCP_POOL_SIZE", "4")))
+# Turns one user may have running at the same time
+TURN_MAX_PER_USER = int(os.environ.get("TURN_MAX_PER_USER", "2"))
+# Turns waiting for a slot, across all users and per user, before new ones are rejected
+TURN_MAX_QUEUED = int(os.environ.get("TURN_MAX_QUEUED", "50"))
+TURN_MAX_QUEUED_PER_USER = int(os.environ.get("TURN_MAX_QUEUED_PER_USER", "5"))
+# Recent turns whose queue and run times are reported by stats()
+LATENCY_WINDOW = 500
+
+BUSY_MESSAGE = ":hourglass: I'm handling a lot of requests right now, please try again in a minute."
+
+
+class TurnRejected(Exception):
+    """Raised when a turn is turned away for lack of capacity, e.g. the queue is full"""
+
+
+# Status updates running next to their turns, referenced here so they are not garbage collected
+_background: Set[asyncio.Task] = set()
+
+
+def _background_done(task: asyncio.Task):
+    _background.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        # A failed status update must not cost the turn anything
+        logger.error("Status update failed", exc_info=task.exception())
+
+
+def run_in_background(awaitable: Awaitable[Any]) -> asyncio.Task:
+    """
+    Run a Slack status update as its own task instead of awaiting it
+
+    The rate limiter holds status updates back while replies need the headroom,
+    so awaiting one would make the turn wait behind its own lowest priority call.
+
+    Args:
+        awaitable: The status call, e.g. set_status(...) or asyncio.to_thread(set_status, ...)
+
+    Returns:
+        The task, cancel it once the status would be stale
+    """
+    task = asyncio.ensure_future(awaitable)
+    _background.add(task)
+    task.add_done_callback(_background_done)
+    return task
+
+
+def _percentiles(values: Iterable[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    if not ordered:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[max(0, int(len(ordered) * 0.95) - 1)],
+        "max": ordered[-1],
+    }
+
+
+class _Waiter:
+    def __init__(self, thread_key: str, user_id: str, future: asyncio.Future, ahead: int):
+        self.thread_key = thread_key
+        self.user_id = user_id
+        self.future = future
+        # Turns already waiting when this one was queued
+        self.ahead = ahead
+
+
+class TurnScheduler:
+    """
+    Global cap + per-thread serialization + per-user fair share
+
+    All turns must be scheduled from the same event loop (the agent runtime
+    loop, or the AsyncApp loop).
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = TURN_MAX_CONCURRENT,
+        max_per_user: int = TURN_MAX_PER_USER,
+        max_queued: int = TURN_MAX_QUEUED,
+        max_queued_per_user: int = TURN_MAX_QUEUED_PER_USER,
+    ):
+        """
+        Args:
+            max_concurrent: Turns running at once (TURN_MAX_CONCURRENT, default MCP_POOL_SIZE or 4)
+            max_per_user: Turns running at once for one user (TURN_MAX_PER_USER, default 2)
+            max_queued: Turns waiting across all users (TURN_MAX_QUEUED, default 50)
+            max_queued_per_user: Turns waiting for one user (TURN_MAX_QUEUED_PER_USER, default 5)
+        """
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_queued = max_queued
+        self.max_queued_per_user = max_queued_per_user
+
+        self._running = 0
+        self._running_by_user: Dict[str, int] = {}
+        self._busy_threads: Set[str] = set()
+        self._by_user: Dict[str, Deque[_Waiter]] = {}
+        self._by_thread: Dict[str, Deque[_Waiter]] = {}
+        # When each user last had a turn started, free slots go to the least recently served
+        self._last_served: Dict[str, int] = {}
+        self._queued = 0
+        self._lock = threading.Lock()
+        # Tasks inside run(), what drain() waits for
+        self._tasks: Set[asyncio.Task] = set()
+        self.started = 0
+        self.rejected = 0
+        # Seconds from the event arriving to the turn starting, and from starting to finishing
+        self._queue_times: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._run_times: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    async def run(
+        self,
+        thread_key: str,
+        user_id: str,
+        turn: Callable[[], Awaitable[Any]],
+        on_queued: Optional[Callable[[int], Any]] = None,
+        received_at: Optional[float] = None,
+    ) -> Any:
+        """
+        Run a turn once the thread, the user and the global cap allow it
+
+        Args:
+            thread_key: Identifies the Slack thread, e.g. "channel:thread_ts"
+            user_id: Slack user who sent the message
+            turn: Coroutine function doing the work, including reading thread history
+            on_queued: Called with the number of turns ahead when the turn has to wait,
+                sync or async, e.g. to set a "waiting" status. A coroutine runs as its own
+                task and is cancelled once the turn starts.
+            received_at: time.monotonic() when the Slack event arrived, queue time is counted
+                from here. Defaults to now.
+
+        Returns:
+            Whatever turn returns
+
+        Raises:
+            TurnRejected: If the queue (global or for this user) is full
+        """
+        if received_at is None:
+            received_at = time.monotonic()
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            return await self._run(thread_key, user_id, turn, on_queued, received_at)
+        finally:
+            self._tasks.discard(task)
+
+    async def _run(
+        self,
+        thread_key: str,
+        user_id: str,
+        turn: Callable[[], Awaitable[Any]],
+        on_queued: Optional[Callable[[int], Any]],
+        received_at: float,
+    ) -> Any:
+        waiter = self._admit(thread_key, user_id)
+        if waiter is not None:
+            status = self._notify(on_queued, waiter.ahead) if on_queued is not None else None
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if not self._forget(waiter):
+                    # The slot was granted as we were cancelled, hand it on
+                    self._release(thread_key, user_id)
+                raise
+            finally:
+                if status is not None:
+                    # Do not show "waiting" once the turn is running
+                    status.cancel()
+        started = time.monotonic()
+        try:
+            return await turn()
+        finally:
+            self._release(thread_key, user_id)
+            self._record(thread_key, started - received_at, time.monotonic() - started)
+
+    async def drain(self, timeout: float):
+        """
+        Wait for turns inside run() to finish, cancelling them after timeout seconds
+
+        Only turns are waited for, long-lived tasks such as MCP transports are left
+        for their owners to close.
+        """
+        pending = set(self._tasks)
+        if pending:
+            logger.info(f"Draining {len(pending)} in-flight turns")
+            _, not_done = await asyncio.wait(pending, timeout=timeout)
+            if not_done:
+                logger.warning(f"Cancelling {len(not_done)} turns still running after {timeout}s")
+                for task in not_done:
+                    task.cancel()
+                await asyncio.wait(not_done, timeout=1)
+        for task in list(_background):
+            task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Running and queued turns, overall and per user"""
+        with self._lock:
+            return {
+                "running": self._running,
+                "queued": self._queued,
+                "busy_threads": len(self._busy_threads),
+                "queued_by_user": {user: len(q) for user, q in self._by_user.items()},
+                "running_by_user": dict(self._running_by_user),
+                "started": self.started,
+                "rejected": self.rejected,
+                "queue_seconds": _percentiles(self._queue_times),
+                "run_seconds": _percentiles(self._run_times),
+            }
+
+    # ----- Bookkeeping -----
+
+    @staticmethod
+    def _notify(on_queued: Callable[[int], Any], ahead: int) -> Optional[asyncio.Task]:
+        try:
+            result = on_queued(ahead)
+        except Exception:
+            # A failed status update must not cost the turn its place
+            logger.exception("Could not report queue position")
+            return None
+        if inspect.isawaitable(result):
+            # Never hold the slot hand-off behind a status update
+            return run_in_background(result)
+        return None
+
+    def _record(self, thread_key: str, queued: float, ran: float):
+        with self._lock:
+            self._queue_times.append(queued)
+            self._run_times.append(ran)
+        # Queue time growing while run time holds steady means too few slots
+        logger.info(f"Turn in {thread_key} waited {queued:.2f}s and ran {ran:.2f}s")
+
+    def _admit(self, thread_key: str, user_id: str) -> Optional[_Waiter]:
+        """Start the turn right away (returns None), queue it, or reject it"""
+        with self._lock:
+            if self._can_start(thread_key, user_id) and not self._by_thread.get(thread_key):
+                self._start(thread_key, user_id)
+                return None
+
+            user_queue = self._by_user.get(user_id)
+            if self._queued >= self.max_queued or (user_queue and len(user_queue) >= self.max_queued_per_user):
+                self.rejected += 1
+                logger.warning(f"Turn rejected for {user_id} in {thread_key}, queue is full")
+                raise TurnRejected(f"Turn queue is full ({self._queued} waiting)")
+
+            waiter = _Waiter(thread_key, user_id, asyncio.get_running_loop().create_future(), self._queued)
+            self._by_user.setdefault(user_id, deque()).append(waiter)
+            self._by_thread.setdefault(thread_key, deque()).append(waiter)
+            self._queued += 1
+            logger.info(f"Turn queued for {user_id} in {thread_key}: {self._queued} waiting, {self._running} running")
+            return waiter
+
+    def _can_start(self, thread_key: str, user_id: str) -> bool:
+        return (
+            self._running < self.max_concurrent
+            and self._running_by_user.get(user_id, 0) < self.max_per_user
+            and thread_key not in self._busy_threads
+        )
+
+    def _start(self, thread_key: str, user_id: str):
+        self._running += 1
+        self._running_by_user[user_id] = self._running_by_user.get(user_id, 0) + 1
+        self._busy_threads.add(thread_key)
+        self.started += 1
+        self._last_served[user_id] = self.started
+
+    def _release(self, thread_key: str, user_id: str):
+        with self._lock:
+            self._running -= 1
+            remaining = self._running_by_user.get(user_id, 0) - 1
+            if remaining > 0:
+                self._running_by_user[user_id] = remaining
+            else:
+                self._running_by_user.pop(user_id, None)
+                if user_id not in self._by_user:
+                    self._last_served.pop(user_id, None)
+            self._busy_threads.discard(thread_key)
+            self._dispatch()
+
+    def _dispatch(self):
+        """Hand free slots to waiting turns, fewest running then least recently served user first"""
+        while self._running < self.max_concurrent and self._by_user:
+            users = sorted(
+                self._by_user,
+                key=lambda user: (self._running_by_user.get(user, 0), self._last_served.get(user, 0)),
+            )
+            for user_id in users:
+                waiter = self._next_for(user_id)
+                if waiter is not None:
+                    break
+            else:
+                # Every waiting turn is blocked by its thread or its user's share
+                return
+            self._remove(waiter)
+            if waiter.future.cancelled():
+                continue
+            self._start(waiter.thread_key, waiter.user_id)
+            waiter.future.set_result(None)
+
+    def _next_for(self, user_id: str) -> Optional[_Waiter]:
+        if self._running_by_user.get(user_id, 0) >= self.max_per_user:
+            return None
+        for waiter in self._by_user[user_id]:
+            # Only the oldest waiting turn of a thread may start, and only once the thread is idle
+            if waiter.thread_key not in self._busy_threads and self._by_thread[waiter.thread_key][0] is waiter:
+                return waiter
+        return None
+
+    def _remove(self, waiter: _Waiter):
+        user_queue = self._by_user[waiter.user_id]
+        user_queue.remove(waiter)
+        if not user_queue:
+            del self._by_user[waiter.user_id]
+        thread_queue = self._by_thread[waiter.thread_key]
+        thread_queue.remove(waiter)
+        if not thread_queue:
+            del self._by_thread[waiter.thread_key]
+        self._queued -= 1
+
+    def _forget(self, waiter: _Waiter) -> bool:
+        """Drop a cancelled waiter, False if it had already been given a slot"""
+        with self._lock:
+            if waiter.future.done() and not waiter.future.cancelled():
+                return False
+            if waiter in self._by_user.get(waiter.user_id, ()):
+                self._remove(waiter)
+            return True
+
+
+_scheduler: Optional[TurnScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_turn_scheduler() -> TurnScheduler:
+    """Get or create the process-wide turn scheduler"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = TurnScheduler()
+        return _scheduler
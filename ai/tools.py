@@ -0,0 +1,127 @@
+"""
+Gemini function declarations built from MCP tools
+Caches the sanitized declarations and the GenerateContentConfig per MCP server
+so turns skip list_tools and schema sanitizing until the tool list changes.
+"""
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.genai import types
+
+from salesforce.mcp_client import add_tools_changed_listener
+
+logger = logging.getLogger(__name__)
+
+UNSUPPORTED_SCHEMA_KEYS = {
+    "additional_properties",
+    "additionalProperties",
+    "unevaluatedProperties",
+    "$schema",
+    "$ref",
+    "definitions",
+    "examples",
+    "default",
+}
+
+
+def sanitize_schema(schema: dict) -> dict:
+    """Recursively remove fields Gemini does not support."""
+    if isinstance(schema, dict):
+        cleaned = {}
+        for k, v in schema.items():
+            if k in UNSUPPORTED_SCHEMA_KEYS:
+                continue
+            cleaned[k] = sanitize_schema(v)
+        return cleaned
+    elif isinstance(schema, list):
+        return [sanitize_schema(i) for i in schema]
+    else:
+        return schema
+
+
+def build_function_declarations(tools: List[Any]) -> List[Dict[str, Any]]:
+    """Convert MCP tools into Gemini function declarations"""
+    function_declarations = []
+    for tool in tools:
+        schema = tool.inputSchema
+        if isinstance(schema, str):
+            schema = json.loads(schema)
+
+        schema = sanitize_schema(schema)
+
+        function_declarations.append({
+            "name": tool.name,
+            "description": tool.description or "No description available",
+            "parameters": schema,
+        })
+    return function_declarations
+
+
+def hash_tools(tools: List[Any]) -> str:
+    """Stable hash of a tool list, independent of listing order"""
+    payload = sorted(
+        (json.dumps([tool.name, tool.description, tool.inputSchema], sort_keys=True, default=str) for tool in tools)
+    )
+    return hashlib.sha256("\n".join(payload).encode()).hexdigest()
+
+
+class ToolDeclarationCache:
+    """GenerateContentConfig per (MCP server, tool-list hash)
+
+    The current hash for a server is forgotten on tools/list_changed, the next
+    turn re-lists tools and only rebuilds the config if the hash moved.
+    """
+
+    def __init__(self):
+        self._current: Dict[str, str] = {}
+        self._configs: Dict[Tuple[str, str], types.GenerateContentConfig] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def get_config(self, mcp_client) -> types.GenerateContentConfig:
+        """Get the prebuilt config for the client's server, listing tools only on a miss
+
+        Args:
+            mcp_client: Connected MCPClient or pooled session lease
+        """
+        server_id = mcp_client.server_id
+        with self._lock:
+            tools_hash = self._current.get(server_id)
+            config = self._configs.get((server_id, tools_hash))
+            if config is not None:
+                self.hits += 1
+                return config
+            self.misses += 1
+
+        resp = await mcp_client.list_tools()
+        tools_hash = hash_tools(resp.tools)
+        with self._lock:
+            config = self._configs.get((server_id, tools_hash))
+        if config is None:
+            gemini_tool = types.Tool(function_declarations=build_function_declarations(resp.tools))
+            config = types.GenerateContentConfig(tools=[gemini_tool])
+            logger.info(f"Built Gemini tool declarations for {server_id} ({len(resp.tools)} tools)")
+
+        with self._lock:
+            # Keep only the latest tool list per server
+            for key in [k for k in self._configs if k[0] == server_id and k[1] != tools_hash]:
+                del self._configs[key]
+            self._configs[(server_id, tools_hash)] = config
+            self._current[server_id] = tools_hash
+        return config
+
+    def invalidate(self, server_id: Optional[str] = None):
+        """Forget the current tool list for one server, or for all servers"""
+        with self._lock:
+            if server_id is None:
+                self._current.clear()
+            else:
+                self._current.pop(server_id, None)
+
+
+tool_cache = ToolDeclarationCache()
+add_tools_changed_listener(tool_cache.invalidate)
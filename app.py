@@ -1,5 +1,7 @@
 import logging
 import os
+import signal
+import sys
 
 from dotenv import load_dotenv
 
@@ -7,6 +9,7 @@ from slack_bolt import App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
 from slack_sdk import WebClient
 
+from ai.runtime import shutdown_runtime
 from listeners import register_listeners
 
 # Load environment variables
@@ -27,4 +30,12 @@ register_listeners(app)
 
 # Start Bolt app
 if __name__ == "__main__":
-    SocketModeHandler(app, os.environ.get("SLACK_APP_TOKEN")).start()
+    handler = SocketModeHandler(app, os.environ.get("SLACK_APP_TOKEN"))
+    # Exit through the finally below on SIGTERM as well as Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        handler.start()
+    finally:
+        # Stop taking events first, then let in-flight turns finish
+        handler.close()
+        shutdown_runtime()
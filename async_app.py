@@ -0,0 +1,67 @@
+"""
+Fully async entry point: AsyncApp + AsyncSocketModeHandler
+Listeners, Slack API calls, MCP sessions and Gemini calls all share one event
+loop, so in-flight turns cost a task each instead of a worker thread.
+
+Usage:
+    python async_app.py
+"""
+import asyncio
+import logging
+import os
+import signal
+
+from dotenv import load_dotenv
+
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+from slack_sdk.web.async_client import AsyncWebClient
+
+from ai.gemini_client import aclose_gemini_client
+from ai.runtime import DRAIN_TIMEOUT
+from ai.scheduler import get_turn_scheduler
+from listeners import register_async_listeners
+from salesforce.mcp_pool import get_mcp_pool
+
+# Load environment variables
+load_dotenv(dotenv_path=".env", override=False)
+
+# Initialization
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+app = AsyncApp(
+    token=os.environ.get("SLACK_BOT_TOKEN"),
+    client=AsyncWebClient(
+        base_url=os.environ.get("SLACK_API_URL", "https://slack.com/api"),
+        token=os.environ.get("SLACK_BOT_TOKEN"),
+    ),
+)
+# Register Listeners
+register_async_listeners(app)
+
+
+async def main():
+    loop = asyncio.get_running_loop()
+    # MCP sessions live on this loop next to the listeners
+    pool = get_mcp_pool(loop=loop)
+    handler = AsyncSocketModeHandler(app, os.environ.get("SLACK_APP_TOKEN"))
+
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await handler.connect_async()
+    try:
+        await stop.wait()
+    finally:
+        # Stop taking events first, then let in-flight turns finish
+        await handler.close_async()
+        await get_turn_scheduler().drain(DRAIN_TIMEOUT)
+        await pool.aclose()
+        await aclose_gemini_client()
+
+
+# Start Bolt app
+if __name__ == "__main__":
+    asyncio.run(main())
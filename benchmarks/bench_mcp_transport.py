@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark MCP per-call overhead and memory: stdio subprocess vs in-process
+
+Usage:
+    python benchmarks/bench_mcp_transport.py [--calls 500] [--limit 10]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from salesforce.mcp_client import MCPClient  # noqa: E402
+
+from echo_mcp_server import mcp as echo_server  # noqa: E402
+
+SERVER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "echo_mcp_server.py")
+
+
+def _rss_kb(pid) -> int:
+    """Resident set size of a process in KiB (Linux only)"""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def _child_pids():
+    pids = []
+    for tid in os.listdir("/proc/self/task"):
+        with open(f"/proc/self/task/{tid}/children") as f:
+            pids.extend(int(p) for p in f.read().split())
+    return pids
+
+
+async def _bench(mode: str, calls: int, limit: int):
+    client = MCPClient()
+    baseline_kb = _rss_kb("self")
+    started = time.perf_counter()
+    if mode == "stdio":
+        await client.connect_to_server(SERVER_PATH)
+    else:
+        await client.connect_in_process(echo_server)
+    connect_ms = (time.perf_counter() - started) * 1000
+
+    latencies = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        await client.call_tool("get_accounts", {"limit": limit})
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    children_kb = sum(_rss_kb(pid) for pid in _child_pids())
+    added_kb = _rss_kb("self") - baseline_kb + children_kb
+    await client.cleanup()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "connect_ms": connect_ms,
+        "mean_ms": statistics.mean(latencies),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+        "added_rss_mb": added_kb / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=10, help="records returned per call")
+    args = parser.parse_args()
+
+    print(f"{'mode':<10}{'connect ms':>12}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'+RSS MB':>10}")
+    for mode in ("stdio", "inprocess"):
+        r = asyncio.run(_bench(mode, args.calls, args.limit))
+        print(
+            f"{r['mode']:<10}{r['connect_ms']:>12.1f}{r['mean_ms']:>10.3f}"
+            f"{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['added_rss_mb']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
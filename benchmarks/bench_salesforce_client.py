@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Per-call latency of SalesforceClient against a local stub Salesforce server
+
+Runs SOQL queries against a stub of the OAuth token and query endpoints,
+served over HTTPS with a throwaway self-signed certificate (made with the
+openssl command line tool) and gzip compressed responses. Compares:
+
+    per-call    a new connection and TLS handshake per request, as with requests.request
+    pooled      SalesforceClient's pooled keep-alive session
+
+Usage:
+    python benchmarks/bench_salesforce_client.py [--calls 200] [--concurrency 4] [--no-tls]
+"""
+import argparse
+import gzip
+import json
+import os
+import socket
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+# Each run logs in to its own stub, nothing worth caching on disk
+os.environ.setdefault("SALESFORCE_TOKEN_CACHE_ENABLED", "0")
+
+import requests  # noqa: E402
+
+from salesforce.client import SalesforceClient  # noqa: E402
+
+
+def _records(count: int) -> list:
+    return [
+        {"attributes": {"type": "Account"}, "Id": f"001{i:015d}", "Name": f"Acme {i}", "Type": "Customer",
+         "Industry": "Technology", "Phone": "555-0100", "Website": "acme.example", "BillingCity": "Springfield",
+         "BillingState": "CA"}
+        for i in range(count)
+    ]
+
+
+class StubSalesforce(BaseHTTPRequestHandler):
+    """OAuth token and query endpoints, HTTP/1.1 keep-alive, gzip when asked for"""
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    instance_url = ""
+    records = []
+    connections = 0
+
+    def setup(self):
+        type(self).connections += 1
+        super().setup()
+        # Headers and body go out as two writes, Nagle would hold the body back on a kept-alive socket
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._send({"access_token": "00Dbench", "instance_url": self.instance_url, "token_type": "Bearer"})
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        self._send({"totalSize": len(self.records), "done": True, "records": self.records})
+
+
+class PerCallSession(requests.Session):
+    """A throwaway session per request, what requests.request does"""
+
+    def request(self, *args, **kwargs):
+        with requests.Session() as session:
+            return session.request(*args, **kwargs)
+
+
+def _self_signed_cert(directory: str):
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=127.0.0.1",
+         "-addext", "subjectAltName=IP:127.0.0.1", "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+def _bench(client: SalesforceClient, calls: int, concurrency: int):
+    def _call(_):
+        t0 = time.perf_counter()
+        client.get_accounts(limit=len(StubSalesforce.records))
+        return (time.perf_counter() - t0) * 1000
+
+    client.authenticate_client_credentials()
+    StubSalesforce.connections = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = sorted(pool.map(_call, range(calls)))
+    return latencies, time.perf_counter() - started, StubSalesforce.connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200, help="queries per mode")
+    parser.add_argument("--concurrency", type=int, default=4, help="queries in flight at once")
+    parser.add_argument("--records", type=int, default=10, help="accounts per query response")
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds the stub takes per query")
+    parser.add_argument("--no-tls", action="store_true", help="serve plain HTTP")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSalesforce)
+    scheme = "http"
+    tmp = tempfile.TemporaryDirectory()
+    if not args.no_tls:
+        cert, key = _self_signed_cert(tmp.name)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        # Both modes pick the certificate up from the environment
+        os.environ["REQUESTS_CA_BUNDLE"] = cert
+        scheme = "https"
+    base_url = f"{scheme}://127.0.0.1:{server.server_address[1]}"
+    StubSalesforce.instance_url = base_url
+    StubSalesforce.latency = args.latency
+    StubSalesforce.records = _records(args.records)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ.update({
+        "SALESFORCE_CLIENT_ID": "bench", "SALESFORCE_CLIENT_SECRET": "bench", "SALESFORCE_INSTANCE_URL": base_url,
+    })
+    print(f"{args.calls} queries over {scheme}, {args.concurrency} at a time, {args.latency * 1000:.0f}ms server time\n")
+    print(f"{'mode':<10}{'p50 ms':>8}{'p95 ms':>8}{'calls/s':>9}{'conns':>7}")
+
+    for mode in ("per-call", "pooled"):
+        client = SalesforceClient(session=PerCallSession() if mode == "per-call" else None)
+        latencies, elapsed, connections = _bench(client, args.calls, args.concurrency)
+        client.close()
+        print(
+            f"{mode:<10}{statistics.median(latencies):>8.2f}{latencies[int(len(latencies) * 0.95) - 1]:>8.2f}"
+            f"{args.calls / elapsed:>9.0f}{connections:>7}"
+        )
+
+    server.shutdown()
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Load comparison of the sync App path and the AsyncApp path
+
+Dispatches N concurrent app_mention events through each app against a local
+stub of the Slack Web API (fixed latency per call). Gemini is replaced by a
+stream with fixed latency and MCP uses the in-process transport, so the
+numbers isolate how each path schedules Slack I/O and in-flight turns.
+
+Usage:
+    python benchmarks/bench_slack_app.py [--turns 100] [--slack-latency 0.05] [--model-latency 1.0]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+
+class StubSlackAPI:
+    """Minimal Slack Web API on a background loop, records when each turn's stream stops"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.url = None
+        self.finished = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def start(self):
+        threading.Thread(target=lambda: asyncio.run(self._serve()), name="stub-slack", daemon=True).start()
+        self._ready.wait()
+
+    def finished_count(self) -> int:
+        with self._lock:
+            return len(self.finished)
+
+    async def _serve(self):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_route("*", "/api/{method}", self._handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/api/"
+        self._ready.set()
+        await asyncio.Event().wait()
+
+    async def _handle(self, request):
+        from aiohttp import web
+
+        method = request.match_info["method"]
+        params = dict(request.query)
+        if request.content_type == "application/json" and request.can_read_body:
+            params.update(await request.json())
+        elif request.method == "POST":
+            params.update(await request.post())
+        await asyncio.sleep(self.latency)
+
+        body = {"ok": True}
+        if method == "auth.test":
+            body.update(user_id="UBOT", bot_id="BBOT", team_id="T1", user="bot", team="bench")
+        elif method == "conversations.replies":
+            body["messages"] = [{"user": "U1", "text": "How many accounts do we have?", "ts": params.get("ts")}]
+        elif method == "chat.startStream":
+            body.update(ts=f"{params.get('thread_ts')}s", channel=params.get("channel"))
+        elif method == "chat.stopStream":
+            with self._lock:
+                self.finished[params.get("ts", "")[:-1]] = time.perf_counter()
+        return web.json_response(body)
+
+
+class FakeGemini:
+    """Streams a fixed answer in chunks spread over the model latency"""
+
+    def __init__(self, latency: float, chunks: int = 10):
+        from google.genai import types
+
+        self._types = types
+        self.latency = latency
+        self.chunks = chunks
+        self.aio = self
+        self.models = self
+
+    async def generate_content_stream(self, model, config, contents):
+        types = self._types
+
+        async def _stream():
+            for _ in range(self.chunks):
+                await asyncio.sleep(self.latency / self.chunks)
+                yield types.GenerateContentResponse(
+                    candidates=[types.Candidate(content=types.Content(
+                        role="model", parts=[types.Part(text="There are 42 accounts in the org. ")]
+                    ))]
+                )
+
+        return _stream()
+
+
+def _event(i: int) -> dict:
+    ts = f"1700000000.{i:06d}"
+    return {
+        "token": "bench",
+        "team_id": "T1",
+        "api_app_id": "A1",
+        "type": "event_callback",
+        "event_id": f"Ev{i:06d}",
+        "event_time": 1700000000,
+        "authorizations": [{"team_id": "T1", "user_id": "UBOT", "is_bot": True}],
+        "event": {
+            "type": "app_mention",
+            "user": "U1",
+            "text": "<@UBOT> How many accounts do we have?",
+            "ts": ts,
+            "event_ts": ts,
+            "channel": "C1",
+            "team": "T1",
+        },
+    }
+
+
+def _peak_threads(stop: threading.Event, peak: list):
+    while not stop.is_set():
+        peak[0] = max(peak[0], threading.active_count())
+        time.sleep(0.01)
+
+
+def _run_child(mode: str, turns: int, slack_latency: float, model_latency: float) -> dict:
+    """Runs inside a fresh process so the two paths don't share pools or loops"""
+    import logging
+
+    logging.basicConfig(level=logging.WARNING)
+    os.environ.update({
+        "GOOGLE_API_KEY": "bench",
+        "MCP_TRANSPORT": "inprocess",
+        "MCP_POOL_SIZE": str(turns),
+        # Every turn comes from one user, admit them all at once
+        "TURN_MAX_CONCURRENT": str(turns),
+        "TURN_MAX_PER_USER": str(turns),
+        "ANSWER_CACHE_ENABLED": "0",
+        "GEMINI_CONTEXT_CACHE": "0",
+        # Every turn streams into one channel, the stub does not rate limit
+        "SLACK_RATE_LIMIT_ENABLED": "0",
+    })
+    stub = StubSlackAPI(slack_latency)
+    stub.start()
+
+    import ai.agent
+
+    fake = FakeGemini(model_latency)
+    ai.agent.get_gemini_client = lambda: fake
+
+    events = [_event(i) for i in range(turns)]
+    started = {}
+    stop, peak = threading.Event(), [0]
+    threading.Thread(target=_peak_threads, args=(stop, peak), daemon=True).start()
+
+    if mode == "sync":
+        from slack_bolt import App, BoltRequest
+        from slack_sdk import WebClient
+
+        from listeners import register_listeners
+
+        app = App(client=WebClient(base_url=stub.url, token="xoxb-bench"))
+        register_listeners(app)
+        t0 = time.perf_counter()
+        for body in events:
+            started[body["event"]["ts"]] = time.perf_counter()
+            app.dispatch(BoltRequest(body=body, mode="socket_mode"))
+        while stub.finished_count() < turns and time.perf_counter() - t0 < 300:
+            time.sleep(0.01)
+    else:
+        from slack_bolt.async_app import AsyncApp, AsyncBoltRequest
+        from slack_sdk.web.async_client import AsyncWebClient
+
+        from listeners import register_async_listeners
+        from salesforce.mcp_pool import get_mcp_pool
+
+        async def _dispatch_all():
+            get_mcp_pool(loop=asyncio.get_running_loop())
+            app = AsyncApp(client=AsyncWebClient(base_url=stub.url, token="xoxb-bench"))
+            register_async_listeners(app)
+            # One warm-up dispatch resolves the bot's own identity (auth.test) like a running app would have
+            await app.async_dispatch(AsyncBoltRequest(body=_event(turns), mode="socket_mode"))
+            deadline = time.perf_counter() + 60
+            while stub.finished_count() < 1 and time.perf_counter() < deadline:
+                await asyncio.sleep(0.01)
+            with stub._lock:
+                stub.finished.clear()
+
+            t0 = time.perf_counter()
+            for body in events:
+                started[body["event"]["ts"]] = time.perf_counter()
+                await app.async_dispatch(AsyncBoltRequest(body=body, mode="socket_mode"))
+            while stub.finished_count() < turns and time.perf_counter() - t0 < 300:
+                await asyncio.sleep(0.01)
+            return t0
+
+        t0 = asyncio.run(_dispatch_all())
+
+    wall = time.perf_counter() - t0
+    stop.set()
+    with stub._lock:
+        latencies = sorted(stub.finished[ts] - started[ts] for ts in stub.finished if ts in started)
+    return {
+        "mode": mode,
+        "completed": len(latencies),
+        "wall_s": wall,
+        "p50_s": latencies[len(latencies) // 2] if latencies else 0.0,
+        "p95_s": latencies[max(0, int(len(latencies) * 0.95) - 1)] if latencies else 0.0,
+        "turns_per_s": len(latencies) / wall if wall else 0.0,
+        "peak_threads": peak[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--slack-latency", type=float, default=0.05, help="seconds per Slack API call")
+    parser.add_argument("--model-latency", type=float, default=1.0, help="seconds per streamed Gemini answer")
+    parser.add_argument("--mode", choices=("sync", "async"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(_run_child(args.mode, args.turns, args.slack_latency, args.model_latency)))
+        return
+
+    print(f"{'mode':<8}{'done':>6}{'wall s':>9}{'p50 s':>8}{'p95 s':>8}{'turns/s':>9}{'threads':>9}")
+    for mode in ("sync", "async"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--turns", str(args.turns),
+             "--slack-latency", str(args.slack_latency), "--model-latency", str(args.model_latency)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(
+            f"{r['mode']:<8}{r['completed']:>6}{r['wall_s']:>9.2f}{r['p50_s']:>8.2f}"
+            f"{r['p95_s']:>8.2f}{r['turns_per_s']:>9.1f}{r['peak_threads']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Slack calls and perceived latency of streamed answers
+
+Streams answers made of many small model deltas into a local stub of the
+Slack chat streaming API, which answers 429 with Retry-After once a stream
+appends more often than --rate times per second. Compares:
+
+    per-chunk   chat_stream(buffer_size=1), one append per delta
+    sdk-buffer  chat_stream() with the SDK's default 256 character buffer
+    writer      listeners.stream_writer.SlackStreamWriter
+
+Usage:
+    python benchmarks/bench_stream_writer.py [--answers 10] [--chars 2400] [--rate 2]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from aiohttp import web  # noqa: E402
+from slack_sdk.errors import SlackApiError  # noqa: E402
+from slack_sdk.web.async_client import AsyncWebClient  # noqa: E402
+
+from listeners.stream_writer import SlackStreamWriter, retry_after  # noqa: E402
+
+
+class StubStreamAPI:
+    """chat.startStream/appendStream/stopStream with a per-stream append rate limit"""
+
+    def __init__(self, latency: float, rate: float):
+        self.latency = latency
+        self.min_gap = 1.0 / rate
+        self.reset()
+
+    def reset(self):
+        self.calls = {}
+        self.limited = {}
+        self.first_text = {}
+        self.stopped = {}
+        self._last_append = {}
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/api/{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        return f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/api/"
+
+    async def close(self):
+        await self._runner.cleanup()
+
+    async def _handle(self, request):
+        method = request.match_info["method"]
+        params = dict(await request.json()) if request.content_type == "application/json" else dict(await request.post())
+        await asyncio.sleep(self.latency)
+        # Streams are keyed by channel, each answer streams into its own
+        stream = params.get("channel")
+        self.calls[stream] = self.calls.get(stream, 0) + 1
+        now = time.perf_counter()
+
+        if method == "chat.appendStream":
+            if now - self._last_append.get(stream, 0.0) < self.min_gap:
+                self.limited[stream] = self.limited.get(stream, 0) + 1
+                return web.json_response({"ok": False, "error": "ratelimited"}, status=429, headers={"Retry-After": "1"})
+            self._last_append[stream] = now
+        if params.get("markdown_text"):
+            self.first_text.setdefault(stream, now)
+        if method == "chat.stopStream":
+            self.stopped[stream] = now
+        return web.json_response({"ok": True, "ts": "1700000000.000100", "channel": stream})
+
+
+def _deltas(chars: int):
+    """Model-sized deltas, a paragraph break every ~400 characters"""
+    sentence = "Acme Corp has 3 open opportunities worth $1.2M in total. "
+    text = ""
+    while len(text) < chars:
+        text += sentence
+        if len(text) % 400 < len(sentence):
+            text += "\n\n"
+    return [text[i:i + 24] for i in range(0, len(text), 24)]
+
+
+async def _answer(client: AsyncWebClient, mode: str, channel: str, deltas, delta_interval: float):
+    buffer_size = 256 if mode == "sdk-buffer" else 1
+    streamer = await client.chat_stream(channel=channel, thread_ts="1700000000.000001", buffer_size=buffer_size)
+    if mode == "writer":
+        streamer = SlackStreamWriter(streamer)
+
+    for delta in deltas:
+        await asyncio.sleep(delta_interval)
+        try:
+            await streamer.append(markdown_text=delta)
+        except SlackApiError as e:
+            # Naive paths drop nothing either, the stream keeps the text for the next append
+            if retry_after(e) is None:
+                raise
+
+    while True:
+        try:
+            return await streamer.stop(blocks=[{"type": "divider"}])
+        except SlackApiError as e:
+            delay = retry_after(e)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+
+
+async def _run(args):
+    stub = StubStreamAPI(args.slack_latency, args.rate)
+    client = AsyncWebClient(base_url=await stub.start(), token="xoxb-bench")
+    deltas = _deltas(args.chars)
+    model_time = len(deltas) * args.delta_interval
+    print(f"{args.answers} answers of {args.chars} chars in {len(deltas)} deltas over {model_time:.1f}s each\n")
+    print(f"{'mode':<12}{'calls/ans':>10}{'429/ans':>9}{'first s':>9}{'done s':>8}{'lag s':>7}")
+
+    for mode in ("per-chunk", "sdk-buffer", "writer"):
+        stub.reset()
+        t0 = time.perf_counter()
+        channels = [f"C{i}" for i in range(args.answers)]
+        await asyncio.gather(*(_answer(client, mode, ch, deltas, args.delta_interval) for ch in channels))
+        first = sorted(stub.first_text[ch] - t0 for ch in channels)
+        done = sorted(stub.stopped[ch] - t0 for ch in channels)
+        p50 = len(channels) // 2
+        print(
+            f"{mode:<12}{sum(stub.calls.values()) / len(channels):>10.1f}"
+            f"{sum(stub.limited.values()) / len(channels):>9.1f}"
+            f"{first[p50]:>9.2f}{done[p50]:>8.2f}{done[p50] - model_time:>7.2f}"
+        )
+    await stub.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answers", type=int, default=10, help="answers streamed at the same time")
+    parser.add_argument("--chars", type=int, default=2400, help="characters per answer")
+    parser.add_argument("--delta-interval", type=float, default=0.02, help="seconds between model deltas")
+    parser.add_argument("--slack-latency", type=float, default=0.05, help="seconds per Slack API call")
+    parser.add_argument("--rate", type=float, default=2.0, help="appends per second a stream may make")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""Minimal MCP server for transport benchmarks
+
+Returns account-shaped records without touching Salesforce so only the
+transport and serialization cost is measured.
+"""
+from typing import Any
+
+from mcp.server.fastmcp import FastMCP
+
+mcp = FastMCP("Echo MCP Server", log_level="WARNING")
+
+
+@mcp.tool()
+def get_accounts(limit: int = 10) -> list[dict[str, Any]]:
+    """Returns fake account records."""
+    return [
+        {
+            "Id": f"001{i:015d}",
+            "Name": f"Account {i}",
+            "Type": "Customer",
+            "Industry": "Technology",
+            "Phone": "555-0100",
+            "Website": "https://example.com",
+            "BillingCity": "San Francisco",
+            "BillingState": "CA",
+        }
+        for i in range(limit)
+    ]
+
+
+if __name__ == "__main__":
+    mcp.run(transport="stdio")
@@ -1,13 +1,28 @@
 from slack_bolt import App
+from slack_bolt.async_app import AsyncApp
 
 from listeners import actions, assistant, events
 from listeners.commands import salesforce_commands
+from listeners.event_dedup import async_skip_duplicate_events, skip_duplicate_events
+from listeners.rate_limiter import async_limit_slack_calls, limit_slack_calls
 
 
 def register_listeners(app: App):
+    # Registered first so every listener, the Assistant's set_status included, gets the rate limited client
+    app.use(limit_slack_calls)
+    # Redelivered messages are acknowledged here, before the Assistant or any listener runs
+    app.use(skip_duplicate_events)
     actions.register(app)
     assistant.register(app)
     events.register(app)
     
     # Register Salesforce commands
     # salesforce_commands.register(app)
+
+
+def register_async_listeners(app: AsyncApp):
+    app.use(async_limit_slack_calls)
+    app.use(async_skip_duplicate_events)
+    actions.register_async(app)
+    assistant.register_async(app)
+    events.register_async(app)
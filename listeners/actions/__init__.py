@@ -1,7 +1,13 @@
 from slack_bolt import App
+from slack_bolt.async_app import AsyncApp
 
 from .actions import handle_feedback
+from .async_actions import async_handle_feedback
 
 
 def register(app: App):
     app.action("feedback")(handle_feedback)
+
+
+def register_async(app: AsyncApp):
+    app.action("feedback")(async_handle_feedback)
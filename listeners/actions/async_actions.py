@@ -0,0 +1,41 @@
+from logging import Logger
+
+from slack_bolt.async_app import AsyncAck
+from slack_sdk.web.async_client import AsyncWebClient
+
+
+async def async_handle_feedback(ack: AsyncAck, body: dict, client: AsyncWebClient, logger: Logger):
+    """
+    Async counterpart of handle_feedback for AsyncApp.
+
+    Args:
+        ack: Function to acknowledge the action request
+        body: Action payload containing feedback details (message, channel, user, action value)
+        client: Async Slack WebClient for making API calls
+        logger: Logger instance for debugging and error tracking
+    """
+    try:
+        await ack()
+        message_ts = body["message"]["ts"]
+        channel_id = body["channel"]["id"]
+        feedback_type = body["actions"][0]["value"]
+        is_positive = feedback_type == "good-feedback"
+
+        if is_positive:
+            await client.chat_postEphemeral(
+                channel=channel_id,
+                user=body["user"]["id"],
+                thread_ts=message_ts,
+                text="We're glad you found this useful.",
+            )
+        else:
+            await client.chat_postEphemeral(
+                channel=channel_id,
+                user=body["user"]["id"],
+                thread_ts=message_ts,
+                text="Sorry to hear that response wasn't up to par :slightly_frowning_face: Starting a new chat may help with AI mistakes and hallucinations.",
+            )
+
+        logger.debug(f"Handled feedback: type={feedback_type}, message_ts={message_ts}")
+    except Exception as error:
+        logger.error(f":warning: Something went wrong! {error}")
@@ -1,6 +1,9 @@
 from slack_bolt import App, Assistant
+from slack_bolt.async_app import AsyncApp, AsyncAssistant
 
 from .assistant_thread_started import assistant_thread_started
+from .async_assistant_thread_started import async_assistant_thread_started
+from .async_message import async_message
 from .message import message
 
 
@@ -12,3 +15,12 @@ def register(app: App):
     assistant.user_message(message)
 
     app.assistant(assistant)
+
+
+def register_async(app: AsyncApp):
+    assistant = AsyncAssistant()
+
+    assistant.thread_started(async_assistant_thread_started)
+    assistant.user_message(async_message)
+
+    app.assistant(assistant)
@@ -0,0 +1,26 @@
+from logging import Logger
+
+from slack_bolt.async_app import AsyncSay, AsyncSetSuggestedPrompts
+
+from .assistant_thread_started import SUGGESTED_PROMPTS
+
+
+async def async_assistant_thread_started(
+    say: AsyncSay,
+    set_suggested_prompts: AsyncSetSuggestedPrompts,
+    logger: Logger,
+):
+    """
+    Async counterpart of assistant_thread_started for AsyncApp.
+
+    Args:
+        say: Function to send messages to the thread from the app
+        set_suggested_prompts: Function to configure suggested prompt options
+        logger: Logger instance for error tracking
+    """
+    try:
+        await say("How can I help you?")
+        await set_suggested_prompts(prompts=SUGGESTED_PROMPTS)
+    except Exception as e:
+        logger.exception(f"Failed to handle an assistant_thread_started event: {e}")
+        await say(f":warning: Something went wrong! ({e})")
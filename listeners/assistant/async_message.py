@@ -0,0 +1,55 @@
+# listeners/assistant/async_message.py
+import time
+from logging import Logger
+
+from slack_bolt.async_app import AsyncBoltContext, AsyncSay, AsyncSetStatus
+from slack_sdk.web.async_client import AsyncWebClient
+
+from ai.scheduler import BUSY_MESSAGE, TurnRejected
+
+from ..turn import run_turn
+
+
+async def async_message(
+    client: AsyncWebClient,
+    context: AsyncBoltContext,
+    logger: Logger,
+    payload: dict,
+    say: AsyncSay,
+    set_status: AsyncSetStatus,
+):
+    """
+    Async counterpart of message for AsyncApp, the whole turn runs on the app's event loop
+    so no thread is held while Gemini and Salesforce are working.
+
+    Args:
+        client: Async Slack WebClient for making API calls
+        context: Bolt context with team, user and channel ids
+        logger: Logger instance for error tracking
+        payload: Message event payload
+        say: Function to send messages to the thread from the app
+        set_status: Function to set the assistant thread status
+    """
+    try:
+        received_at = time.monotonic()
+        channel_id = payload["channel"]
+        thread_ts = payload.get("thread_ts") or payload["ts"]
+
+        await run_turn(
+            client,
+            set_status,
+            logger,
+            message=payload,
+            channel_id=channel_id,
+            thread_ts=thread_ts,
+            team_id=context.team_id,
+            user_id=context.user_id,
+            bot_id=context.bot_id,
+            received_at=received_at,
+        )
+
+    except TurnRejected:
+        await say(BUSY_MESSAGE)
+    except Exception as e:
+        logger.exception(f"Unhandled error in message handler: {e}")
+        await say(f":warning: Oops! Something broke: {e}")
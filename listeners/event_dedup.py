@@ -0,0 +1,135 @@
+"""
+Idempotency for redelivered Slack events
+Slack redelivers events it did not see acknowledged in time, and a message
+can reach the app more than once. Each message / app_mention event is
+claimed by its client_msg_id (or event_id) before any listener runs, so a
+duplicate is acknowledged and dropped instead of running the Gemini and
+Salesforce pipeline, and any writes it makes, a second time.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from slack_bolt import BoltResponse
+
+logger = logging.getLogger(__name__)
+
+EVENT_DEDUP_ENABLED = os.environ.get("EVENT_DEDUP_ENABLED", "1").lower() not in ("0", "false", "no")
+# SQLite file shared by processes on one host, memory only when unset
+EVENT_DEDUP_PATH = os.environ.get("EVENT_DEDUP_PATH")
+# Seconds an event is remembered, Slack retries for a few minutes
+EVENT_DEDUP_TTL = float(os.environ.get("EVENT_DEDUP_TTL", "3600"))
+# Events kept by the in-memory store
+EVENT_DEDUP_MAX_EVENTS = int(os.environ.get("EVENT_DEDUP_MAX_EVENTS", "10000"))
+
+# Events that start a turn
+DEDUP_EVENT_TYPES = {"message", "app_mention"}
+
+
+def event_key(body: dict) -> Optional[str]:
+    """Idempotency key of an event that starts a turn, None for anything else"""
+    if body.get("type") != "event_callback":
+        return None
+    event = body.get("event") or {}
+    if event.get("type") not in DEDUP_EVENT_TYPES or event.get("subtype"):
+        return None
+    # The same message may come with a new event_id, client_msg_id stays the same
+    if event.get("client_msg_id"):
+        return f"{event['type']}:{event['client_msg_id']}"
+    if body.get("event_id"):
+        return f"event:{body['event_id']}"
+    return None
+
+
+class InMemoryEventStore:
+    """LRU + TTL of claimed event keys"""
+
+    def __init__(self, max_events: int = EVENT_DEDUP_MAX_EVENTS, ttl: float = EVENT_DEDUP_TTL):
+        self.max_events = max_events
+        self.ttl = ttl
+        self._events: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, key: str) -> bool:
+        """Record the event, False if it was already seen within the TTL"""
+        now = time.monotonic()
+        with self._lock:
+            expires = self._events.get(key)
+            if expires is not None and expires >= now:
+                return False
+            self._events[key] = now + self.ttl
+            self._events.move_to_end(key)
+            while len(self._events) > self.max_events:
+                self._events.popitem(last=False)
+            return True
+
+
+class SQLiteEventStore:
+    """Claimed event keys in a SQLite file, so processes on one host skip each other's duplicates"""
+
+    def __init__(self, path: str, ttl: float = EVENT_DEDUP_TTL):
+        """
+        Args:
+            path: SQLite database file, created if missing
+            ttl: Seconds an event is remembered
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._claims = 0
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        with self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS events (key TEXT PRIMARY KEY, seen_at REAL NOT NULL)")
+
+    def claim(self, key: str) -> bool:
+        """Record the event, False if it was already seen within the TTL"""
+        now = time.time()
+        with self._lock, self._db:
+            # Inserts a new key or takes over an expired one, a live duplicate changes no row
+            claimed = self._db.execute(
+                "INSERT INTO events (key, seen_at) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET seen_at = excluded.seen_at WHERE events.seen_at < ?",
+                (key, now, now - self.ttl),
+            ).rowcount == 1
+            self._claims += 1
+            if self._claims % 100 == 0:
+                self._db.execute("DELETE FROM events WHERE seen_at < ?", (now - self.ttl,))
+        return claimed
+
+
+def _create_store():
+    if EVENT_DEDUP_PATH:
+        logger.info(f"Recording Slack events in {EVENT_DEDUP_PATH}")
+        return SQLiteEventStore(EVENT_DEDUP_PATH)
+    return InMemoryEventStore()
+
+
+event_store = _create_store()
+
+
+def _is_duplicate(body: dict, logger: logging.Logger) -> bool:
+    key = event_key(body) if EVENT_DEDUP_ENABLED else None
+    if key is None or event_store.claim(key):
+        return False
+    retry = body.get("retry_attempt")
+    logger.info(f"Skipping duplicate Slack event {key}" + (f" (retry {retry})" if retry else ""))
+    return True
+
+
+def skip_duplicate_events(body: dict, logger: logging.Logger, next):
+    """Global middleware acknowledging duplicates without running listeners, register before the listeners"""
+    if _is_duplicate(body, logger):
+        return BoltResponse(status=200, body="")
+    next()
+
+
+async def async_skip_duplicate_events(body: dict, logger: logging.Logger, next):
+    """Async counterpart of skip_duplicate_events"""
+    if _is_duplicate(body, logger):
+        return BoltResponse(status=200, body="")
+    await next()
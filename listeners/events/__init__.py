@@ -1,7 +1,13 @@
 from slack_bolt import App
+from slack_bolt.async_app import AsyncApp
 
 from .app_mentioned import app_mentioned_callback
+from .async_app_mentioned import async_app_mentioned_callback
 
 
 def register(app: App):
     app.event("app_mention")(app_mentioned_callback)
+
+
+def register_async(app: AsyncApp):
+    app.event("app_mention")(async_app_mentioned_callback)
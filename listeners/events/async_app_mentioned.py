@@ -0,0 +1,53 @@
+# listeners/events/async_app_mentioned.py
+import time
+from logging import Logger
+
+from slack_bolt.async_app import AsyncBoltContext, AsyncSay
+from slack_sdk.web.async_client import AsyncWebClient
+
+from ai.scheduler import BUSY_MESSAGE, TurnRejected
+
+from ..turn import run_turn
+
+
+async def async_app_mentioned_callback(
+    client: AsyncWebClient, context: AsyncBoltContext, event: dict, logger: Logger, say: AsyncSay
+):
+    """
+    Async counterpart of app_mentioned_callback for AsyncApp.
+
+    Args:
+        client: Async Slack WebClient for making API calls
+        context: Bolt context with the bot's own ids
+        event: Event payload containing mention details (channel, user, text, etc.)
+        logger: Logger instance for error tracking
+        say: Function to send messages to the thread from the app
+    """
+    try:
+        received_at = time.monotonic()
+        channel_id = event.get("channel")
+        thread_ts = event.get("thread_ts") or event.get("ts")
+
+        async def set_thread_status(**kwargs):
+            await client.assistant_threads_setStatus(channel_id=channel_id, thread_ts=thread_ts, **kwargs)
+
+        await run_turn(
+            client,
+            set_thread_status,
+            logger,
+            message=event,
+            channel_id=channel_id,
+            thread_ts=thread_ts,
+            team_id=event.get("team"),
+            user_id=event.get("user"),
+            bot_id=context.bot_id,
+            received_at=received_at,
+            # Other people's replies in a channel thread arrive as no event
+            catch_up=True,
+        )
+
+    except TurnRejected:
+        await say(text=BUSY_MESSAGE, thread_ts=thread_ts)
+    except Exception as e:
+        logger.exception(f"Failed to handle a user message event: {e}")
+        await say(f":warning: Something went wrong! ({e})")
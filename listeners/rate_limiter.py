@@ -0,0 +1,331 @@
+"""
+Client-side Slack Web API rate limiting
+Every listener's client goes through a shared token bucket per Slack rate
+limit tier (per channel for message and assistant thread methods), waits out
+Retry-After when Slack answers 429, and serves interactive calls ahead of
+assistant status updates when a bucket runs low.
+"""
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
+
+from .stream_writer import retry_after
+
+logger = logging.getLogger(__name__)
+
+SLACK_RATE_LIMIT_ENABLED = os.environ.get("SLACK_RATE_LIMIT_ENABLED", "1").lower() not in ("0", "false", "no")
+# Calls per minute allowed per channel for message and assistant thread methods
+SLACK_CHANNEL_RATE = float(os.environ.get("SLACK_CHANNEL_RATE", "60"))
+# Share of each bucket kept for interactive calls, status updates wait for it to refill
+SLACK_RATE_RESERVE = float(os.environ.get("SLACK_RATE_RESERVE", "0.2"))
+# Times a call answered with 429 is retried after Retry-After
+SLACK_RATE_LIMIT_RETRIES = int(os.environ.get("SLACK_RATE_LIMIT_RETRIES", "3"))
+# Buckets kept before idle ones are dropped, one per active channel
+MAX_BUCKETS = 1000
+
+# Calls per minute per workspace of Slack's rate limit tiers
+TIER_RATES = {1: 1, 2: 20, 3: 50, 4: 100}
+
+# Tier of the methods the bot calls, methods not listed are only slowed down once Slack answers 429
+METHOD_TIERS = {
+    "conversations.replies": 3,
+    "conversations.history": 3,
+    "conversations.info": 3,
+    "chat.update": 3,
+    "chat.delete": 3,
+    "chat.postEphemeral": 4,
+    "users.info": 4,
+    "views.open": 4,
+    "views.update": 4,
+    "views.publish": 4,
+}
+
+# Methods limited per channel, they share one bucket for each channel
+CHANNEL_METHODS = {
+    "chat.postMessage",
+    "chat.startStream",
+    "chat.appendStream",
+    "chat.stopStream",
+    "assistant.threads.setStatus",
+    "assistant.threads.setSuggestedPrompts",
+    "assistant.threads.setTitle",
+}
+
+# Calls that only update the "thinking..." indicator, served after anything a user reads
+BACKGROUND_METHODS = {
+    "assistant.threads.setStatus",
+    "assistant.threads.setSuggestedPrompts",
+    "assistant.threads.setTitle",
+}
+
+
+def _bucket_key(method: str, channel: Optional[str]) -> Optional[Tuple[str, Optional[str]]]:
+    if method in CHANNEL_METHODS:
+        return ("channel", channel)
+    tier = METHOD_TIERS.get(method)
+    if tier is not None:
+        return (f"tier{tier}", None)
+    return None
+
+
+def _channel_of(*payloads: Optional[dict]) -> Optional[str]:
+    for payload in payloads:
+        if payload:
+            channel = payload.get("channel") or payload.get("channel_id")
+            if channel:
+                return str(channel)
+    return None
+
+
+class TokenBucket:
+    """
+    Token bucket where interactive calls reserve ahead and background calls wait for headroom
+
+    An interactive call always takes a token, going into debt if needed, and is
+    told how long to wait for it. A background call only takes a token when
+    that leaves reserve tokens for interactive calls, otherwise it is told to
+    check again later.
+    """
+
+    def __init__(self, per_minute: float, reserve: float = SLACK_RATE_RESERVE):
+        self.rate = per_minute / 60.0
+        # About ten seconds of calls may go out back to back
+        self.capacity = max(1.0, math.ceil(per_minute / 6))
+        self.reserve = min(math.floor(self.capacity * reserve), self.capacity - 1)
+        self.tokens = self.capacity
+        # Refill runs from here, in the future while Slack has asked us to back off
+        self.updated = time.monotonic()
+
+    def take(self, background: bool = False) -> Tuple[bool, float]:
+        """
+        Returns:
+            Whether a token was taken, and the seconds to wait before calling (or checking again)
+        """
+        now = time.monotonic()
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+        blocked = max(0.0, self.updated - now)
+
+        if background:
+            needed = 1 + self.reserve
+            if blocked or self.tokens < needed:
+                return False, blocked + (needed - self.tokens) / self.rate
+            self.tokens -= 1
+            return True, 0.0
+
+        self.tokens -= 1
+        return True, blocked + max(0.0, -self.tokens) / self.rate
+
+    def block(self, seconds: float):
+        """Stop refilling for seconds, e.g. the Retry-After of a 429, then let one call probe"""
+        self.tokens = min(self.tokens, 1.0)
+        self.updated = max(self.updated, time.monotonic() + seconds)
+
+
+class SlackRateLimiter:
+    """Shared buckets for every Slack client in the process"""
+
+    def __init__(self, channel_rate: float = SLACK_CHANNEL_RATE, reserve: float = SLACK_RATE_RESERVE):
+        """
+        Args:
+            channel_rate: Calls per minute per channel (SLACK_CHANNEL_RATE, default 60)
+            reserve: Share of each bucket kept for interactive calls (SLACK_RATE_RESERVE, default 0.2)
+        """
+        self.channel_rate = channel_rate
+        self.reserve = reserve
+        self._buckets: Dict[Tuple[str, Optional[str]], TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.waited = 0
+        self.rate_limited = 0
+
+    def _per_minute(self, key: Tuple[str, Optional[str]]) -> float:
+        return self.channel_rate if key[0] == "channel" else TIER_RATES[int(key[0][len("tier"):])]
+
+    def _bucket(self, key: Tuple[str, Optional[str]], per_minute: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_BUCKETS:
+                # A bucket idle for a minute is full again, dropping it changes nothing
+                idle = time.monotonic() - 60
+                for stale in [k for k, b in self._buckets.items() if b.updated < idle]:
+                    del self._buckets[stale]
+            bucket = self._buckets[key] = TokenBucket(per_minute, self.reserve)
+        return bucket
+
+    def _take(self, method: str, channel: Optional[str]) -> Tuple[bool, float]:
+        key = _bucket_key(method, channel)
+        with self._lock:
+            if key is None:
+                # Unlisted methods only have a bucket once Slack has rate limited them
+                bucket = self._buckets.get((method, channel))
+                if bucket is None:
+                    return True, 0.0
+            else:
+                bucket = self._bucket(key, self._per_minute(key))
+            taken, wait = bucket.take(background=method in BACKGROUND_METHODS)
+            if wait > 0:
+                self.waited += 1
+        return taken, wait
+
+    def acquire(self, method: str, channel: Optional[str] = None):
+        """Block until the call may be made"""
+        while True:
+            taken, wait = self._take(method, channel)
+            if wait > 0:
+                time.sleep(wait)
+            if taken:
+                return
+
+    async def acquire_async(self, method: str, channel: Optional[str] = None):
+        """Async counterpart of acquire"""
+        while True:
+            taken, wait = self._take(method, channel)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if taken:
+                return
+
+    def block(self, method: str, channel: Optional[str], seconds: float):
+        """Hold back every call sharing the method's bucket for Retry-After seconds"""
+        key = _bucket_key(method, channel)
+        with self._lock:
+            if key is None:
+                bucket = self._bucket((method, channel), self.channel_rate)
+            else:
+                bucket = self._bucket(key, self._per_minute(key))
+            bucket.block(seconds)
+            self.rate_limited += 1
+        logger.warning(f"Slack rate limited {method} ({channel or 'workspace'}), holding calls for {seconds:.1f}s")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"buckets": len(self._buckets), "waited": self.waited, "rate_limited": self.rate_limited}
+
+
+rate_limiter = SlackRateLimiter()
+
+# Method of the blocking call running in this context that already waited for the limiter
+_admitted: ContextVar[Optional[str]] = ContextVar("slack_call_admitted", default=None)
+
+
+class RateLimitedWebClient(WebClient):
+    """WebClient whose calls wait for the shared rate limiter and retry 429s after Retry-After"""
+
+    limiter = rate_limiter
+
+    def api_call(self, api_method: str, **kwargs):
+        channel = _channel_of(kwargs.get("json"), kwargs.get("data"), kwargs.get("params"))
+        admitted = _admitted.get() == api_method
+        for attempt in range(SLACK_RATE_LIMIT_RETRIES + 1):
+            if attempt or not admitted:
+                self.limiter.acquire(api_method, channel)
+            try:
+                return super().api_call(api_method, **kwargs)
+            except SlackApiError as e:
+                delay = retry_after(e)
+                if delay is None or attempt == SLACK_RATE_LIMIT_RETRIES:
+                    raise
+                self.limiter.block(api_method, channel, delay)
+
+
+class AsyncRateLimitedWebClient(AsyncWebClient):
+    """Async counterpart of RateLimitedWebClient"""
+
+    limiter = rate_limiter
+
+    async def api_call(self, api_method: str, **kwargs):
+        channel = _channel_of(kwargs.get("json"), kwargs.get("data"), kwargs.get("params"))
+        for attempt in range(SLACK_RATE_LIMIT_RETRIES + 1):
+            await self.limiter.acquire_async(api_method, channel)
+            try:
+                return await super().api_call(api_method, **kwargs)
+            except SlackApiError as e:
+                delay = retry_after(e)
+                if delay is None or attempt == SLACK_RATE_LIMIT_RETRIES:
+                    raise
+                self.limiter.block(api_method, channel, delay)
+
+
+async def call_admitted(method: str, channel: Optional[str], call: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Wait for the limiter on the event loop, then make a blocking Slack call in a worker thread
+
+    A wait inside the thread cannot be cancelled, so a status update cancelled while
+    its bucket is empty would still go out later. Waiting here it is never sent.
+
+    Args:
+        method: Slack method the call makes, e.g. "assistant.threads.setStatus"
+        channel: Channel of the call, selects the bucket
+        call: Blocking function making the call through a RateLimitedWebClient
+    """
+    if SLACK_RATE_LIMIT_ENABLED:
+        await RateLimitedWebClient.limiter.acquire_async(method, channel)
+    # asyncio.to_thread copies the context, the client skips its own first wait
+    token = _admitted.set(method)
+    try:
+        return await asyncio.to_thread(call, *args, **kwargs)
+    finally:
+        _admitted.reset(token)
+
+
+def _copy(client, cls, **kwargs):
+    """Same settings as Bolt's per-request client, calls go through the limiter"""
+    return cls(
+        token=client.token,
+        base_url=client.base_url,
+        timeout=client.timeout,
+        ssl=client.ssl,
+        proxy=client.proxy,
+        headers=client.headers,
+        team_id=client.default_params.get("team_id"),
+        logger=client.logger,
+        retry_handlers=client.retry_handlers,
+        **kwargs,
+    )
+
+
+# Context utilities Bolt builds from the per-request client before any middleware runs
+CONTEXT_UTILITIES = ("say", "set_status", "set_title", "set_suggested_prompts", "get_thread_context", "save_thread_context")
+
+
+def _use_client(context, client):
+    """Swap the context's client, the Assistant utilities and their thread context store included"""
+    original = context.client
+    context["client"] = client
+    for key in CONTEXT_UTILITIES:
+        utility = context.get(key)
+        if getattr(utility, "client", None) is original:
+            utility.client = client
+        store = getattr(utility, "thread_context_store", None)
+        if getattr(store, "client", None) is original:
+            store.client = client
+
+
+def limit_slack_calls(context, next):
+    """Global middleware giving every listener a rate limited client, register before the listeners"""
+    if SLACK_RATE_LIMIT_ENABLED and context.client is not None and not isinstance(context.client, RateLimitedWebClient):
+        _use_client(context, _copy(context.client, RateLimitedWebClient))
+    next()
+
+
+async def async_limit_slack_calls(context, next):
+    """Async counterpart of limit_slack_calls"""
+    if SLACK_RATE_LIMIT_ENABLED and context.client is not None and not isinstance(context.client, AsyncRateLimitedWebClient):
+        client = context.client
+        _use_client(context, _copy(
+            client,
+            AsyncRateLimitedWebClient,
+            session=client.session,
+            trust_env_in_session=client.trust_env_in_session,
+        ))
+    await next()
@@ -0,0 +1,255 @@
+"""
+Coalescing writer for Slack chat streams
+Model text arrives in many small deltas. The writer batches them into
+chat.appendStream calls by size and time window, cuts batches at paragraph
+boundaries, and backs off for Retry-After when Slack answers 429 instead of
+failing the answer.
+"""
+import asyncio
+import inspect
+import logging
+import os
+import time
+from typing import Any, Optional
+
+from slack_sdk.errors import SlackApiError
+
+logger = logging.getLogger(__name__)
+
+# Flush as soon as this many characters are buffered
+SLACK_STREAM_MAX_CHARS = int(os.environ.get("SLACK_STREAM_MAX_CHARS", "1000"))
+# Seconds buffered text may wait for more before it is flushed anyway
+SLACK_STREAM_MAX_DELAY = float(os.environ.get("SLACK_STREAM_MAX_DELAY", "1.0"))
+# Minimum seconds between two appends to the same stream
+SLACK_STREAM_MIN_INTERVAL = float(os.environ.get("SLACK_STREAM_MIN_INTERVAL", "0.5"))
+# Buffered characters at which append waits for Slack, chat.appendStream takes at most 12,000
+SLACK_STREAM_MAX_BUFFER = int(os.environ.get("SLACK_STREAM_MAX_BUFFER", "12000"))
+# chat.stopStream attempts when Slack keeps answering 429
+SLACK_STREAM_STOP_ATTEMPTS = 5
+
+PARAGRAPH_BREAK = "\n\n"
+
+
+def retry_after(error: SlackApiError, default: float = 1.0) -> Optional[float]:
+    """Seconds Slack asked us to wait, None if the error is not a rate limit"""
+    response = error.response
+    if response is None or response.status_code != 429:
+        return None
+    for name, value in (response.headers or {}).items():
+        if name.lower() == "retry-after":
+            value = value[0] if isinstance(value, list) else value
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                break
+    return default
+
+
+async def _call(method, **kwargs):
+    """Call a ChatStream method in a worker thread, or await an AsyncChatStream one"""
+    if inspect.iscoroutinefunction(method):
+        return await method(**kwargs)
+    return await asyncio.to_thread(method, **kwargs)
+
+
+class SlackStreamWriter:
+    """
+    Batches appends to a ChatStream or AsyncChatStream
+
+    append only buffers and returns, a background task sends the batches so
+    the model stream is never held up by a Slack call. Text that was sent
+    while Slack answered 429 stays in the underlying stream's buffer and goes
+    out with the next batch, nothing is lost or sent twice.
+    """
+
+    def __init__(
+        self,
+        streamer,
+        max_chars: int = SLACK_STREAM_MAX_CHARS,
+        max_delay: float = SLACK_STREAM_MAX_DELAY,
+        min_interval: float = SLACK_STREAM_MIN_INTERVAL,
+        max_buffer: int = SLACK_STREAM_MAX_BUFFER,
+    ):
+        """
+        Args:
+            streamer: Stream from client.chat_stream, created with buffer_size=1 so every append is sent
+            max_chars: Buffered characters that are flushed right away (SLACK_STREAM_MAX_CHARS, default 1000)
+            max_delay: Seconds text may stay buffered (SLACK_STREAM_MAX_DELAY, default 1.0)
+            min_interval: Minimum seconds between appends (SLACK_STREAM_MIN_INTERVAL, default 0.5)
+            max_buffer: Buffered characters at which append waits (SLACK_STREAM_MAX_BUFFER, default 12000)
+        """
+        self.streamer = streamer
+        self.max_chars = max_chars
+        self.max_delay = max_delay
+        self.min_interval = min_interval
+        self.max_buffer = max_buffer
+
+        self._buffer = ""
+        self._buffered_at = 0.0
+        # No flush before this, moved forward by every flush and by Retry-After
+        self._not_before = 0.0
+        self._wake = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        # Text Slack rate limited is held in the stream's own buffer until the next append
+        self._held = False
+        self._closing = False
+        self._error: Optional[BaseException] = None
+        self._pump: Optional[asyncio.Task] = None
+
+        self.opened_at = time.monotonic()
+        self.first_text_at: Optional[float] = None
+        self.api_calls = 0
+        self.rate_limited = 0
+
+    async def append(self, markdown_text: str):
+        """Buffer text for the stream, waits only when the buffer is full"""
+        if self._error is not None:
+            raise self._error
+        if self._closing:
+            raise RuntimeError("Stream writer is stopped")
+        if not markdown_text:
+            return
+        if not self._buffer:
+            self._buffered_at = time.monotonic()
+        self._buffer += markdown_text
+        self._drained.clear()
+        if self._pump is None:
+            self._pump = asyncio.create_task(self._run(), name="slack-stream-writer")
+        self._wake.set()
+        if len(self._buffer) >= self.max_buffer:
+            # Backpressure: Slack is rate limiting us, let the model stream wait
+            await self._drained.wait()
+            if self._error is not None:
+                raise self._error
+
+    async def stop(self, **kwargs) -> Any:
+        """
+        Send what is left and finalize the message
+
+        Args:
+            **kwargs: Passed to stop, e.g. blocks=create_feedback_block()
+
+        Returns:
+            Response of chat.stopStream
+        """
+        self._closing = True
+        self._wake.set()
+        if self._pump is not None:
+            await self._pump
+        if self._error is not None:
+            raise self._error
+
+        text, self._buffer = self._buffer, ""
+        for attempt in range(SLACK_STREAM_STOP_ATTEMPTS):
+            await self._wait_until(self._not_before)
+            try:
+                # Text from the first attempt stays in the stream's buffer if it fails
+                response = await _call(self.streamer.stop, markdown_text=text or None, **kwargs)
+            except SlackApiError as e:
+                text = ""
+                delay = retry_after(e)
+                if delay is None or attempt == SLACK_STREAM_STOP_ATTEMPTS - 1:
+                    raise
+                self._rate_limited(delay)
+                continue
+            self.api_calls += 1
+            if self.first_text_at is None:
+                self.first_text_at = time.monotonic()
+            logger.debug(
+                f"Stream finished: {self.api_calls} Slack calls, {self.rate_limited} rate limited, "
+                f"first text after {self.first_text_at - self.opened_at:.2f}s"
+            )
+            return response
+
+    # ----- Background flushing -----
+
+    async def _run(self):
+        try:
+            while not self._closing:
+                delay = self._flush_delay()
+                if delay is None or delay > 0:
+                    self._wake.clear()
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._flush(self._take())
+        except Exception as e:
+            logger.exception("Slack stream append failed")
+            self._error = e
+        finally:
+            self._drained.set()
+
+    def _flush_delay(self) -> Optional[float]:
+        """Seconds until the buffer should be flushed, None to wait for more text"""
+        if not self._buffer and not self._held:
+            self._drained.set()
+            return None
+        due = self._not_before
+        # The first text goes out right away so the reply shows up, later text is batched
+        if self.first_text_at is None:
+            return max(0.0, due - time.monotonic())
+        if not self._held and len(self._buffer) < self.max_chars and PARAGRAPH_BREAK not in self._buffer:
+            due = max(due, self._buffered_at + self.max_delay)
+        return max(0.0, due - time.monotonic())
+
+    def _take(self) -> str:
+        """Everything buffered, or up to the last paragraph break while under max_chars"""
+        cut = len(self._buffer)
+        if cut < self.max_chars:
+            cut = self._buffer.rfind(PARAGRAPH_BREAK) + len(PARAGRAPH_BREAK)
+            if cut < len(PARAGRAPH_BREAK):
+                cut = len(self._buffer)
+        text, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        self._buffered_at = time.monotonic()
+        return text
+
+    async def _flush(self, text: str):
+        try:
+            await _call(self.streamer.append, markdown_text=text)
+        except SlackApiError as e:
+            delay = retry_after(e)
+            if delay is None:
+                raise
+            # The stream kept the text and sends it with the next batch
+            self._held = True
+            self._rate_limited(delay)
+            return
+        self._held = False
+        self.api_calls += 1
+        now = time.monotonic()
+        if self.first_text_at is None:
+            self.first_text_at = now
+        self._not_before = now + self.min_interval
+        if not self._buffer:
+            self._drained.set()
+
+    def _rate_limited(self, delay: float):
+        self.rate_limited += 1
+        self._not_before = time.monotonic() + delay
+        logger.warning(f"Slack rate limited the stream, retrying in {delay:.1f}s")
+
+    @staticmethod
+    async def _wait_until(deadline: float):
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def open_stream(client, **kwargs) -> SlackStreamWriter:
+    """
+    Start a coalescing writer on client.chat_stream
+
+    Args:
+        client: WebClient or AsyncWebClient
+        **kwargs: chat_stream arguments (channel, thread_ts, recipient_team_id, recipient_user_id)
+
+    Returns:
+        SlackStreamWriter whose append and stop are awaited
+    """
+    streamer = client.chat_stream(buffer_size=1, **kwargs)
+    if inspect.isawaitable(streamer):
+        streamer = await streamer
+    return SlackStreamWriter(streamer)
@@ -0,0 +1,246 @@
+"""
+Thread history for agent turns
+Slack threads are fetched once with cursor-paginated conversations.replies
+and then kept up to date from incoming message/app_mention events and the
+bot's own streamed replies, so most turns make no Slack history call.
+Channel threads only deliver mentions as events, so a mention also reads
+the messages posted since the thread was last read from Slack.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from google.genai import types
+from slack_sdk import WebClient
+from slack_sdk.web.async_client import AsyncWebClient
+
+logger = logging.getLogger(__name__)
+
+# Threads kept in memory, least recently used are evicted first
+THREAD_HISTORY_MAX_THREADS = int(os.environ.get("THREAD_HISTORY_MAX_THREADS", "500"))
+# Newest messages kept per thread
+THREAD_HISTORY_MAX_MESSAGES = int(os.environ.get("THREAD_HISTORY_MAX_MESSAGES", "200"))
+# Seconds before a thread is re-read from Slack, channel threads only deliver mentions as events
+THREAD_HISTORY_TTL = float(os.environ.get("THREAD_HISTORY_TTL", "900"))
+# conversations.replies page size on a cache miss
+REPLIES_PAGE_SIZE = 200
+
+
+def _sort_key(message: dict) -> float:
+    return float(message.get("ts") or 0)
+
+
+def _slim(message: dict) -> dict:
+    """Keep only the fields history is built from"""
+    return {k: message[k] for k in ("ts", "text", "user", "bot_id") if k in message}
+
+
+class ThreadHistoryStore:
+    """LRU of Slack thread messages, keyed by (channel, thread_ts)"""
+
+    def __init__(
+        self,
+        max_threads: int = THREAD_HISTORY_MAX_THREADS,
+        max_messages: int = THREAD_HISTORY_MAX_MESSAGES,
+        ttl: float = THREAD_HISTORY_TTL,
+    ):
+        self.max_threads = max_threads
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self._threads: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, channel: str, thread_ts: str) -> Optional[List[dict]]:
+        """Cached messages of a thread, oldest first, or None on a miss"""
+        key = (channel, thread_ts)
+        with self._lock:
+            entry = self._threads.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._threads[key]
+                self.misses += 1
+                return None
+            self._threads.move_to_end(key)
+            self.hits += 1
+            return list(entry[0])
+
+    def synced_ts(self, channel: str, thread_ts: str) -> Optional[str]:
+        """ts of the newest message read from Slack itself, events added since do not count"""
+        with self._lock:
+            entry = self._threads.get((channel, thread_ts))
+            return entry[2] if entry is not None else None
+
+    def seed(self, channel: str, thread_ts: str, messages: List[dict]):
+        """Store a thread fetched from Slack, replacing anything cached"""
+        messages = sorted((_slim(m) for m in messages), key=_sort_key)
+        synced = messages[-1].get("ts") if messages else None
+        if len(messages) > self.max_messages:
+            logger.info(f"Thread {channel}:{thread_ts} has {len(messages)} messages, keeping the newest {self.max_messages}")
+            messages = messages[-self.max_messages:]
+        with self._lock:
+            self._threads[(channel, thread_ts)] = (messages, time.monotonic() + self.ttl, synced)
+            self._threads.move_to_end((channel, thread_ts))
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+
+    def add(self, channel: str, thread_ts: str, message: dict):
+        """Append a message to a cached thread, ignored if the thread is not cached"""
+        if not message.get("ts"):
+            return
+        with self._lock:
+            entry = self._threads.get((channel, thread_ts))
+            if entry is None:
+                return
+            self._insert(entry[0], message)
+
+    def merge(self, channel: str, thread_ts: str, messages: List[dict]):
+        """Add messages read from Slack to a cached thread, ignored if the thread is not cached"""
+        with self._lock:
+            entry = self._threads.get((channel, thread_ts))
+            if entry is None:
+                return
+            synced = entry[2]
+            for message in messages:
+                if message.get("ts"):
+                    self._insert(entry[0], message)
+                    if synced is None or _sort_key(message) > float(synced):
+                        synced = message["ts"]
+            self._threads[(channel, thread_ts)] = (entry[0], entry[1], synced)
+
+    def _insert(self, messages: List[dict], message: dict):
+        if any(m.get("ts") == message["ts"] for m in messages):
+            return
+        messages.append(_slim(message))
+        messages.sort(key=_sort_key)
+        del messages[:-self.max_messages]
+
+    def invalidate(self, channel: str, thread_ts: str):
+        with self._lock:
+            self._threads.pop((channel, thread_ts), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"threads": len(self._threads), "hits": self.hits, "misses": self.misses}
+
+
+thread_history = ThreadHistoryStore()
+
+
+def fetch_thread(client: WebClient, channel: str, thread_ts: str, oldest: Optional[str] = None) -> List[dict]:
+    """Read every message of a thread (or those from oldest on), following conversations.replies cursors"""
+    messages: List[dict] = []
+    cursor = None
+    since = {"oldest": oldest} if oldest else {}
+    while True:
+        replies = client.conversations_replies(
+            channel=channel, ts=thread_ts, inclusive=True, limit=REPLIES_PAGE_SIZE, cursor=cursor, **since
+        )
+        messages.extend(replies["messages"])
+        cursor = (replies.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            return messages
+
+
+async def async_fetch_thread(
+    client: AsyncWebClient, channel: str, thread_ts: str, oldest: Optional[str] = None
+) -> List[dict]:
+    """Async counterpart of fetch_thread"""
+    messages: List[dict] = []
+    cursor = None
+    since = {"oldest": oldest} if oldest else {}
+    while True:
+        replies = await client.conversations_replies(
+            channel=channel, ts=thread_ts, inclusive=True, limit=REPLIES_PAGE_SIZE, cursor=cursor, **since
+        )
+        messages.extend(replies["messages"])
+        cursor = (replies.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            return messages
+
+
+def load_thread(client: WebClient, channel: str, thread_ts: str, catch_up: bool = False) -> List[dict]:
+    """
+    Thread messages from the store, fetched from Slack and stored on a miss
+
+    Args:
+        catch_up: Also read the messages posted since the thread was last read from Slack,
+            for channel threads where other people's messages arrive as no event
+    """
+    messages = thread_history.get(channel, thread_ts)
+    if messages is None:
+        thread_history.seed(channel, thread_ts, fetch_thread(client, channel, thread_ts))
+    elif catch_up:
+        oldest = thread_history.synced_ts(channel, thread_ts)
+        thread_history.merge(channel, thread_ts, fetch_thread(client, channel, thread_ts, oldest=oldest))
+    else:
+        return messages
+    return thread_history.get(channel, thread_ts) or []
+
+
+async def async_load_thread(
+    client: AsyncWebClient, channel: str, thread_ts: str, catch_up: bool = False
+) -> List[dict]:
+    """Async counterpart of load_thread"""
+    messages = thread_history.get(channel, thread_ts)
+    if messages is None:
+        thread_history.seed(channel, thread_ts, await async_fetch_thread(client, channel, thread_ts))
+    elif catch_up:
+        oldest = thread_history.synced_ts(channel, thread_ts)
+        thread_history.merge(channel, thread_ts, await async_fetch_thread(client, channel, thread_ts, oldest=oldest))
+    else:
+        return messages
+    return thread_history.get(channel, thread_ts) or []
+
+
+def record_reply(channel: str, thread_ts: str, stop_response, text: Optional[str], bot_id: Optional[str]):
+    """Add the bot's streamed answer to the thread once the stream has stopped"""
+    if not text:
+        return
+    ts = (stop_response.get("ts") if stop_response is not None else None) or f"{time.time():.6f}"
+    thread_history.add(channel, thread_ts, {"ts": ts, "text": text, "bot_id": bot_id or "self"})
+
+
+def build_history(
+    messages: List[dict], current_ts: Optional[str] = None, since_ts: Optional[str] = None
+) -> Tuple[List[types.Content], str]:
+    """
+    Turn thread messages into Gemini history and the query being answered
+
+    Args:
+        messages: Thread messages, oldest first, including the one being answered
+        current_ts: ts of the message being answered. User messages after it belong
+            to later turns and are left out. Defaults to the latest message.
+        since_ts: Only user messages posted after this ts are kept, bot messages are left
+            out. Catches a stored conversation up with what others said since its last turn.
+
+    Returns:
+        Gemini contents for the earlier messages, and the text of the message being answered
+    """
+    if current_ts is None or not any(msg.get("ts") == current_ts for msg in messages):
+        current_ts = messages[-1].get("ts")
+        current = messages[-1]
+    else:
+        current = next(msg for msg in messages if msg.get("ts") == current_ts)
+
+    messages_in_thread = []
+    for msg in messages:
+        if msg is current:
+            continue
+        is_bot = bool(msg.get("bot_id"))
+        if not is_bot and _sort_key(msg) > float(current_ts or 0):
+            continue
+        if since_ts is not None and (is_bot or _sort_key(msg) <= float(since_ts)):
+            continue
+        messages_in_thread.append({"role": "model" if is_bot else "user", "content": msg["text"]})
+
+    # Build Gemini history (exclude the message being answered)
+    history = [
+        types.Content(role=msg["role"], parts=[types.Part(text=msg["content"])])
+        for msg in messages_in_thread
+    ]
+    return history, current["text"]
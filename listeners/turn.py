@@ -0,0 +1,113 @@
+"""
+One agent turn, shared by the assistant and app_mention listeners
+Sync listeners run it on the agent runtime, async listeners on the app's own
+event loop. Callers only differ in their Slack client and status adapter.
+"""
+import asyncio
+from logging import Logger
+from typing import Any, Awaitable, Callable, Optional
+
+from slack_sdk.web.async_client import AsyncWebClient
+
+from ai.agent import run_gemini_with_tools
+from ai.scheduler import TurnRejected, get_turn_scheduler, run_in_background
+from salesforce.mcp_pool import SessionUnavailable, get_mcp_pool
+
+from .stream_writer import open_stream
+from .thread_history import async_load_thread, build_history, load_thread, record_reply, thread_history
+from .views.feedback_block import create_feedback_block
+
+THINKING_MESSAGES = [
+    "Spinning up Salesforce tools...",
+    "Waking up the AI...",
+    "Connecting to your org...",
+]
+
+
+async def run_turn(
+    client,
+    set_status: Callable[..., Awaitable[Any]],
+    logger: Logger,
+    message: dict,
+    channel_id: str,
+    thread_ts: str,
+    team_id: Optional[str],
+    user_id: Optional[str],
+    bot_id: Optional[str],
+    received_at: float,
+    catch_up: bool = False,
+):
+    """
+    Queue a turn with the turn scheduler and stream the answer once it is admitted
+
+    Args:
+        client: WebClient or AsyncWebClient of the listener
+        set_status: Coroutine function taking status (and optionally loading_messages)
+            that sets the assistant thread status
+        logger: Logger instance for error tracking
+        message: The message or app_mention event being answered
+        channel_id: Channel of the thread
+        thread_ts: ts of the thread's parent message
+        team_id: Workspace of the user, for chat_stream
+        user_id: Slack user who sent the message
+        bot_id: The bot's own id, marks its replies in the thread history
+        received_at: time.monotonic() when the event arrived
+        catch_up: Read what was posted since the cached copy of the thread was last read from
+            Slack, for channel threads where only mentions arrive as events
+
+    Raises:
+        TurnRejected: If the turn queue is full, or no MCP session frees up in time
+    """
+    # Keep a cached copy of this thread current without asking Slack
+    thread_history.add(channel_id, thread_ts, message)
+
+    async def turn():
+        # Read history once the turn is admitted, so it includes earlier turns of this thread
+        if isinstance(client, AsyncWebClient):
+            messages = await async_load_thread(client, channel_id, thread_ts, catch_up)
+        else:
+            messages = await asyncio.to_thread(load_thread, client, channel_id, thread_ts, catch_up)
+        history, user_query = build_history(messages, message.get("ts"))
+
+        try:
+            # Borrow a warm session instead of spawning a new server per message
+            async with get_mcp_pool().session() as mcp_client:
+                # Deltas are batched into a few chat.appendStream calls
+                streamer = await open_stream(
+                    client,
+                    channel=channel_id,
+                    recipient_team_id=team_id,
+                    recipient_user_id=user_id,
+                    thread_ts=thread_ts,
+                )
+
+                answer = await run_gemini_with_tools(
+                    user_query=user_query,
+                    history=history,
+                    mcp_client=mcp_client,
+                    streamer=streamer,
+                    logger=logger,
+                    conversation_key=f"{channel_id}:{thread_ts}",
+                    message_ts=message.get("ts"),
+                    history_since=lambda ts: build_history(messages, message.get("ts"), since_ts=ts)[0],
+                )
+
+                response = await streamer.stop(blocks=create_feedback_block())
+                record_reply(channel_id, thread_ts, response, answer, bot_id)
+        except SessionUnavailable as e:
+            # More turns admitted than MCP sessions, answer like a full queue
+            logger.warning(f"Turn in {channel_id}:{thread_ts} turned away: {e}")
+            raise TurnRejected(str(e)) from e
+
+    # The status waits for the rate limiter on its own, the turn starts right away
+    thinking = run_in_background(set_status(status="thinking...", loading_messages=THINKING_MESSAGES))
+    try:
+        await get_turn_scheduler().run(
+            f"{channel_id}:{thread_ts}",
+            user_id,
+            turn,
+            on_queued=lambda ahead: set_status(status=f"waiting in line ({ahead} ahead)..."),
+            received_at=received_at,
+        )
+    finally:
+        thinking.cancel()
@@ -0,0 +1,400 @@
+"""
+Async Salesforce REST API Client
+Same surface as SalesforceClient on a pooled httpx.AsyncClient, so many
+Salesforce calls can be in flight at once on one event loop. The access
+token comes from the same shared token cache as the sync client.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+try:
+    from .client import (
+        SALESFORCE_CONNECT_TIMEOUT,
+        SALESFORCE_POOL_SIZE,
+        SALESFORCE_READ_TIMEOUT,
+        _is_invalid_session,
+        account_360_request,
+        account_360_result,
+        collection_batches,
+        collection_request,
+        collection_skipped,
+    )
+    from .token_manager import TokenManager, default_cache_path
+except ImportError:
+    # Run as a script from the salesforce directory (stdio transport)
+    from client import (
+        SALESFORCE_CONNECT_TIMEOUT,
+        SALESFORCE_POOL_SIZE,
+        SALESFORCE_READ_TIMEOUT,
+        _is_invalid_session,
+        account_360_request,
+        account_360_result,
+        collection_batches,
+        collection_request,
+        collection_skipped,
+    )
+    from token_manager import TokenManager, default_cache_path
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Requests in flight at once per client, SALESFORCE_POOL_SIZE of their connections are kept alive
+SALESFORCE_MAX_CONNECTIONS = int(os.environ.get("SALESFORCE_MAX_CONNECTIONS", "50"))
+
+
+def create_http_client(
+    max_connections: int = SALESFORCE_MAX_CONNECTIONS,
+    pool_size: int = SALESFORCE_POOL_SIZE,
+) -> httpx.AsyncClient:
+    """
+    Async HTTP client reusing keep-alive TLS connections to Salesforce
+
+    Args:
+        max_connections: Connections open at once, further requests wait for one (SALESFORCE_MAX_CONNECTIONS, default 50)
+        pool_size: Idle connections kept open (SALESFORCE_POOL_SIZE, default 10)
+
+    Returns:
+        httpx.AsyncClient with gzip enabled and connect/read timeouts set
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=pool_size),
+        timeout=httpx.Timeout(SALESFORCE_READ_TIMEOUT, connect=SALESFORCE_CONNECT_TIMEOUT),
+    )
+
+
+class AsyncSalesforceClient:
+    """Async client for interacting with Salesforce REST API"""
+
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        """Initialize Salesforce client with OAuth credentials from environment
+
+        Args:
+            http_client: HTTP client to send requests through, a pooled one is created by default
+        """
+        self.http = http_client or create_http_client()
+        self.client_id = os.environ.get("SALESFORCE_CLIENT_ID")
+        self.client_secret = os.environ.get("SALESFORCE_CLIENT_SECRET")
+        self.instance_url = os.environ.get("SALESFORCE_INSTANCE_URL")
+        self.access_token = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        if not all([self.client_id, self.client_secret]):
+            logger.warning("Salesforce credentials not fully configured")
+            self.tokens = None
+        else:
+            # Shared with sync clients and other processes through the token cache file
+            self.tokens = TokenManager(
+                self._request_token,
+                cache_path=default_cache_path(self.client_id, self._token_url()),
+            )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def authenticate_client_credentials(self) -> Dict[str, Any]:
+        """
+        Authenticate using client_credentials grant type (server-to-server OAuth)
+        A cached token that is not about to expire is reused instead of logging in again.
+
+        Returns:
+            Dictionary containing access_token, instance_url, and other token details
+        """
+        if self.tokens is None:
+            raise ValueError("SALESFORCE_CLIENT_ID and SALESFORCE_CLIENT_SECRET are required")
+
+        token = await self._token()
+        logger.info(f"Successfully authenticated with client_credentials. Instance: {self.instance_url}")
+        return token["response"]
+
+    async def close(self):
+        """Close the pooled connections"""
+        await self.http.aclose()
+
+    def get_api_version(self) -> str:
+        """Get the latest API version, defaults to v59.0"""
+        return os.environ.get("SALESFORCE_API_VERSION", "v59.0")
+
+    async def get_accounts(self, limit: int = 10, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieve Salesforce accounts
+
+        Args:
+            limit: Maximum number of accounts to retrieve
+            fields: List of fields to retrieve (defaults to common fields)
+
+        Returns:
+            List of account dictionaries
+        """
+        if fields is None:
+            fields = ["Id", "Name", "Type", "Industry", "Phone", "Website", "BillingCity", "BillingState"]
+
+        query = f"SELECT {', '.join(fields)} FROM Account LIMIT {limit}"
+        response = await self._make_request("GET", f"/services/data/{self.get_api_version()}/query", params={"q": query})
+        return response.get("records", [])
+
+    async def get_account_by_id(self, account_id: str, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Retrieve a specific Salesforce account by ID
+
+        Args:
+            account_id: Salesforce Account ID
+            fields: List of fields to retrieve
+
+        Returns:
+            Account dictionary
+        """
+        endpoint = f"/services/data/{self.get_api_version()}/sobjects/Account/{account_id}"
+        if fields:
+            endpoint = f"{endpoint}?fields={','.join(fields)}"
+
+        return await self._make_request("GET", endpoint)
+
+    async def search_accounts(self, search_term: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Search for accounts by name or other fields
+
+        Args:
+            search_term: Search term
+            limit: Maximum number of results
+
+        Returns:
+            List of matching accounts
+        """
+        # Using SOSL (Salesforce Object Search Language)
+        search_query = f"FIND {{{search_term}}} IN ALL FIELDS RETURNING Account(Id, Name, Type, Industry, Phone, Website) LIMIT {limit}"
+
+        response = await self._make_request("GET", f"/services/data/{self.get_api_version()}/search", params={"q": search_query})
+        return response.get("searchRecords", [])
+
+    async def create_account(self, account_data: Dict[str, Any]) -> str:
+        """
+        Create a new Salesforce account
+
+        Args:
+            account_data: Dictionary containing account fields (e.g., {"Name": "Acme Corp", "Type": "Customer"})
+
+        Returns:
+            ID of the created account
+        """
+        endpoint = f"/services/data/{self.get_api_version()}/sobjects/Account"
+
+        response = await self._make_request("POST", endpoint, json=account_data)
+        return response.get("id")
+
+    async def update_account(self, account_id: str, account_data: Dict[str, Any]) -> bool:
+        """
+        Update an existing Salesforce account
+
+        Args:
+            account_id: Salesforce Account ID
+            account_data: Dictionary containing fields to update
+
+        Returns:
+            True if successful
+        """
+        endpoint = f"/services/data/{self.get_api_version()}/sobjects/Account/{account_id}"
+
+        await self._make_request("PATCH", endpoint, json=account_data)
+        return True
+
+    async def delete_account(self, account_id: str) -> bool:
+        """
+        Delete a Salesforce account
+
+        Args:
+            account_id: Salesforce Account ID
+
+        Returns:
+            True if successful
+        """
+        endpoint = f"/services/data/{self.get_api_version()}/sobjects/Account/{account_id}"
+
+        await self._make_request("DELETE", endpoint)
+        return True
+
+    async def create_accounts(self, records: List[Dict[str, Any]], all_or_none: bool = False) -> List[Dict[str, Any]]:
+        """
+        Create many Salesforce accounts, up to 200 per request
+
+        Args:
+            records: Account field dictionaries, e.g. [{"Name": "Acme Corp", "Type": "Customer"}]
+            all_or_none: Roll back a batch of 200 when any of its records fails
+
+        Returns:
+            Result per record in input order, each with id, success and errors
+        """
+        return await self._collection("POST", records, all_or_none)
+
+    async def update_accounts(self, records: List[Dict[str, Any]], all_or_none: bool = False) -> List[Dict[str, Any]]:
+        """
+        Update many Salesforce accounts, up to 200 per request
+
+        Args:
+            records: Dictionaries of the fields to update, each with the account's Id
+            all_or_none: Roll back a batch of 200 when any of its records fails
+
+        Returns:
+            Result per record in input order, each with id, success and errors
+        """
+        return await self._collection("PATCH", records, all_or_none)
+
+    async def delete_accounts(self, account_ids: List[str], all_or_none: bool = False) -> List[Dict[str, Any]]:
+        """
+        Delete many Salesforce accounts, up to 200 per request
+
+        Args:
+            account_ids: Salesforce Account IDs
+            all_or_none: Roll back a batch of 200 when any of its records fails
+
+        Returns:
+            Result per record in input order, each with id, success and errors
+        """
+        return await self._collection("DELETE", account_ids, all_or_none)
+
+    async def _collection(self, method: str, items: List[Any], all_or_none: bool) -> List[Dict[str, Any]]:
+        """Send records through sObject Collections in batches, stopping after a rolled back batch"""
+        endpoint = f"/services/data/{self.get_api_version()}/composite/sobjects"
+        results = []
+        # One batch at a time, parallel batches would contend for the same record locks
+        for batch in collection_batches(method, items):
+            if all_or_none and any(not r.get("success") for r in results):
+                results.extend(collection_skipped(batch))
+                continue
+            results.extend(await self._make_request(method, endpoint, **collection_request(method, batch, all_or_none)))
+        return results
+
+    async def get_account_opportunities(self, account_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Get opportunities associated with an account
+
+        Args:
+            account_id: Salesforce Account ID
+            limit: Maximum number of opportunities to retrieve
+
+        Returns:
+            List of opportunity dictionaries
+        """
+        query = f"SELECT Id, Name, StageName, Amount, CloseDate FROM Opportunity WHERE AccountId = '{account_id}' LIMIT {limit}"
+
+        response = await self._make_request("GET", f"/services/data/{self.get_api_version()}/query", params={"q": query})
+        return response.get("records", [])
+
+    async def get_account_contacts(self, account_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Get contacts associated with an account
+
+        Args:
+            account_id: Salesforce Account ID
+            limit: Maximum number of contacts to retrieve
+
+        Returns:
+            List of contact dictionaries
+        """
+        query = f"SELECT Id, Name, Email, Phone, Title FROM Contact WHERE AccountId = '{account_id}' LIMIT {limit}"
+
+        response = await self._make_request("GET", f"/services/data/{self.get_api_version()}/query", params={"q": query})
+        return response.get("records", [])
+
+    async def get_account_360(self, account: str, contact_limit: int = 10, opportunity_limit: int = 10) -> Dict[str, Any]:
+        """
+        Get an account with its contacts and opportunities in one composite request
+
+        Args:
+            account: Salesforce Account ID, or a name to look the account up by
+            contact_limit: Maximum number of contacts to retrieve
+            opportunity_limit: Maximum number of opportunities to retrieve
+
+        Returns:
+            Dictionary with account, other_matches, contacts, opportunities and any per-part errors
+        """
+        endpoint = f"/services/data/{self.get_api_version()}/composite"
+        body = account_360_request(self.get_api_version(), account, contact_limit, opportunity_limit)
+
+        return account_360_result(await self._make_request("POST", endpoint, json=body))
+
+    def _token_url(self) -> str:
+        base_url = self.instance_url or os.environ.get("SALESFORCE_INSTANCE_URL", "https://orgfarm-f2b8e19683-dev-ed.develop.my.salesforce.com")
+        if "/services/oauth2/token" in base_url:
+            return base_url
+        return f"{base_url}/services/oauth2/token"
+
+    def _request_token(self) -> Dict[str, Any]:
+        """Log in with the client_credentials grant, called by the token manager in a worker thread"""
+        # The login goes through the pooled client on the loop that is waiting for it
+        return asyncio.run_coroutine_threadsafe(self._login(), self._loop).result()
+
+    async def _login(self) -> Dict[str, Any]:
+        token_url = self._token_url()
+        payload = {
+            'grant_type': 'client_credentials',
+            'client_id': self.client_id,
+            'client_secret': self.client_secret
+        }
+
+        logger.info(f"Authenticating with client_credentials grant type to {token_url}")
+        response = await self.http.post(token_url, data=payload)
+        response.raise_for_status()
+        return response.json()
+
+    async def _token(self, stale: Optional[str] = None) -> Dict[str, Any]:
+        """Cached token, the token manager only runs in a worker thread when a refresh is due"""
+        token = None if stale else self.tokens.cached()
+        if token is None:
+            self._loop = asyncio.get_running_loop()
+            if stale:
+                token = await asyncio.to_thread(self.tokens.refresh, stale)
+            else:
+                token = await asyncio.to_thread(self.tokens.get)
+        self.access_token = token["access_token"]
+        self.instance_url = token.get("instance_url") or self.instance_url
+        return token
+
+    async def _make_request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
+        """
+        Make an authenticated HTTP request to Salesforce API
+
+        Args:
+            method: HTTP method (GET, POST, PATCH, DELETE)
+            endpoint: API endpoint path (e.g., /services/data/v59.0/query)
+            **kwargs: Additional arguments to pass to httpx (params, json, etc.)
+
+        Returns:
+            JSON response from Salesforce
+        """
+        if self.tokens is not None:
+            access_token = (await self._token())["access_token"]
+        elif self.access_token:
+            access_token = self.access_token
+        else:
+            raise ValueError("No access token. Please authenticate first.")
+
+        if not self.instance_url:
+            raise ValueError("Instance URL not configured")
+
+        response = await self._send(method, endpoint, access_token, **kwargs)
+        if response.status_code == 401 and self.tokens is not None and _is_invalid_session(response):
+            # Revoked or timed out early, log in again once and replay the request
+            logger.info("Salesforce session expired, retrying with a new token")
+            access_token = (await self._token(stale=access_token))["access_token"]
+            response = await self._send(method, endpoint, access_token, **kwargs)
+        response.raise_for_status()
+
+        # DELETE and PATCH of a single record answer 204 without a body
+        if response.status_code == 204 or not response.content:
+            return {}
+
+        return response.json()
+
+    async def _send(self, method: str, endpoint: str, access_token: str, **kwargs) -> httpx.Response:
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json"
+        }
+        return await self.http.request(method, f"{self.instance_url}{endpoint}", headers=headers, **kwargs)
@@ -4,23 +4,68 @@ Handles OAuth authentication and API requests to Salesforce
 """
 import os
 import logging
+import re
 import requests
+from urllib.parse import quote
+from requests.adapters import HTTPAdapter
 from typing import Optional, Dict, Any, List
 from dotenv import load_dotenv
+try:
+    from .token_manager import TokenManager, default_cache_path
+except ImportError:
+    # Run as a script from the salesforce directory (stdio transport)
+    from token_manager import TokenManager, default_cache_path
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Keep-alive connections kept per host, about one per concurrent tool call
+SALESFORCE_POOL_SIZE = int(os.environ.get("SALESFORCE_POOL_SIZE", "10"))
+# Seconds to open a connection and to wait for a response
+SALESFORCE_CONNECT_TIMEOUT = float(os.environ.get("SALESFORCE_CONNECT_TIMEOUT", "5"))
+SALESFORCE_READ_TIMEOUT = float(os.environ.get("SALESFORCE_READ_TIMEOUT", "30"))
+
+ACCOUNT_360_FIELDS = [
+    "Id", "Name", "Type", "Industry", "Phone", "Website", "BillingCity", "BillingState", "BillingCountry",
+    "AnnualRevenue", "NumberOfEmployees", "OwnerId",
+]
+# Accounts matched by name that are returned besides the one described
+ACCOUNT_360_MATCHES = 5
+# Records per sObject Collections request, the API maximum
+COLLECTION_BATCH_SIZE = 200
+
+
+def create_session(pool_size: int = SALESFORCE_POOL_SIZE) -> requests.Session:
+    """
+    HTTP session reusing keep-alive TLS connections to Salesforce
+    
+    Args:
+        pool_size: Connections kept open per host (SALESFORCE_POOL_SIZE, default 10)
+        
+    Returns:
+        Session with gzip enabled and a connection pool mounted for http and https
+    """
+    session = requests.Session()
+    # Calls beyond the pool size open extra connections instead of waiting, only pool_size are kept
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+    return session
+
 
 class SalesforceClient:
     """Client for interacting with Salesforce REST API"""
     
-    def __init__(self, auto_auth: bool = False):
+    def __init__(self, auto_auth: bool = False, session: Optional[requests.Session] = None):
         """Initialize Salesforce client with OAuth credentials from environment
         
         Args:
             auto_auth: If True, automatically authenticate using client_credentials grant type
+            session: HTTP session to send requests through, a pooled one is created by default
         """
+        self.session = session or create_session()
+        self.timeout = (SALESFORCE_CONNECT_TIMEOUT, SALESFORCE_READ_TIMEOUT)
         self.client_id = os.environ.get("SALESFORCE_CLIENT_ID")
         self.client_secret = os.environ.get("SALESFORCE_CLIENT_SECRET")
         # self.redirect_uri = os.environ.get("SALESFORCE_REDIRECT_URI")
@@ -32,6 +77,13 @@ class SalesforceClient:
         # print(self.instance_url)
         if not all([self.client_id, self.client_secret]):
             logger.warning("Salesforce credentials not fully configured")
+            self.tokens = None
+        else:
+            # Shared with other clients and processes through the token cache file
+            self.tokens = TokenManager(
+                self._request_token,
+                cache_path=default_cache_path(self.client_id, self._token_url()),
+            )
         
         # Auto-authenticate using client_credentials if requested
         if auto_auth and self.client_id and self.client_secret:
@@ -45,21 +97,29 @@ class SalesforceClient:
         Authenticate using client_credentials grant type (server-to-server OAuth)
         This flow is designed for server-to-server authentication and provides
         long-lived access tokens without requiring user interaction.
+        A cached token that is not about to expire is reused instead of logging in again.
         
         Returns:
             Dictionary containing access_token, instance_url, and other token details
         """
-        if not self.client_id or not self.client_secret:
+        if self.tokens is None:
             raise ValueError("SALESFORCE_CLIENT_ID and SALESFORCE_CLIENT_SECRET are required")
         
+        token = self._use_token(self.tokens.get())
+        logger.info(f"Successfully authenticated with client_credentials. Instance: {self.instance_url}")
+        return token["response"]
+    
+    def _token_url(self) -> str:
         # Use instance_url if set, otherwise use default login URL
         base_url = self.instance_url or os.environ.get("SALESFORCE_INSTANCE_URL", "https://orgfarm-f2b8e19683-dev-ed.develop.my.salesforce.com")
         # Remove /services/oauth2/token if already in instance_url
         if "/services/oauth2/token" in base_url:
-            token_url = base_url
-        else:
-            token_url = f"{base_url}/services/oauth2/token"
-        
+            return base_url
+        return f"{base_url}/services/oauth2/token"
+    
+    def _request_token(self) -> Dict[str, Any]:
+        """Log in with the client_credentials grant, called by the token manager"""
+        token_url = self._token_url()
         payload = {
             'grant_type': 'client_credentials',
             'client_id': self.client_id,
@@ -67,17 +127,18 @@ class SalesforceClient:
         }
         
         logger.info(f"Authenticating with client_credentials grant type to {token_url}")
-        response = requests.post(token_url, data=payload)
+        response = self.session.post(token_url, data=payload, timeout=self.timeout)
         response.raise_for_status()
-        
-        token_data = response.json()
-        
-        # Store tokens
-        self.access_token = token_data.get("access_token")
-        self.instance_url = token_data.get("instance_url")
-        
-        logger.info(f"Successfully authenticated with client_credentials. Instance: {self.instance_url}")
-        return token_data
+        return response.json()
+    
+    def _use_token(self, token: Dict[str, Any]) -> Dict[str, Any]:
+        self.access_token = token["access_token"]
+        self.instance_url = token.get("instance_url") or self.instance_url
+        return token
+    
+    def close(self):
+        """Close the pooled connections"""
+        self.session.close()
     
     def get_api_version(self) -> str:
         """Get the latest API version, defaults to v59.0"""
@@ -194,6 +255,56 @@ class SalesforceClient:
         self._make_request("DELETE", endpoint)
         return True
     
+    def create_accounts(self, records: List[Dict[str, Any]], all_or_none: bool = False) -> List[Dict[str, Any]]:
+        """
+        Create many Salesforce accounts, up to 200 per request
+        
+        Args:
+            records: Account field dictionaries, e.g. [{"Name": "Acme Corp", "Type": "Customer"}]
+            all_or_none: Roll back a batch of 200 when any of its records fails
+            
+        Returns:
+            Result per record in input order, each with id, success and errors
+        """
+        return self._collection("POST", records, all_or_none)
+    
+    def update_accounts(self, records: List[Dict[str, Any]], all_or_none: bool = False) -> List[Dict[str, Any]]:
+        """
+        Update many Salesforce accounts, up to 200 per request
+        
+        Args:
+            records: Dictionaries of the fields to update, each with the account's Id
+            all_or_none: Roll back a batch of 200 when any of its records fails
+            
+        Returns:
+            Result per record in input order, each with id, success and errors
+        """
+        return self._collection("PATCH", records, all_or_none)
+    
+    def delete_accounts(self, account_ids: List[str], all_or_none: bool = False) -> List[Dict[str, Any]]:
+        """
+        Delete many Salesforce accounts, up to 200 per request
+        
+        Args:
+            account_ids: Salesforce Account IDs
+            all_or_none: Roll back a batch of 200 when any of its records fails
+            
+        Returns:
+            Result per record in input order, each with id, success and errors
+        """
+        return self._collection("DELETE", account_ids, all_or_none)
+    
+    def _collection(self, method: str, items: List[Any], all_or_none: bool) -> List[Dict[str, Any]]:
+        """Send records through sObject Collections in batches, stopping after a rolled back batch"""
+        endpoint = f"/services/data/{self.get_api_version()}/composite/sobjects"
+        results = []
+        for batch in collection_batches(method, items):
+            if all_or_none and any(not r.get("success") for r in results):
+                results.extend(collection_skipped(batch))
+                continue
+            results.extend(self._make_request(method, endpoint, **collection_request(method, batch, all_or_none)))
+        return results
+    
     def get_account_opportunities(self, account_id: str, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Get opportunities associated with an account
@@ -232,6 +343,23 @@ class SalesforceClient:
         response = self._make_request("GET", endpoint, params=params)
         return response.get("records", [])
     
+    def get_account_360(self, account: str, contact_limit: int = 10, opportunity_limit: int = 10) -> Dict[str, Any]:
+        """
+        Get an account with its contacts and opportunities in one composite request
+        
+        Args:
+            account: Salesforce Account ID, or a name to look the account up by
+            contact_limit: Maximum number of contacts to retrieve
+            opportunity_limit: Maximum number of opportunities to retrieve
+            
+        Returns:
+            Dictionary with account, other_matches, contacts, opportunities and any per-part errors
+        """
+        endpoint = f"/services/data/{self.get_api_version()}/composite"
+        body = account_360_request(self.get_api_version(), account, contact_limit, opportunity_limit)
+        
+        return account_360_result(self._make_request("POST", endpoint, json=body))
+    
     def _make_request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
         """
         Make an authenticated HTTP request to Salesforce API
@@ -244,27 +372,148 @@ class SalesforceClient:
         Returns:
             JSON response from Salesforce
         """
-        if not self.access_token:
-            # Try to authenticate if we don't have a token
-            if self.client_id and self.client_secret:
-                self.authenticate_client_credentials()
-            else:
-                raise ValueError("No access token. Please authenticate first.")
+        if self.tokens is not None:
+            # Cached token, refreshed ahead of expiry
+            access_token = self._use_token(self.tokens.get())["access_token"]
+        elif self.access_token:
+            access_token = self.access_token
+        else:
+            raise ValueError("No access token. Please authenticate first.")
         
         if not self.instance_url:
             raise ValueError("Instance URL not configured")
         
-        url = f"{self.instance_url}{endpoint}"
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.request(method, url, headers=headers, **kwargs)
+        kwargs.setdefault("timeout", self.timeout)
+        response = self._send(method, endpoint, access_token, **kwargs)
+        if response.status_code == 401 and self.tokens is not None and _is_invalid_session(response):
+            # Revoked or timed out early, log in again once and replay the request
+            logger.info("Salesforce session expired, retrying with a new token")
+            access_token = self._use_token(self.tokens.refresh(stale=access_token))["access_token"]
+            response = self._send(method, endpoint, access_token, **kwargs)
         response.raise_for_status()
         
-        # DELETE requests may not return JSON
-        if method == "DELETE":
+        # DELETE and PATCH of a single record answer 204 without a body
+        if response.status_code == 204 or not response.content:
             return {}
         
         return response.json()
+    
+    def _send(self, method: str, endpoint: str, access_token: str, **kwargs) -> requests.Response:
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json"
+        }
+        return self.session.request(method, f"{self.instance_url}{endpoint}", headers=headers, **kwargs)
+
+
+def _is_invalid_session(response: requests.Response) -> bool:
+    """Whether a 401 says the access token is no longer valid"""
+    try:
+        errors = response.json()
+    except ValueError:
+        return False
+    return isinstance(errors, list) and any(
+        isinstance(error, dict) and error.get("errorCode") == "INVALID_SESSION_ID" for error in errors
+    )
+
+
+
+def soql_quote(value: str) -> str:
+    """SOQL string literal"""
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def _is_record_id(value: str) -> bool:
+    return bool(re.fullmatch(r"[a-zA-Z0-9]{15}(?:[a-zA-Z0-9]{3})?", value)) and any(c.isdigit() for c in value)
+
+
+def account_360_request(api_version: str, account: str, contact_limit: int, opportunity_limit: int) -> Dict[str, Any]:
+    """
+    Composite request body fetching an account, its contacts and its opportunities
+
+    The contact and opportunity queries reference the Id found by the account
+    query, so a name lookup needs no extra round trip.
+    """
+    fields = ", ".join(ACCOUNT_360_FIELDS)
+    if _is_record_id(account):
+        account_query = f"SELECT {fields} FROM Account WHERE Id = {soql_quote(account)}"
+    else:
+        # Wildcards in the name are matched literally
+        pattern = soql_quote(account)[1:-1].replace("%", "\\%").replace("_", "\\_")
+        account_query = (
+            f"SELECT {fields} FROM Account WHERE Name LIKE '%{pattern}%' "
+            f"ORDER BY LastModifiedDate DESC LIMIT {ACCOUNT_360_MATCHES}"
+        )
+    account_id = "'@{account.records[0].Id}'"
+    queries = {
+        "account": account_query,
+        "contacts": f"SELECT Id, Name, Email, Phone, Title FROM Contact WHERE AccountId = {account_id} LIMIT {contact_limit}",
+        "opportunities": (
+            f"SELECT Id, Name, StageName, Amount, CloseDate FROM Opportunity WHERE AccountId = {account_id} "
+            f"ORDER BY CloseDate DESC LIMIT {opportunity_limit}"
+        ),
+    }
+    return {
+        "allOrNone": False,
+        "compositeRequest": [
+            # References are resolved in the URL, so their characters stay unescaped
+            {"method": "GET", "url": f"/services/data/{api_version}/query?q={quote(query, safe='@{}[].')}", "referenceId": ref}
+            for ref, query in queries.items()
+        ],
+    }
+
+
+def account_360_result(response: Dict[str, Any]) -> Dict[str, Any]:
+    """Account, contacts and opportunities out of the composite response of account_360_request"""
+    parts = {part["referenceId"]: part for part in response.get("compositeResponse", [])}
+    accounts = parts.get("account", {}).get("body") or {}
+    records = accounts.get("records", []) if isinstance(accounts, dict) else []
+    result = {
+        "account": records[0] if records else None,
+        "other_matches": [{"Id": r.get("Id"), "Name": r.get("Name")} for r in records[1:]],
+        "contacts": [],
+        "opportunities": [],
+    }
+    if not records and parts.get("account", {}).get("httpStatusCode", 200) < 300:
+        # Nothing matched, the dependent queries failed on the missing reference
+        return result
+    errors = {}
+    for ref in ("account", "contacts", "opportunities"):
+        part = parts.get(ref, {})
+        if part.get("httpStatusCode", 500) >= 300:
+            errors[ref] = part.get("body")
+        elif ref != "account":
+            result[ref] = part["body"].get("records", [])
+    if errors:
+        result["errors"] = errors
+    return result
+
+
+def collection_batches(method: str, items: List[Any]) -> List[List[Any]]:
+    """Split records (IDs for DELETE) into sObject Collections batches"""
+    if method == "PATCH":
+        missing = [i for i, record in enumerate(items) if not record.get("Id")]
+        if missing:
+            raise ValueError(f"Records to update need an Id, missing at positions {missing}")
+    return [items[i:i + COLLECTION_BATCH_SIZE] for i in range(0, len(items), COLLECTION_BATCH_SIZE)]
+
+
+def collection_request(method: str, batch: List[Any], all_or_none: bool) -> Dict[str, Any]:
+    """Request arguments of one sObject Collections call for Account records"""
+    if method == "DELETE":
+        return {"params": {"ids": ",".join(batch), "allOrNone": str(all_or_none).lower()}}
+    records = [{"attributes": {"type": "Account"}, **record} for record in batch]
+    return {"json": {"allOrNone": all_or_none, "records": records}}
+
+
+def collection_skipped(batch: List[Any]) -> List[Dict[str, Any]]:
+    """Results of a batch left unsent because an earlier allOrNone batch was rolled back"""
+    message = "Not sent, an earlier batch was rolled back (allOrNone)"
+    return [
+        {
+            "id": item if isinstance(item, str) else item.get("Id"),
+            "success": False,
+            "errors": [{"statusCode": "ALL_OR_NONE_OPERATION_ROLLED_BACK", "message": message}],
+        }
+        for item in batch
+    ]
@@ -1,9 +1,15 @@
 import asyncio
-from typing import Optional
+import logging
+from typing import Any, Callable, Dict, List, Optional
 from contextlib import AsyncExitStack
 
+import httpx
 from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
 from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.memory import create_connected_server_and_client_session
+from mcp.types import CallToolResult, ListToolsResult, ServerNotification, ToolListChangedNotification
 
 # from anthropic import Anthropic
 # from openai import OpenAI
@@ -11,10 +17,37 @@ from dotenv import load_dotenv
 import os
 load_dotenv()  # load environment variables from .env
 
+logger = logging.getLogger(__name__)
+
+# Called with the server id whenever a connected server sends tools/list_changed
+_tools_changed_listeners: List[Callable[[str], None]] = []
+
+
+def add_tools_changed_listener(listener: Callable[[str], None]):
+    """Register a callback for MCP tools/list_changed notifications"""
+    _tools_changed_listeners.append(listener)
+
+
+def _unix_socket_http_client(uds: str):
+    """httpx client factory for MCP HTTP transports that dials a unix socket"""
+
+    def factory(headers=None, timeout=None, auth=None) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            headers=headers,
+            timeout=timeout or httpx.Timeout(30, read=300),
+            auth=auth,
+            transport=httpx.AsyncHTTPTransport(uds=uds),
+        )
+
+    return factory
+
+
 class MCPClient:
     def __init__(self):
         # Initialize session and client objects
         self.session: Optional[ClientSession] = None
+        # Identifies the server this client talks to, stable across reconnects
+        self.server_id: Optional[str] = None
         self.exit_stack = AsyncExitStack()
         # self.openai = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
     # methods will go here
@@ -37,9 +70,12 @@ class MCPClient:
             env=None
         )
 
+        self.server_id = f"stdio:{command} {os.path.abspath(server_script_path)}"
         stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
         self.stdio, self.write = stdio_transport
-        self.session = await self.exit_stack.enter_async_context(ClientSession(self.stdio, self.write))
+        self.session = await self.exit_stack.enter_async_context(
+            ClientSession(self.stdio, self.write, message_handler=self._handle_message)
+        )
 
         await self.session.initialize()
 
@@ -47,3 +83,82 @@ class MCPClient:
         response = await self.session.list_tools()
         tools = response.tools
         print("\nConnected to server with tools:", [tool.name for tool in tools])
+
+    async def connect_in_process(self, server=None):
+        """Connect to a FastMCP server running in this process over memory streams
+
+        Skips the subprocess and JSON-RPC pipe round-trips. Sync tools run
+        inline on the event loop that owns this session.
+
+        Args:
+            server: FastMCP instance, defaults to the bundled Salesforce MCP server
+        """
+        if server is None:
+            from .salesforce_mcp_server import mcp as server
+
+        self.server_id = f"inprocess:{server.name}"
+        self.session = await self.exit_stack.enter_async_context(
+            create_connected_server_and_client_session(server, message_handler=self._handle_message)
+        )
+
+        response = await self.session.list_tools()
+        tools = response.tools
+        logger.info(f"Connected to in-process server with tools: {[tool.name for tool in tools]}")
+
+    async def connect_to_url(self, server_url: str, uds: Optional[str] = None):
+        """Connect to a shared MCP server over streamable HTTP or SSE
+
+        URLs ending in /sse use the SSE transport, anything else streamable HTTP.
+        The HTTP connection is kept alive for the life of the session.
+
+        Args:
+            server_url: Server endpoint, e.g. http://127.0.0.1:8000/mcp
+            uds: Optional unix socket path to dial instead of the URL's host
+        """
+        kwargs = {}
+        if uds:
+            kwargs["httpx_client_factory"] = _unix_socket_http_client(uds)
+
+        self.server_id = f"http:{server_url}" + (f"@{uds}" if uds else "")
+        if server_url.rstrip("/").endswith("/sse"):
+            self.read, self.write = await self.exit_stack.enter_async_context(sse_client(server_url, **kwargs))
+        else:
+            self.read, self.write, _ = await self.exit_stack.enter_async_context(
+                streamablehttp_client(server_url, **kwargs)
+            )
+        self.session = await self.exit_stack.enter_async_context(
+            ClientSession(self.read, self.write, message_handler=self._handle_message)
+        )
+
+        await self.session.initialize()
+
+        response = await self.session.list_tools()
+        tools = response.tools
+        logger.info(f"Connected to shared server with tools: {[tool.name for tool in tools]}")
+
+    async def _handle_message(self, message):
+        """Forward tools/list_changed notifications to registered listeners"""
+        if isinstance(message, ServerNotification) and isinstance(message.root, ToolListChangedNotification):
+            for listener in list(_tools_changed_listeners):
+                listener(self.server_id)
+
+    async def list_tools(self) -> ListToolsResult:
+        """List the tools exposed by the connected server"""
+        return await self.session.list_tools()
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> CallToolResult:
+        """Call a tool on the connected server"""
+        return await self.session.call_tool(name, arguments)
+
+    async def ping(self) -> None:
+        """Send an MCP ping, raises if the server is gone"""
+        await self.session.send_ping()
+
+    async def cleanup(self):
+        """Close the session and stop the server subprocess
+
+        Must be awaited from the same task that called connect_to_server,
+        the stdio transport is tied to the task that opened it.
+        """
+        await self.exit_stack.aclose()
+        self.session = None
@@ -0,0 +1,348 @@
+"""
+Process-wide pool of warm MCP sessions
+Keeps Salesforce MCP server subprocesses alive between Slack turns so a turn
+borrows an initialized session instead of spawning and authenticating a new one.
+"""
+import asyncio
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Set
+
+from mcp.types import CallToolResult, ListToolsResult
+
+from .mcp_client import MCPClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "salesforce_mcp_server.py")
+# Names of the pool's own long-lived tasks start with this
+POOL_TASK_PREFIX = "mcp-pool-"
+
+
+class SessionUnavailable(TimeoutError):
+    """Raised when no session frees up within the pool's acquire timeout"""
+
+
+class _PooledSession:
+    """A connected MCPClient plus the task that owns its transport"""
+
+    def __init__(self, client: MCPClient, stop: asyncio.Event, task: asyncio.Task):
+        self.client = client
+        self.stop = stop
+        self.task = task
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.last_checked = self.created_at
+
+
+class PooledSessionLease:
+    """Handle to a borrowed session, usable from any event loop
+
+    Exposes the same list_tools/call_tool surface as MCPClient.
+    """
+
+    def __init__(self, pool: "MCPSessionPool", pooled: _PooledSession):
+        self._pool = pool
+        self._pooled = pooled
+        self.suspect = False
+
+    @property
+    def server_id(self) -> Optional[str]:
+        return self._pooled.client.server_id
+
+    async def list_tools(self) -> ListToolsResult:
+        return await self._run(self._pooled.client.list_tools())
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> CallToolResult:
+        return await self._run(self._pooled.client.call_tool(name, arguments))
+
+    async def _run(self, coro):
+        try:
+            return await self._pool._submit(coro)
+        except Exception:
+            # Could be a tool error or a dead transport, health check on release decides
+            self.suspect = True
+            raise
+
+
+class MCPSessionPool:
+    """Bounded pool of MCP sessions with health checks, idle reaping and respawn
+
+    Sessions live on the given event loop, or on a private loop thread when
+    none is given, and callers on any other loop are bridged to it.
+    """
+
+    def __init__(
+        self,
+        server_path: str = DEFAULT_SERVER_PATH,
+        size: Optional[int] = None,
+        min_idle: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        health_check_interval: Optional[float] = None,
+        acquire_timeout: Optional[float] = None,
+        transport: Optional[str] = None,
+        server_url: Optional[str] = None,
+        server_uds: Optional[str] = None,
+        client_factory: Callable[[], MCPClient] = MCPClient,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ):
+        """
+        Args:
+            server_path: Path to the MCP server script (.py or .js)
+            size: Maximum number of live sessions (MCP_POOL_SIZE, default 4)
+            min_idle: Sessions kept warm even when idle (MCP_POOL_MIN_IDLE, default 1)
+            idle_timeout: Seconds before an idle session above min_idle is closed (MCP_POOL_IDLE_TIMEOUT, default 300)
+            health_check_interval: Seconds between pings of an idle session (MCP_POOL_HEALTH_CHECK_INTERVAL, default 30)
+            acquire_timeout: Seconds to wait for a free session (MCP_POOL_ACQUIRE_TIMEOUT, default 30)
+            transport: "stdio" to spawn server_path, "inprocess" to mount the bundled server,
+                "http" to share a running network server (MCP_TRANSPORT, default stdio)
+            server_url: Endpoint for the http transport (MCP_SERVER_URL, default http://127.0.0.1:8000/mcp)
+            server_uds: Optional unix socket for the http transport (MCP_SERVER_UDS)
+            client_factory: Callable returning an unconnected MCPClient
+            loop: Running event loop that owns the sessions, e.g. the agent runtime loop.
+                The pool starts and stops its own loop thread when omitted.
+        """
+        self.server_path = server_path
+        self.size = size or int(os.environ.get("MCP_POOL_SIZE", "4"))
+        self.min_idle = min_idle if min_idle is not None else int(os.environ.get("MCP_POOL_MIN_IDLE", "1"))
+        self.idle_timeout = idle_timeout or float(os.environ.get("MCP_POOL_IDLE_TIMEOUT", "300"))
+        self.health_check_interval = health_check_interval or float(
+            os.environ.get("MCP_POOL_HEALTH_CHECK_INTERVAL", "30")
+        )
+        self.acquire_timeout = acquire_timeout or float(os.environ.get("MCP_POOL_ACQUIRE_TIMEOUT", "30"))
+        self.transport = transport or os.environ.get("MCP_TRANSPORT", "stdio")
+        if self.transport not in ("stdio", "inprocess", "http"):
+            raise ValueError(f"Unsupported MCP transport: {self.transport}")
+        self.server_url = server_url or os.environ.get("MCP_SERVER_URL", "http://127.0.0.1:8000/mcp")
+        self.server_uds = server_uds or os.environ.get("MCP_SERVER_UDS")
+        self.client_factory = client_factory
+
+        self._idle: Deque[_PooledSession] = deque()
+        self._live: Set[_PooledSession] = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._reaper: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = loop
+        self._owns_loop = loop is None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    # ----- Public API -----
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[PooledSessionLease]:
+        """Borrow a warm session for the duration of a turn"""
+        self._ensure_loop()
+        pooled = await self._submit(self._acquire())
+        lease = PooledSessionLease(self, pooled)
+        try:
+            yield lease
+        finally:
+            await self._submit(self._release(pooled, lease.suspect))
+
+    def stats(self) -> Dict[str, int]:
+        """Current pool occupancy"""
+        return {"live": len(self._live), "idle": len(self._idle), "size": self.size}
+
+    def close(self, timeout: float = 10.0):
+        """Close every session and stop the pool thread, call from outside the pool loop"""
+        with self._lock:
+            if self._closed or self._loop is None or self._loop.is_closed():
+                self._closed = True
+                return
+            self._closed = True
+        future = asyncio.run_coroutine_threadsafe(self._close_all(), self._loop)
+        try:
+            future.result(timeout=timeout)
+        except Exception as e:
+            logger.warning(f"MCP pool did not close cleanly: {e}")
+        if self._owns_loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=timeout)
+
+    async def aclose(self):
+        """Close every session from a coroutine, the loop itself is left running"""
+        with self._lock:
+            if self._closed or self._loop is None:
+                self._closed = True
+                return
+            self._closed = True
+        await self._submit(self._close_all())
+
+    # ----- Loop plumbing -----
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MCP session pool is closed")
+            if self._loop is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="mcp-pool", daemon=True)
+            self._thread.start()
+
+    async def _submit(self, coro):
+        """Run a coroutine on the pool loop and await it from the caller's loop"""
+        if asyncio.get_running_loop() is self._loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    # ----- Runs on the pool loop -----
+
+    async def _acquire(self) -> _PooledSession:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_forever(), name=f"{POOL_TASK_PREFIX}reaper")
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise SessionUnavailable(f"No MCP session free after {self.acquire_timeout}s ({self.size} in use)") from None
+        try:
+            while self._idle:
+                pooled = self._idle.pop()
+                if time.monotonic() - pooled.last_checked < self.health_check_interval:
+                    return pooled
+                if await self._is_healthy(pooled):
+                    return pooled
+                await self._discard(pooled)
+            return await self._spawn()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def _release(self, pooled: _PooledSession, suspect: bool):
+        try:
+            if suspect and not await self._is_healthy(pooled):
+                await self._discard(pooled)
+                return
+            pooled.last_used = time.monotonic()
+            if self._closed:
+                await self._discard(pooled)
+            else:
+                self._idle.append(pooled)
+        finally:
+            self._slots.release()
+
+    async def _spawn(self) -> _PooledSession:
+        """Start a server and keep its transport open in a dedicated task"""
+        ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        stop = asyncio.Event()
+
+        async def _hold():
+            client = self.client_factory()
+            try:
+                if self.transport == "inprocess":
+                    await client.connect_in_process()
+                elif self.transport == "http":
+                    await client.connect_to_url(self.server_url, uds=self.server_uds)
+                else:
+                    await client.connect_to_server(self.server_path)
+            except BaseException as e:
+                error = e
+                try:
+                    await client.cleanup()
+                except BaseException as cleanup_error:
+                    # Transport task groups report the root cause when they exit
+                    error = cleanup_error
+                if not isinstance(error, Exception):
+                    error = ConnectionError(f"Could not connect to MCP server: {error!r}")
+                if not ready.done():
+                    ready.set_exception(error)
+                return
+            ready.set_result(client)
+            try:
+                await stop.wait()
+            finally:
+                try:
+                    await client.cleanup()
+                except BaseException as e:
+                    logger.debug(f"Error closing MCP session: {e}")
+
+        task = asyncio.create_task(_hold(), name=f"{POOL_TASK_PREFIX}session")
+        client = await ready
+        pooled = _PooledSession(client, stop, task)
+        self._live.add(pooled)
+        logger.info(f"Spawned MCP session ({len(self._live)}/{self.size} live)")
+        return pooled
+
+    async def _is_healthy(self, pooled: _PooledSession) -> bool:
+        if pooled.task.done():
+            return False
+        try:
+            await asyncio.wait_for(pooled.client.ping(), timeout=5)
+        except Exception as e:
+            logger.warning(f"MCP session failed health check: {e}")
+            return False
+        pooled.last_checked = time.monotonic()
+        return True
+
+    async def _discard(self, pooled: _PooledSession):
+        self._live.discard(pooled)
+        pooled.stop.set()
+        try:
+            await asyncio.wait_for(pooled.task, timeout=5)
+        except BaseException as e:
+            logger.debug(f"MCP session did not shut down cleanly: {e}")
+
+    async def _reap_forever(self):
+        interval = min(self.health_check_interval, self.idle_timeout)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self._reap()
+            except Exception:
+                logger.exception("MCP pool reaper failed")
+
+    async def _reap(self):
+        """Close idle sessions past idle_timeout, ping the rest and respawn to min_idle"""
+        now = time.monotonic()
+        keep: Deque[_PooledSession] = deque()
+        while self._idle:
+            pooled = self._idle.popleft()
+            expired = now - pooled.last_used > self.idle_timeout
+            if expired and len(keep) + len(self._idle) >= self.min_idle:
+                await self._discard(pooled)
+            elif now - pooled.last_checked >= self.health_check_interval and not await self._is_healthy(pooled):
+                await self._discard(pooled)
+            else:
+                keep.append(pooled)
+        self._idle.extend(keep)
+
+        while len(self._idle) < self.min_idle and len(self._live) < self.size:
+            try:
+                self._idle.append(await self._spawn())
+            except Exception as e:
+                logger.warning(f"Could not respawn MCP session: {e}")
+                break
+
+    async def _close_all(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+        self._idle.clear()
+        for pooled in list(self._live):
+            await self._discard(pooled)
+
+
+_pool: Optional[MCPSessionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_mcp_pool(loop: Optional[asyncio.AbstractEventLoop] = None) -> MCPSessionPool:
+    """Get or create the process-wide MCP session pool
+
+    Args:
+        loop: Event loop for the sessions, only used when the pool is created
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = MCPSessionPool(loop=loop)
+            atexit.register(_pool.close)
+        return _pool
@@ -14,9 +14,16 @@ This server demonstrates:
 from __future__ import annotations
 
 from mcp.server.fastmcp import FastMCP
+import argparse
+import asyncio
 import os
+import weakref
 from pathlib import Path
-from client import SalesforceClient
+try:
+    from .async_client import AsyncSalesforceClient
+except ImportError:
+    # Run as a script from the salesforce directory (stdio transport)
+    from async_client import AsyncSalesforceClient
 import logging
 from typing import Any
 
@@ -26,21 +33,25 @@ from dotenv import load_dotenv
 
 mcp = FastMCP('Salesforce MCP Server')
 
-# Initialize Salesforce client (will use client_credentials authentication)
-sf_client = None
+# Salesforce client per event loop (will use client_credentials authentication). Tools
+# are coroutines, so calls from parallel tool requests are in flight at once. The
+# in-process transport can mount this server on more than one loop, and an httpx
+# client only works on the loop that created it.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncSalesforceClient]" = weakref.WeakKeyDictionary()
 
 
-def get_client() -> SalesforceClient:
-    """Get or create the Salesforce client instance"""
-    global sf_client
-    if sf_client is None:
-        sf_client = SalesforceClient(auto_auth=True)
-    return sf_client
+def get_client() -> AsyncSalesforceClient:
+    """Get or create the Salesforce client for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = AsyncSalesforceClient()
+    return client
 
 
 
 @mcp.tool()
-def get_accounts(limit: int = 10, fields: list[str] | None = None) -> list[dict[str, Any]]:
+async def get_accounts(limit: int = 10, fields: list[str] | None = None) -> list[dict[str, Any]]:
     """Returns account details including ID, Name, Type, Industry, Phone, Website, and billing information.
     
     Args:
@@ -48,11 +59,10 @@ def get_accounts(limit: int = 10, fields: list[str] | None = None) -> list[dict[
         fields: Optional list of fields to retrieve
     """
     client = get_client()
-    return client.get_accounts(limit=limit, fields=fields)
-    # return "Hello World"
+    return await client.get_accounts(limit=limit, fields=fields)
 
 @mcp.tool(description="Retrieve a specific Salesforce account by its ID")
-def get_account_by_id(account_id: str, fields: list[str] | None = None) -> dict[str, Any]:
+async def get_account_by_id(account_id: str, fields: list[str] | None = None) -> dict[str, Any]:
     """Returns detailed account information.
     
     Args:
@@ -60,10 +70,10 @@ def get_account_by_id(account_id: str, fields: list[str] | None = None) -> dict[
         fields: Optional list of fields to retrieve
     """
     client = get_client()
-    return client.get_account_by_id(account_id, fields=fields)
+    return await client.get_account_by_id(account_id, fields=fields)
 
 @mcp.tool(description="Search for Salesforce accounts by name or other fields")
-def search_accounts(search_term: str, limit: int = 10) -> list[dict[str, Any]]:
+async def search_accounts(search_term: str, limit: int = 10) -> list[dict[str, Any]]:
     """Uses SOSL (Salesforce Object Search Language) to find matching accounts.
     
     Args:
@@ -71,10 +81,10 @@ def search_accounts(search_term: str, limit: int = 10) -> list[dict[str, Any]]:
         limit: Maximum number of results to return (default: 10)
     """
     client = get_client()
-    return client.search_accounts(search_term, limit=limit)
+    return await client.search_accounts(search_term, limit=limit)
 
 @mcp.tool(description="Create a new Salesforce account")
-def create_account(account_data: dict[str, Any]) -> str:
+async def create_account(account_data: dict[str, Any]) -> str:
     """Returns the ID of the created account.
     
     Args:
@@ -83,10 +93,10 @@ def create_account(account_data: dict[str, Any]) -> str:
                         BillingStreet, BillingCity, BillingState, BillingPostalCode, BillingCountry
     """
     client = get_client()
-    return client.create_account(account_data)
+    return await client.create_account(account_data)
 
 @mcp.tool(description="Update an existing Salesforce account")
-def update_account(account_id: str, account_data: dict[str, Any]) -> bool:
+async def update_account(account_id: str, account_data: dict[str, Any]) -> bool:
     """Returns true if successful.
     
     Args:
@@ -94,22 +104,58 @@ def update_account(account_id: str, account_data: dict[str, Any]) -> bool:
         account_data: Account fields to update as key-value pairs
     """
     client = get_client()
-    client.update_account(account_id, account_data)
+    await client.update_account(account_id, account_data)
     return True
 
 @mcp.tool(description="Delete a Salesforce account by ID")
-def delete_account(account_id: str) -> bool:
+async def delete_account(account_id: str) -> bool:
     """Returns true if successful. Use with caution!
     
     Args:
         account_id: Salesforce Account ID to delete
     """
     client = get_client()
-    client.delete_account(account_id)
+    await client.delete_account(account_id)
     return True
 
+@mcp.tool(description="Create many Salesforce accounts at once")
+async def create_accounts(records: list[dict[str, Any]], all_or_none: bool = False) -> list[dict[str, Any]]:
+    """Returns one result per record, in order, with id, success and errors.
+    Use this instead of calling create_account once per record.
+    
+    Args:
+        records: Account data for each account, same fields as create_account
+        all_or_none: If true, nothing in a batch of 200 is saved when any record fails
+    """
+    client = get_client()
+    return await client.create_accounts(records, all_or_none=all_or_none)
+
+@mcp.tool(description="Update many Salesforce accounts at once")
+async def update_accounts(records: list[dict[str, Any]], all_or_none: bool = False) -> list[dict[str, Any]]:
+    """Returns one result per record, in order, with id, success and errors.
+    Use this instead of calling update_account once per record.
+    
+    Args:
+        records: Fields to update for each account, each including the account's Id
+                 e.g. [{"Id": "001...", "Type": "Partner"}]
+        all_or_none: If true, nothing in a batch of 200 is saved when any record fails
+    """
+    client = get_client()
+    return await client.update_accounts(records, all_or_none=all_or_none)
+
+@mcp.tool(description="Delete many Salesforce accounts at once")
+async def delete_accounts(account_ids: list[str], all_or_none: bool = False) -> list[dict[str, Any]]:
+    """Returns one result per account, in order, with id, success and errors. Use with caution!
+    
+    Args:
+        account_ids: Salesforce Account IDs to delete
+        all_or_none: If true, nothing in a batch of 200 is deleted when any record fails
+    """
+    client = get_client()
+    return await client.delete_accounts(account_ids, all_or_none=all_or_none)
+
 @mcp.tool(description="Get opportunities associated with a Salesforce account")
-def get_account_opportunities(account_id: str, limit: int = 10) -> list[dict[str, Any]]:
+async def get_account_opportunities(account_id: str, limit: int = 10) -> list[dict[str, Any]]:
     """Returns opportunity details including stage, amount, and close date.
     
     Args:
@@ -117,10 +163,10 @@ def get_account_opportunities(account_id: str, limit: int = 10) -> list[dict[str
         limit: Maximum number of opportunities to retrieve (default: 10)
     """
     client = get_client()
-    return client.get_account_opportunities(account_id, limit=limit)
+    return await client.get_account_opportunities(account_id, limit=limit)
 
 @mcp.tool(description="Get contacts associated with a Salesforce account")
-def get_account_contacts(account_id: str, limit: int = 10) -> list[dict[str, Any]]:
+async def get_account_contacts(account_id: str, limit: int = 10) -> list[dict[str, Any]]:
     """Returns contact details including name, email, phone, and title.
     
     Args:
@@ -128,16 +174,67 @@ def get_account_contacts(account_id: str, limit: int = 10) -> list[dict[str, Any
         limit: Maximum number of contacts to retrieve (default: 10)
     """
     client = get_client()
-    return client.get_account_contacts(account_id, limit=limit)
+    return await client.get_account_contacts(account_id, limit=limit)
+
+@mcp.tool(description="Get a Salesforce account with its contacts and opportunities in one call")
+async def get_account_360(account: str, contact_limit: int = 10, opportunity_limit: int = 10) -> dict[str, Any]:
+    """Looks the account up by ID or by name and returns it with its contacts and opportunities.
+    Prefer this over chaining search_accounts, get_account_by_id, get_account_contacts
+    and get_account_opportunities when asked about an account.
+    
+    Args:
+        account: Salesforce Account ID, or (part of) the account name
+        contact_limit: Maximum number of contacts to retrieve (default: 10)
+        opportunity_limit: Maximum number of opportunities to retrieve (default: 10)
+    """
+    client = get_client()
+    return await client.get_account_360(account, contact_limit=contact_limit, opportunity_limit=opportunity_limit)
+
+
+async def _serve_unix_socket(transport: str, path: str):
+    """Serve an HTTP transport on a unix socket instead of a TCP port"""
+    import uvicorn
+    from mcp.server.transport_security import TransportSecuritySettings
+
+    # Browsers cannot reach a unix socket, so the DNS rebinding Host check only gets in the way
+    mcp.settings.transport_security = TransportSecuritySettings(enable_dns_rebinding_protection=False)
+    app = mcp.streamable_http_app() if transport == "streamable-http" else mcp.sse_app()
+    config = uvicorn.Config(app, uds=path, log_level=mcp.settings.log_level.lower())
+    await uvicorn.Server(config).serve()
 
 
 def main():
-    """Main entry point for the MCP server"""
-    print("Starting Salesforce MCP Server...")
-    # STDIO transport (default for MCP)
-    print("Transport: stdio")
-    mcp.run(transport='stdio')
-    # return None
+    """Main entry point for the MCP server
+
+    stdio serves a single bot worker. streamable-http and sse serve every bot
+    worker on the host from one process, sharing one Salesforce login.
+    """
+    parser = argparse.ArgumentParser(description="Salesforce MCP Server")
+    parser.add_argument(
+        "--transport",
+        choices=["stdio", "streamable-http", "sse"],
+        default=os.environ.get("MCP_SERVER_TRANSPORT", "stdio"),
+    )
+    parser.add_argument("--host", default=os.environ.get("MCP_SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("MCP_SERVER_PORT", "8000")))
+    parser.add_argument("--uds", default=os.environ.get("MCP_SERVER_UDS"), help="Unix socket path for HTTP transports")
+    args = parser.parse_args()
+
+    # stdout carries the protocol in stdio mode, keep banners on stderr
+    print("Starting Salesforce MCP Server...", file=sys.stderr)
+    print(f"Transport: {args.transport}", file=sys.stderr)
+    if args.transport == "stdio":
+        mcp.run(transport='stdio')
+    elif args.uds:
+        import anyio
+
+        print(f"Listening on unix socket {args.uds}", file=sys.stderr)
+        anyio.run(_serve_unix_socket, args.transport, args.uds)
+    else:
+        mcp.settings.host = args.host
+        mcp.settings.port = args.port
+        print(f"Listening on http://{args.host}:{args.port}", file=sys.stderr)
+        mcp.run(transport=args.transport)
 
 if __name__ == "__main__":
     main()
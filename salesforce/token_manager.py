@@ -0,0 +1,223 @@
+"""
+Salesforce OAuth token cache
+One access token is shared by every client in the process and, through a
+locked JSON file, by every process on the host (bot workers and MCP server
+processes). It is refreshed ahead of expiry by one caller while the others
+keep using the current token, and replaced once when Salesforce rejects it.
+"""
+import hashlib
+import json
+import logging
+import os
+import stat
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process locking on Windows, each process still refreshes only once at a time
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SALESFORCE_TOKEN_CACHE_ENABLED = os.environ.get("SALESFORCE_TOKEN_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+# Token file shared by processes, a file per client id in ~/.cache/salesforce-bot when unset
+SALESFORCE_TOKEN_CACHE_PATH = os.environ.get("SALESFORCE_TOKEN_CACHE_PATH")
+# Seconds a token is trusted when Salesforce does not say, the default org session timeout
+SALESFORCE_TOKEN_LIFETIME = float(os.environ.get("SALESFORCE_TOKEN_LIFETIME", "7200"))
+# Seconds before expiry a new token is fetched
+SALESFORCE_TOKEN_REFRESH_MARGIN = float(os.environ.get("SALESFORCE_TOKEN_REFRESH_MARGIN", "300"))
+
+
+# Symlinks are never followed where the platform can tell
+O_NOFOLLOW = getattr(os, "O_NOFOLLOW", 0)
+
+
+def _cache_dir() -> Optional[str]:
+    """Per-user 0700 directory for token files, None when it cannot be made private"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    path = os.path.join(base, "salesforce-bot")
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        info = os.lstat(path)
+        if not stat.S_ISDIR(info.st_mode) or (hasattr(os, "getuid") and info.st_uid != os.getuid()):
+            raise PermissionError(f"{path} is not a directory owned by this user")
+        if stat.S_IMODE(info.st_mode) != 0o700:
+            os.chmod(path, 0o700)
+    except OSError as e:
+        logger.warning(f"Keeping the Salesforce token in memory only: {e}")
+        return None
+    return path
+
+
+def default_cache_path(client_id: str, token_url: str) -> Optional[str]:
+    """Token file for a connected app, None when the cache is disabled"""
+    if not SALESFORCE_TOKEN_CACHE_ENABLED:
+        return None
+    if SALESFORCE_TOKEN_CACHE_PATH:
+        return SALESFORCE_TOKEN_CACHE_PATH
+    directory = _cache_dir()
+    if directory is None:
+        return None
+    digest = hashlib.sha256(f"{client_id}|{token_url}".encode()).hexdigest()[:16]
+    return os.path.join(directory, f"salesforce-token-{digest}.json")
+
+
+class TokenManager:
+    """Cached access token with proactive, single-flight refresh"""
+
+    def __init__(
+        self,
+        fetch: Callable[[], Dict[str, Any]],
+        cache_path: Optional[str] = None,
+        lifetime: float = SALESFORCE_TOKEN_LIFETIME,
+        refresh_margin: float = SALESFORCE_TOKEN_REFRESH_MARGIN,
+    ):
+        """
+        Args:
+            fetch: Requests a new token from Salesforce, returns the OAuth token response
+            cache_path: JSON file shared with other processes, memory only when None
+            lifetime: Seconds a token is trusted when the response has no expires_in
+            refresh_margin: Seconds before expiry a new token is fetched
+        """
+        self._fetch = fetch
+        self.cache_path = cache_path
+        self.lifetime = lifetime
+        self.refresh_margin = refresh_margin
+        self._token: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self.refreshes = 0
+
+    def get(self) -> Dict[str, Any]:
+        """
+        Current token, refreshed first if it expires within the refresh margin
+
+        Returns:
+            Dictionary with access_token, instance_url and expires_at
+        """
+        token = self.cached()
+        if token:
+            return token
+        token = self._token
+        if token and token["expires_at"] > time.time():
+            # Still valid, one caller refreshes while the others carry on with it
+            if not self._lock.acquire(blocking=False):
+                return token
+            try:
+                return self._refresh_locked(token["access_token"])
+            except Exception as e:
+                logger.warning(f"Proactive Salesforce token refresh failed, using the current token: {e}")
+                return token
+            finally:
+                self._lock.release()
+        return self.refresh(token["access_token"] if token else None)
+
+    def cached(self) -> Optional[Dict[str, Any]]:
+        """Current token when no refresh is due yet, never blocks"""
+        token = self._token
+        if token and token["expires_at"] - self.refresh_margin > time.time():
+            return token
+        return None
+
+    def refresh(self, stale: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Replace a token, e.g. one Salesforce answered 401 INVALID_SESSION_ID to
+
+        Args:
+            stale: Access token to replace, a cached token other than this one is used as is
+
+        Returns:
+            Dictionary with access_token, instance_url and expires_at
+        """
+        with self._lock:
+            return self._refresh_locked(stale)
+
+    def _refresh_locked(self, stale: Optional[str]) -> Dict[str, Any]:
+        # Another caller may have replaced the token while this one waited for the lock
+        token = self._token
+        if self._usable(token, stale):
+            return token
+        with self._file_lock():
+            token = self._read_cache()
+            if not self._usable(token, stale):
+                token = self._issue()
+                self._write_cache(token)
+        self._token = token
+        return token
+
+    def _usable(self, token: Optional[Dict[str, Any]], stale: Optional[str]) -> bool:
+        return bool(
+            token
+            and token["access_token"] != stale
+            and token["expires_at"] - self.refresh_margin > time.time()
+        )
+
+    def _issue(self) -> Dict[str, Any]:
+        data = self._fetch()
+        self.refreshes += 1
+        # issued_at is in milliseconds, Salesforce only sends expires_in for some flows
+        issued_at = float(data.get("issued_at", time.time() * 1000)) / 1000
+        lifetime = float(data.get("expires_in") or self.lifetime)
+        return {
+            "access_token": data["access_token"],
+            "instance_url": data.get("instance_url"),
+            "expires_at": issued_at + lifetime,
+            "response": data,
+        }
+
+    @contextmanager
+    def _file_lock(self):
+        if not self.cache_path or fcntl is None:
+            yield
+            return
+        try:
+            fd = os.open(f"{self.cache_path}.lock", os.O_RDWR | os.O_CREAT | O_NOFOLLOW, 0o600)
+        except OSError as e:
+            # Refreshing without the lock only risks an extra login
+            logger.warning(f"Could not open Salesforce token lock {self.cache_path}.lock: {e}")
+            yield
+            return
+        with os.fdopen(fd, "r+") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_cache(self) -> Optional[Dict[str, Any]]:
+        if not self.cache_path:
+            return None
+        try:
+            fd = os.open(self.cache_path, os.O_RDONLY | O_NOFOLLOW)
+            with os.fdopen(fd) as f:
+                # Only a file this user wrote is trusted, anyone else could point calls at their own host
+                info = os.fstat(f.fileno())
+                if (hasattr(os, "getuid") and info.st_uid != os.getuid()) or stat.S_IMODE(info.st_mode) != 0o600:
+                    logger.warning(f"Ignoring Salesforce token cache {self.cache_path}, it must be owned by this user with mode 0600")
+                    return None
+                token = json.load(f)
+            return token if token.get("access_token") and "expires_at" in token else None
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable Salesforce token cache {self.cache_path}: {e}")
+            return None
+
+    def _write_cache(self, token: Dict[str, Any]):
+        if not self.cache_path:
+            return
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            # Owner only, the file holds a live access token
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | O_NOFOLLOW, 0o600)
+            if hasattr(os, "fchmod"):
+                # A leftover temp file keeps its old mode otherwise
+                os.fchmod(fd, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(token, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Could not write Salesforce token cache {self.cache_path}: {e}")
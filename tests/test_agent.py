@@ -0,0 +1,207 @@
+"""
+Tests for the Gemini + MCP tool loop
+"""
+import asyncio
+import logging
+import time
+
+from google.genai import types
+
+from ai.agent import execute_function_calls, run_tool_loop
+
+logger = logging.getLogger(__name__)
+
+
+class SlowSession:
+    """MCP session whose tools sleep, to observe concurrency"""
+
+    def __init__(self, delay: float = 0.1):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def call_tool(self, name, arguments=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if name == "hang":
+                await asyncio.sleep(10)
+            if name == "boom":
+                raise RuntimeError("Salesforce is down")
+            await asyncio.sleep(self.delay)
+            return {"tool": name, "args": arguments}
+        finally:
+            self.in_flight -= 1
+
+
+class FakeModels:
+    """Replays scripted Gemini responses and records every call"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    async def generate_content(self, model, config, contents):
+        self.calls.append({"config": config, "contents": list(contents)})
+        return self.responses.pop(0)
+
+    async def generate_content_stream(self, model, config, contents):
+        # Scripted streaming responses are lists of chunks
+        self.calls.append({"config": config, "contents": list(contents)})
+        chunks = self.responses.pop(0)
+
+        async def _stream():
+            for chunk in chunks:
+                yield chunk
+
+        return _stream()
+
+
+class FakeAio:
+    def __init__(self, models):
+        self.models = models
+
+
+class FakeGemini:
+    def __init__(self, responses):
+        self.models = FakeModels(responses)
+        self.aio = FakeAio(self.models)
+
+
+def _response(*parts, tokens=100):
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=list(parts)))],
+        usage_metadata=types.GenerateContentResponseUsageMetadata(total_token_count=tokens),
+    )
+
+
+def _fc_part(name, call_id):
+    return types.Part(function_call=types.FunctionCall(id=call_id, name=name, args={"account_id": "001"}))
+
+
+def _conversation(text="Tell me about Acme"):
+    return [types.Content(role="user", parts=[types.Part(text=text)])]
+
+
+def _calls(*names):
+    return [types.FunctionCall(id=f"call-{i}", name=name, args={"account_id": "001"}) for i, name in enumerate(names)]
+
+
+def test_function_calls_run_concurrently_in_order():
+    session = SlowSession(delay=0.1)
+    started = time.perf_counter()
+    parts = asyncio.run(
+        execute_function_calls(_calls("get_account_contacts", "get_account_opportunities", "get_account_by_id"), session, logger)
+    )
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.25
+    assert session.max_in_flight == 3
+    assert [p.function_response.name for p in parts] == [
+        "get_account_contacts",
+        "get_account_opportunities",
+        "get_account_by_id",
+    ]
+    assert [p.function_response.id for p in parts] == ["call-0", "call-1", "call-2"]
+
+
+def test_concurrency_cap_and_failures():
+    session = SlowSession(delay=0.01)
+    parts = asyncio.run(
+        execute_function_calls(_calls("a", "b", "hang", "boom", "c"), session, logger, max_concurrency=2, timeout=0.2)
+    )
+
+    assert session.max_in_flight <= 2
+    responses = [p.function_response.response for p in parts]
+    assert "result" in responses[0]
+    assert "timed out" in responses[2]["error"]
+    assert "Salesforce is down" in responses[3]["error"]
+    assert "result" in responses[4]
+
+
+def test_one_model_call_per_tool_round():
+    gemini = FakeGemini([
+        _response(_fc_part("search_accounts", "c1")),
+        _response(_fc_part("get_account_contacts", "c2"), _fc_part("get_account_opportunities", "c3")),
+        _response(types.Part(text="Acme has 3 contacts and 2 open deals.")),
+    ])
+    result = asyncio.run(run_tool_loop(_conversation(), types.GenerateContentConfig(), SlowSession(0), logger, gemini))
+
+    assert result.text == "Acme has 3 contacts and 2 open deals."
+    assert result.model_calls == len(gemini.models.calls) == 3
+    assert result.tool_rounds == 2
+    assert result.total_tokens == 300
+
+    # user, model(call), user(response), model(2 calls), user(2 responses), model(answer)
+    assert [c.role for c in result.contents] == ["user", "model", "user", "model", "user", "model"]
+    assert [p.function_response.id for p in result.contents[4].parts] == ["c2", "c3"]
+    # Each call sees everything accumulated so far and nothing twice
+    assert [len(call["contents"]) for call in gemini.models.calls] == [1, 3, 5]
+
+
+def test_round_budget_forces_an_answer():
+    gemini = FakeGemini([
+        _response(_fc_part("get_accounts", "c1")),
+        _response(_fc_part("get_accounts", "c2")),
+        _response(types.Part(text="Here is what I found so far.")),
+    ])
+    result = asyncio.run(
+        run_tool_loop(_conversation(), types.GenerateContentConfig(), SlowSession(0), logger, gemini, max_rounds=2)
+    )
+
+    assert result.model_calls == 3
+    assert result.tool_rounds == 2
+    final_config = gemini.models.calls[-1]["config"]
+    assert final_config.tool_config.function_calling_config.mode == types.FunctionCallingConfigMode.NONE
+    assert gemini.models.calls[0]["config"].tool_config is None
+
+
+def test_token_budget_forces_an_answer():
+    gemini = FakeGemini([
+        _response(_fc_part("get_accounts", "c1"), tokens=5000),
+        _response(types.Part(text="Partial answer."), tokens=5000),
+    ])
+    result = asyncio.run(
+        run_tool_loop(_conversation(), types.GenerateContentConfig(), SlowSession(0), logger, gemini, max_tokens=1000)
+    )
+
+    assert result.model_calls == 2
+    assert result.text == "Partial answer."
+
+
+def test_text_streams_before_the_round_finishes():
+    streamed = []
+    gemini = FakeGemini([
+        [_response(types.Part(text="Let me check. ")), _response(_fc_part("search_accounts", "c1"))],
+        [_response(types.Part(text="Acme is ")), _response(types.Part(text="a customer."))],
+    ])
+
+    def on_text(text):
+        streamed.append((text, len(gemini.models.calls)))
+
+    result = asyncio.run(
+        run_tool_loop(_conversation(), types.GenerateContentConfig(), SlowSession(0), logger, gemini, on_text=on_text)
+    )
+
+    assert result.model_calls == 2
+    assert result.text == "Acme is a customer."
+    # Deltas arrive while each call is in progress, rounds are separated by a blank line
+    assert streamed == [("Let me check. ", 1), ("\n\nAcme is ", 2), ("a customer.", 2)]
+    # The streamed function call was kept in the model content sent back next round
+    assert result.contents[1].parts[1].function_call.name == "search_accounts"
+
+
+def test_async_streamer_is_awaited():
+    streamed = []
+    gemini = FakeGemini([[_response(types.Part(text="Acme is a customer."))]])
+
+    async def on_text(text):
+        await asyncio.sleep(0)
+        streamed.append(text)
+
+    result = asyncio.run(
+        run_tool_loop(_conversation(), types.GenerateContentConfig(), SlowSession(0), logger, gemini, on_text=on_text)
+    )
+
+    assert streamed == ["Acme is a customer."]
+    assert result.model_calls == 1
@@ -0,0 +1,104 @@
+"""
+Tests for the exact-match answer cache
+"""
+import asyncio
+import importlib
+import logging
+import time
+from types import SimpleNamespace
+
+from google.genai import types
+
+import ai.agent
+import ai.answer_cache
+from ai.answer_cache import AnswerCache
+from ai.conversation_store import InMemoryConversationStore
+
+logger = logging.getLogger(__name__)
+
+
+def _history(*texts):
+    return [types.Content(role="user", parts=[types.Part(text=t)]) for t in texts]
+
+
+def test_normalized_queries_hit():
+    cache = AnswerCache()
+    cache.put(cache.key("Top 10 accounts?", []), "1. Acme ...", ["get_accounts"])
+
+    assert cache.get(cache.key("  top 10   ACCOUNTS ", [])) == "1. Acme ..."
+    # Different thread context is a different question
+    assert cache.get(cache.key("top 10 accounts", _history("we talked about Globex"))) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_mutating_turn_is_not_cached_and_invalidates():
+    cache = AnswerCache()
+    read_key = cache.key("contacts for Acme", [])
+    cache.put(read_key, "Jane Doe", ["get_account_contacts"])
+
+    write_key = cache.key("rename Acme to Acme Inc", [])
+    cache.put(write_key, "Done.", ["search_accounts", "update_account"])
+
+    assert cache.get(write_key) is None
+    assert cache.get(cache.key("contacts for Acme", [])) is None
+    assert cache.stats()["bypasses"] == 1
+
+
+def test_lru_and_ttl_eviction():
+    cache = AnswerCache(max_entries=2, ttl=0.05)
+    keys = [cache.key(q, []) for q in ("a", "b", "c")]
+    for key in keys:
+        cache.put(key, key, [])
+
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) == keys[2]
+    time.sleep(0.06)
+    assert cache.get(keys[2]) is None
+
+
+def _no_gemini():
+    raise AssertionError("a cache hit must not call Gemini")
+
+
+def test_hit_makes_no_gemini_call_even_with_long_history(monkeypatch):
+    class _Compactor:
+        async def compact(self, *args, **kwargs):
+            raise AssertionError("a cache hit must not summarize history")
+
+    class _Streamer:
+        def __init__(self):
+            self.text = []
+
+        def append(self, markdown_text):
+            self.text.append(markdown_text)
+
+    cache = AnswerCache()
+    history = _history(*(f"message {i} " + "x" * 2000 for i in range(200)))
+    cache.put(cache.key("top 10 accounts", history), "1. Acme ...", ["get_accounts"])
+    monkeypatch.setattr(ai.agent, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(ai.agent, "answer_cache", cache)
+    monkeypatch.setattr(ai.agent, "history_compactor", _Compactor())
+    monkeypatch.setattr(ai.agent, "HISTORY_COMPACTION_ENABLED", True)
+    monkeypatch.setattr(ai.agent, "get_gemini_client", _no_gemini)
+    monkeypatch.setattr(ai.agent, "conversation_store", InMemoryConversationStore())
+    streamer = _Streamer()
+
+    answer = asyncio.run(ai.agent.run_gemini_with_tools(
+        "Top 10 accounts", history, SimpleNamespace(), streamer, logger, conversation_key="C1:1.0"
+    ))
+
+    assert answer == "1. Acme ..."
+    assert streamer.text == ["1. Acme ..."]
+
+
+def test_off_by_default_when_workers_share_one_mcp_server(monkeypatch):
+    monkeypatch.delenv("ANSWER_CACHE_ENABLED", raising=False)
+    monkeypatch.setenv("MCP_TRANSPORT", "http")
+    try:
+        assert importlib.reload(ai.answer_cache).ANSWER_CACHE_ENABLED is False
+        monkeypatch.setenv("ANSWER_CACHE_ENABLED", "1")
+        assert importlib.reload(ai.answer_cache).ANSWER_CACHE_ENABLED is True
+    finally:
+        monkeypatch.undo()
+        importlib.reload(ai.answer_cache)
@@ -0,0 +1,137 @@
+"""
+Tests for the async Salesforce client and the async MCP tools
+"""
+import asyncio
+import json
+import time
+
+import httpx
+from mcp.shared.memory import create_connected_server_and_client_session
+
+import salesforce.salesforce_mcp_server as server_module
+import salesforce.token_manager as token_manager
+from salesforce.async_client import AsyncSalesforceClient
+
+
+class FakeSalesforce:
+    """Token and query endpoints, answers 401 INVALID_SESSION_ID to expired tokens"""
+
+    def __init__(self, delay: float = 0.0, expired=()):
+        self.delay = delay
+        self.expired = set(expired)
+        self.logins = 0
+        self.requests = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append((request.method, request.url.path))
+        if request.url.path.endswith("/oauth2/token"):
+            self.logins += 1
+            return httpx.Response(200, json={
+                "access_token": f"token-{self.logins}", "instance_url": "https://acme.my.salesforce.com",
+            })
+        if request.headers["Authorization"].split()[-1] in self.expired:
+            return httpx.Response(401, json=[{"errorCode": "INVALID_SESSION_ID", "message": "Session expired or invalid"}])
+        await asyncio.sleep(self.delay)
+        if request.url.path.endswith("/composite/sobjects"):
+            return self._collection(request)
+        if request.method == "PATCH":
+            return httpx.Response(204)
+        return httpx.Response(200, json={"records": [{"Id": "001A", "Name": "Acme"}]})
+
+    def _collection(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "DELETE":
+            ids = request.url.params["ids"].split(",")
+            return httpx.Response(200, json=[{"id": i, "success": True, "errors": []} for i in ids])
+        body = json.loads(request.content)
+        results = []
+        for record in body["records"]:
+            if record.get("Name") == "":
+                results.append({"success": False, "errors": [{"statusCode": "REQUIRED_FIELD_MISSING", "fields": ["Name"]}]})
+            else:
+                results.append({"id": record.get("Id", "001new"), "success": True, "errors": []})
+        if body["allOrNone"] and not all(r["success"] for r in results):
+            results = [{"id": None, "success": False, "errors": r["errors"] or [{"statusCode": "ALL_OR_NONE_OPERATION_ROLLED_BACK"}]} for r in results]
+        return httpx.Response(200, json=results)
+
+
+def _client(monkeypatch, tmp_path, api: FakeSalesforce) -> AsyncSalesforceClient:
+    monkeypatch.setattr(token_manager, "SALESFORCE_TOKEN_CACHE_PATH", str(tmp_path / "token.json"))
+    monkeypatch.setenv("SALESFORCE_CLIENT_ID", "id")
+    monkeypatch.setenv("SALESFORCE_CLIENT_SECRET", "secret")
+    monkeypatch.setenv("SALESFORCE_INSTANCE_URL", "https://acme.my.salesforce.com")
+    return AsyncSalesforceClient(http_client=httpx.AsyncClient(transport=httpx.MockTransport(api)))
+
+
+def test_calls_share_one_login_and_retry_an_invalid_session(monkeypatch, tmp_path):
+    api = FakeSalesforce(expired={"token-1"})
+    client = _client(monkeypatch, tmp_path, api)
+
+    async def _run():
+        async with client:
+            contacts = await client.get_account_contacts("001A")
+            updated = await client.update_account("001A", {"Type": "Partner"})
+            return contacts, updated
+
+    contacts, updated = asyncio.run(_run())
+
+    assert contacts == [{"Id": "001A", "Name": "Acme"}] and updated is True
+    assert api.logins == 2
+    assert [method for method, _ in api.requests] == ["POST", "GET", "POST", "GET", "PATCH"]
+
+
+def test_parallel_tool_calls_are_in_flight_at_once(monkeypatch, tmp_path):
+    api = FakeSalesforce(delay=0.2)
+
+    async def _run():
+        server_module._clients[asyncio.get_running_loop()] = _client(monkeypatch, tmp_path, api)
+        async with create_connected_server_and_client_session(server_module.mcp._mcp_server) as session:
+            started = time.perf_counter()
+            results = await asyncio.gather(*(
+                session.call_tool("get_account_contacts", {"account_id": f"001{i}"}) for i in range(5)
+            ))
+            return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(_run())
+
+    assert all(not result.isError for result in results)
+    assert json.loads(results[0].content[0].text)["Id"] == "001A"
+    # Five 0.2s queries overlap instead of taking a second
+    assert elapsed < 0.6
+    assert api.logins == 1
+
+
+def test_bulk_updates_are_sent_200_records_at_a_time(monkeypatch, tmp_path):
+    api = FakeSalesforce()
+    client = _client(monkeypatch, tmp_path, api)
+    records = [{"Id": f"001{i:015d}", "Type": "Partner"} for i in range(450)]
+
+    async def _run():
+        async with client:
+            updated = await client.update_accounts(records)
+            deleted = await client.delete_accounts([r["Id"] for r in records[:3]])
+            return updated, deleted
+
+    updated, deleted = asyncio.run(_run())
+
+    assert [method for method, path in api.requests if path.endswith("/sobjects")] == ["PATCH"] * 3 + ["DELETE"]
+    assert [r["id"] for r in updated] == [r["Id"] for r in records]
+    assert all(r["success"] for r in updated + deleted) and len(deleted) == 3
+
+
+def test_all_or_none_stops_after_a_rolled_back_batch(monkeypatch, tmp_path):
+    api = FakeSalesforce()
+    client = _client(monkeypatch, tmp_path, api)
+    records = [{"Name": f"Acme {i}"} for i in range(250)]
+    records[10]["Name"] = ""
+
+    async def _run():
+        async with client:
+            return await client.create_accounts(records, all_or_none=True)
+
+    results = asyncio.run(_run())
+
+    assert len(results) == 250 and not any(r["success"] for r in results)
+    assert results[10]["errors"][0]["statusCode"] == "REQUIRED_FIELD_MISSING"
+    # The second batch is never sent
+    assert [method for method, path in api.requests if path.endswith("/sobjects")] == ["POST"]
+    assert results[-1]["errors"][0]["statusCode"] == "ALL_OR_NONE_OPERATION_ROLLED_BACK"
@@ -0,0 +1,125 @@
+"""
+Tests for explicit Gemini context caching
+"""
+import asyncio
+import datetime
+
+from google.genai import errors, types
+
+from ai.context_cache import ContextCache, is_stale_cache_error
+
+
+class FakeCaches:
+    def __init__(self, fail_create=False, lifetime=3600):
+        self.fail_create = fail_create
+        self.lifetime = lifetime
+        self.created = 0
+        self.updated = 0
+
+    def _cached(self, name):
+        expire = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=self.lifetime)
+        return types.CachedContent(name=name, expire_time=expire)
+
+    def create(self, model, config):
+        if self.fail_create:
+            raise errors.ClientError(400, {"error": {"message": "Cached content is too small"}})
+        self.created += 1
+        return self._cached(f"cachedContents/{self.created}")
+
+    def update(self, name, config):
+        self.updated += 1
+        return self._cached(name)
+
+
+class FakeAsyncCaches:
+    def __init__(self, caches):
+        self.caches = caches
+
+    async def create(self, model, config):
+        return self.caches.create(model, config)
+
+    async def update(self, name, config):
+        return self.caches.update(name, config)
+
+
+class FakeAio:
+    def __init__(self, caches):
+        self.caches = FakeAsyncCaches(caches)
+
+
+class FakeGemini:
+    def __init__(self, **kwargs):
+        self.caches = FakeCaches(**kwargs)
+        self.aio = FakeAio(self.caches)
+
+
+CONFIG = types.GenerateContentConfig(
+    system_instruction="You're an assistant in a Slack workspace.",
+    tools=[types.Tool(function_declarations=[types.FunctionDeclaration(name="get_accounts", description="List")])],
+)
+
+
+def test_prefix_is_cached_once_and_stripped_from_requests():
+    gemini = FakeGemini()
+    cache = ContextCache(ttl=3600, renew_margin=60)
+
+    first = cache.apply(gemini, "gemini-2.5-flash", CONFIG)
+    second = cache.apply(gemini, "gemini-2.5-flash", CONFIG)
+
+    assert gemini.caches.created == 1
+    assert first.cached_content == second.cached_content == "cachedContents/1"
+    assert first.system_instruction is None and first.tools is None
+
+
+def test_ttl_is_renewed_near_expiry():
+    gemini = FakeGemini(lifetime=30)
+    cache = ContextCache(ttl=3600, renew_margin=60)
+
+    cache.apply(gemini, "gemini-2.5-flash", CONFIG)
+    cache.apply(gemini, "gemini-2.5-flash", CONFIG)
+    assert gemini.caches.updated == 1
+    assert gemini.caches.created == 1
+
+
+def test_falls_back_to_full_prefix():
+    gemini = FakeGemini(fail_create=True)
+    cache = ContextCache()
+
+    assert cache.apply(gemini, "gemini-2.5-flash", CONFIG) is CONFIG
+    # A per-request tool_config cannot be combined with cached content
+    forced = CONFIG.model_copy(update={"tool_config": types.ToolConfig()})
+    assert ContextCache().apply(FakeGemini(), "gemini-2.5-flash", forced) is forced
+
+    # Invalidated names are recreated on the next call
+    gemini = FakeGemini()
+    cache = ContextCache()
+    name = cache.apply(gemini, "gemini-2.5-flash", CONFIG).cached_content
+    cache.invalidate(name)
+    assert cache.apply(gemini, "gemini-2.5-flash", CONFIG).cached_content != name
+
+
+def test_async_apply_shares_entries_with_sync_apply():
+    gemini = FakeGemini(lifetime=30)
+    cache = ContextCache(ttl=3600, renew_margin=60)
+
+    first = asyncio.run(cache.apply_async(gemini, "gemini-2.5-flash", CONFIG))
+    second = cache.apply(gemini, "gemini-2.5-flash", CONFIG)
+    asyncio.run(cache.apply_async(gemini, "gemini-2.5-flash", CONFIG))
+
+    assert first.cached_content == second.cached_content == "cachedContents/1"
+    assert gemini.caches.created == 1
+    assert gemini.caches.updated == 2
+
+
+def test_only_errors_about_the_cache_count_as_stale():
+    name = "cachedContents/abc123"
+
+    expired = errors.ClientError(400, {"error": {"message": "Cache content abc123 is expired."}})
+    missing = errors.ClientError(403, {"error": {"message": f"CachedContent not found (or permission denied): {name}"}})
+    bad_schema = errors.ClientError(400, {"error": {"message": "Invalid JSON payload received. Unknown name \"$ref\""}})
+    too_large = errors.ClientError(400, {"error": {"message": "The input token count exceeds the maximum"}})
+
+    assert is_stale_cache_error(expired, name)
+    assert is_stale_cache_error(missing, name)
+    assert not is_stale_cache_error(bad_schema, name)
+    assert not is_stale_cache_error(too_large, name)
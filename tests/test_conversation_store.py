@@ -0,0 +1,131 @@
+"""
+Tests for per-thread Gemini conversation state
+"""
+import asyncio
+import logging
+from types import SimpleNamespace
+
+from google.genai import types
+
+import ai.agent
+import ai.context_cache
+from ai.conversation_store import InMemoryConversationStore, SQLiteConversationStore
+from listeners.thread_history import build_history
+
+logger = logging.getLogger(__name__)
+
+
+def _tool_turn():
+    return [
+        types.Content(role="user", parts=[types.Part(text="Tell me about Acme")]),
+        types.Content(role="model", parts=[types.Part(
+            function_call=types.FunctionCall(id="c1", name="search_accounts", args={"name": "Acme"}),
+            thought_signature=b"\x00sig",
+        )]),
+        types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+            id="c1", name="search_accounts", response={"result": [{"Id": "001", "Name": "Acme"}]}
+        ))]),
+        types.Content(role="model", parts=[types.Part(text="Acme is a customer.")]),
+    ]
+
+
+def test_sqlite_store_round_trips_tool_calls(tmp_path):
+    path = str(tmp_path / "conversations.db")
+    SQLiteConversationStore(path).put("C1:1.0", _tool_turn())
+
+    # A new store on the same file, as after a restart
+    restored = SQLiteConversationStore(path).get("C1:1.0")
+
+    assert restored == _tool_turn()
+    assert restored[1].parts[0].thought_signature == b"\x00sig"
+    assert SQLiteConversationStore(path, ttl=-1).get("C1:1.0") is None
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = InMemoryConversationStore(max_threads=2)
+    store.put("a", _tool_turn())
+    store.put("b", [])
+    store.get("a")
+    store.put("c", [])
+
+    assert store.get("b") is None
+    assert store.get("a") == _tool_turn()
+
+
+class _Models:
+    def __init__(self):
+        self.calls = []
+
+    async def generate_content_stream(self, model, config, contents):
+        self.calls.append(list(contents))
+
+        async def _stream():
+            yield types.GenerateContentResponse(candidates=[types.Candidate(
+                content=types.Content(role="model", parts=[types.Part(text="It has 3 open opportunities.")])
+            )])
+
+        return _stream()
+
+
+class _Session:
+    server_id = "test:conversation-store"
+
+    async def list_tools(self):
+        return SimpleNamespace(tools=[])
+
+
+class _Streamer:
+    def append(self, markdown_text):
+        pass
+
+
+def test_follow_up_resumes_with_earlier_tool_results(monkeypatch):
+    store = InMemoryConversationStore()
+    store.put("C1:1.0", _tool_turn())
+    models = _Models()
+    monkeypatch.setattr(ai.agent, "conversation_store", store)
+    monkeypatch.setattr(ai.agent, "get_gemini_client", lambda: SimpleNamespace(aio=SimpleNamespace(models=models)))
+    monkeypatch.setattr(ai.agent, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(ai.context_cache, "CONTEXT_CACHE_ENABLED", False)
+
+    slack_history = [types.Content(role="user", parts=[types.Part(text="Tell me about Acme")])]
+    answer = asyncio.run(ai.agent.run_gemini_with_tools(
+        "How many open opportunities?", slack_history, _Session(), _Streamer(), logger, conversation_key="C1:1.0"
+    ))
+
+    assert answer == "It has 3 open opportunities."
+    # The model saw the earlier function response, not just the Slack text
+    sent = models.calls[0]
+    assert sent[2].parts[0].function_response.response["result"][0]["Name"] == "Acme"
+    assert sent[-1].parts[0].text == "How many open opportunities?"
+    assert len(store.get("C1:1.0")) == 6
+
+
+def test_messages_posted_between_bot_turns_are_added(monkeypatch):
+    store = InMemoryConversationStore()
+    store.put("C1:1.0", _tool_turn(), "1.0")
+    models = _Models()
+    monkeypatch.setattr(ai.agent, "conversation_store", store)
+    monkeypatch.setattr(ai.agent, "get_gemini_client", lambda: SimpleNamespace(aio=SimpleNamespace(models=models)))
+    monkeypatch.setattr(ai.agent, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(ai.context_cache, "CONTEXT_CACHE_ENABLED", False)
+
+    messages = [
+        {"ts": "1.0", "user": "U1", "text": "Tell me about Acme"},
+        {"ts": "1.5", "bot_id": "B1", "text": "Acme is a customer."},
+        # Another person joins the thread before the next mention
+        {"ts": "2.0", "user": "U2", "text": "They just renewed for 3 years"},
+        {"ts": "3.0", "user": "U1", "text": "How many open opportunities?"},
+    ]
+    history, query = build_history(messages, "3.0")
+    asyncio.run(ai.agent.run_gemini_with_tools(
+        query, history, _Session(), _Streamer(), logger, conversation_key="C1:1.0", message_ts="3.0",
+        history_since=lambda ts: build_history(messages, "3.0", since_ts=ts)[0],
+    ))
+
+    sent = models.calls[0]
+    # Stored tool turn, then the other person's message, then the question
+    assert sent[2].parts[0].function_response is not None
+    assert [c.parts[0].text for c in sent[-2:]] == ["They just renewed for 3 years", "How many open opportunities?"]
+    assert store.last_ts("C1:1.0") == "3.0"
+    assert len(store.get("C1:1.0")) == 7
@@ -0,0 +1,62 @@
+"""
+Tests for skipping redelivered Slack events
+"""
+import logging
+
+import listeners.event_dedup as event_dedup_module
+from listeners.event_dedup import InMemoryEventStore, SQLiteEventStore, event_key, skip_duplicate_events
+
+logger = logging.getLogger(__name__)
+
+
+def _body(event_id: str = "Ev1", client_msg_id: str = "m-1", event_type: str = "message", **event) -> dict:
+    event = {"type": event_type, "user": "U1", "text": "hi", "client_msg_id": client_msg_id, **event}
+    return {"type": "event_callback", "event_id": event_id, "event": event}
+
+
+def test_event_key_prefers_client_msg_id_and_ignores_other_events():
+    assert event_key(_body()) == "message:m-1"
+    assert event_key(_body(client_msg_id=None)) == "event:Ev1"
+    assert event_key(_body(event_type="app_mention")) == "app_mention:m-1"
+    assert event_key(_body(subtype="message_changed")) is None
+    assert event_key(_body(event_type="reaction_added")) is None
+    assert event_key({"type": "block_actions"}) is None
+
+
+def test_memory_store_forgets_after_ttl_and_beyond_capacity(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(event_dedup_module.time, "monotonic", lambda: now[0])
+    store = InMemoryEventStore(max_events=2, ttl=10)
+
+    assert store.claim("a") and not store.claim("a")
+    now[0] += 11
+    assert store.claim("a")
+
+    store.claim("b")
+    store.claim("c")
+    assert store.claim("a")
+
+
+def test_sqlite_store_is_shared_between_connections(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(event_dedup_module.time, "time", lambda: now[0])
+    path = str(tmp_path / "events.db")
+    first, second = SQLiteEventStore(path, ttl=10), SQLiteEventStore(path, ttl=10)
+
+    assert first.claim("message:m-1")
+    assert not second.claim("message:m-1")
+    now[0] += 11
+    assert second.claim("message:m-1")
+    assert not first.claim("message:m-1")
+
+
+def test_middleware_acknowledges_duplicates_without_running_listeners(monkeypatch):
+    monkeypatch.setattr(event_dedup_module, "event_store", InMemoryEventStore())
+    called = []
+
+    assert skip_duplicate_events(_body(), logger, lambda: called.append(True)) is None
+    # Slack's retry carries a new event_id for the same message
+    response = skip_duplicate_events(_body(event_id="Ev2"), logger, lambda: called.append(True))
+
+    assert response.status == 200
+    assert called == [True]
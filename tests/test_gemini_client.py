@@ -0,0 +1,20 @@
+"""
+Tests for the shared Gemini client
+"""
+import asyncio
+
+from ai import gemini_client
+from ai.gemini_client import get_gemini_client
+
+
+def test_one_client_per_loop(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(gemini_client, "_sync_client", None)
+
+    async def _twice():
+        return get_gemini_client(), get_gemini_client()
+
+    first, second = asyncio.run(_twice())
+    assert first is second
+    assert get_gemini_client() is get_gemini_client()
+    assert get_gemini_client() is not first
@@ -0,0 +1,94 @@
+"""
+Tests for token-budgeted history compaction
+"""
+import asyncio
+from types import SimpleNamespace
+
+from google.genai import types
+
+from ai.history_compaction import SUMMARY_PREFIX, HistoryCompactor, _parse_budgets, estimate_tokens, split_turns
+
+
+class _Models:
+    def __init__(self):
+        self.prompts = []
+
+    async def generate_content(self, model, config, contents):
+        self.prompts.append(contents[0].parts[0].text)
+        return SimpleNamespace(text=f"summary {len(self.prompts)}")
+
+
+def _client(models):
+    return SimpleNamespace(aio=SimpleNamespace(models=models))
+
+
+def _turn(i: int, size: int = 400):
+    return [
+        types.Content(role="user", parts=[types.Part(text=f"question {i} " + "x" * size)]),
+        types.Content(role="model", parts=[types.Part(
+            function_call=types.FunctionCall(id=f"c{i}", name="search_accounts", args={"name": f"Acme {i}"})
+        )]),
+        types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+            id=f"c{i}", name="search_accounts", response={"result": [{"Id": f"00{i}"}]}
+        ))]),
+        types.Content(role="model", parts=[types.Part(text=f"answer {i}")]),
+    ]
+
+
+def _history(turns: int):
+    return [content for i in range(turns) for content in _turn(i)]
+
+
+def test_history_within_budget_is_unchanged():
+    models = _Models()
+    history = _history(3)
+
+    compacted = asyncio.run(HistoryCompactor().compact("C1:1.0", history, "m", _client(models), budget=10_000))
+
+    assert compacted == history
+    assert models.prompts == []
+
+
+def test_older_turns_fold_into_summary_without_splitting_tool_rounds():
+    models = _Models()
+    history = _history(6)
+    budget = estimate_tokens(_history(2)) + 10
+
+    compacted = asyncio.run(
+        HistoryCompactor(summary_max_tokens=0).compact("C1:1.0", history, "m", _client(models), budget=budget)
+    )
+
+    assert compacted[0].parts[0].text == SUMMARY_PREFIX + "summary 1"
+    # The two newest turns are kept whole, function call and response together
+    assert compacted[1:] == history[-8:]
+    assert [len(turn) for turn in split_turns(compacted[1:])] == [4, 4]
+    assert "Tool result search_accounts" in models.prompts[0]
+    assert "question 3" in models.prompts[0] and "question 4" not in models.prompts[0]
+
+
+def test_summary_is_extended_with_only_newly_dropped_turns():
+    models = _Models()
+    compactor = HistoryCompactor(summary_max_tokens=0)
+    budget = estimate_tokens(_history(2)) + 10
+    asyncio.run(compactor.compact("C1:1.0", _history(4), "m", _client(models), budget=budget))
+
+    # One more turn later, only turn 2 falls out of the window
+    compacted = asyncio.run(compactor.compact("C1:1.0", _history(5), "m", _client(models), budget=budget))
+
+    assert len(models.prompts) == 2
+    assert "Existing summary:\nsummary 1" in models.prompts[1]
+    assert "question 2" in models.prompts[1] and "question 1" not in models.prompts[1]
+    assert compacted[0].parts[0].text == SUMMARY_PREFIX + "summary 2"
+    assert compacted[1:] == _history(5)[-8:]
+
+    # A turn that still fits reuses the summary without a model call
+    asyncio.run(compactor.compact("C1:1.0", _history(5), "m", _client(models), budget=budget))
+    assert len(models.prompts) == 2
+
+
+def test_budgets_are_per_model():
+    assert _parse_budgets("gemini-2.5-flash=16000, gemini-2.0-flash-exp=8000") == {
+        "gemini-2.5-flash": 16000,
+        "gemini-2.0-flash-exp": 8000,
+    }
+    assert _parse_budgets("") == {}
@@ -0,0 +1,168 @@
+"""
+Tests for the pooled MCP sessions
+"""
+import asyncio
+import threading
+import time
+
+import uvicorn
+from mcp.server.fastmcp import FastMCP
+from mcp.server.transport_security import TransportSecuritySettings
+
+from salesforce.mcp_client import MCPClient
+from salesforce.mcp_pool import MCPSessionPool, SessionUnavailable
+
+
+class FakeMCPClient:
+    """Stands in for MCPClient without spawning a server"""
+
+    spawned = 0
+
+    def __init__(self):
+        self.alive = False
+        self.calls = []
+
+    async def connect_to_server(self, server_script_path: str):
+        FakeMCPClient.spawned += 1
+        self.alive = True
+
+    async def call_tool(self, name, arguments=None):
+        self.calls.append(name)
+        return {"tool": name}
+
+    async def ping(self):
+        if not self.alive:
+            raise ConnectionError("server is gone")
+
+    async def cleanup(self):
+        self.alive = False
+
+
+def _make_pool(**kwargs) -> MCPSessionPool:
+    FakeMCPClient.spawned = 0
+    defaults = dict(server_path="fake.py", size=2, min_idle=0, client_factory=FakeMCPClient)
+    defaults.update(kwargs)
+    return MCPSessionPool(**defaults)
+
+
+def test_sessions_are_reused_across_turns():
+    pool = _make_pool()
+
+    async def turn():
+        async with pool.session() as session:
+            return await session.call_tool("get_accounts")
+
+    try:
+        for _ in range(3):
+            assert asyncio.run(turn()) == {"tool": "get_accounts"}
+        assert FakeMCPClient.spawned == 1
+        assert pool.stats()["live"] == 1
+    finally:
+        pool.close()
+
+
+def test_dead_session_is_respawned():
+    pool = _make_pool(health_check_interval=0.001)
+
+    async def kill_then_reuse():
+        async with pool.session() as session:
+            session._pooled.client.alive = False
+        await asyncio.sleep(0.01)
+        async with pool.session() as session:
+            return session._pooled.client.alive
+
+    try:
+        assert asyncio.run(kill_then_reuse()) is True
+        assert FakeMCPClient.spawned == 2
+        assert pool.stats()["live"] == 1
+    finally:
+        pool.close()
+
+
+def test_idle_sessions_are_reaped():
+    pool = _make_pool(idle_timeout=0.001)
+
+    async def turn_then_reap():
+        async with pool.session():
+            pass
+        await asyncio.sleep(0.01)
+        await pool._submit(pool._reap())
+
+    try:
+        asyncio.run(turn_then_reap())
+        assert pool.stats() == {"live": 0, "idle": 0, "size": 2}
+    finally:
+        pool.close()
+
+
+def test_acquire_timeout_raises_session_unavailable():
+    pool = _make_pool(size=1, acquire_timeout=0.05)
+
+    async def two_turns():
+        async with pool.session():
+            try:
+                async with pool.session():
+                    pass
+            except SessionUnavailable as e:
+                return e
+
+    try:
+        error = asyncio.run(two_turns())
+        assert isinstance(error, SessionUnavailable) and "No MCP session free" in str(error)
+    finally:
+        pool.close()
+
+
+def test_inprocess_session_lists_the_bundled_tools():
+    pool = MCPSessionPool(size=1, min_idle=0, transport="inprocess", client_factory=MCPClient)
+
+    async def turn():
+        async with pool.session() as session:
+            return session.server_id, await session.list_tools()
+
+    try:
+        server_id, tools = asyncio.run(turn())
+        assert server_id == "inprocess:Salesforce MCP Server"
+        assert {"get_accounts", "get_account_360", "create_accounts"} <= {tool.name for tool in tools.tools}
+    finally:
+        pool.close()
+
+
+def _serve_on_unix_socket(app, path: str) -> uvicorn.Server:
+    """Run an ASGI app on a unix socket from a background thread, like a shared MCP server"""
+    server = uvicorn.Server(uvicorn.Config(app, uds=path, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        assert time.monotonic() < deadline, "MCP server did not start"
+        time.sleep(0.01)
+    return server
+
+
+def test_http_session_calls_a_tool_on_a_shared_server(tmp_path):
+    shared = FastMCP("Echo")
+    # Tests dial the socket with Host: localhost
+    shared.settings.transport_security = TransportSecuritySettings(enable_dns_rebinding_protection=False)
+
+    @shared.tool()
+    def echo(text: str) -> str:
+        return text
+
+    path = str(tmp_path / "mcp.sock")
+    server = _serve_on_unix_socket(shared.streamable_http_app(), path)
+    pool = MCPSessionPool(
+        size=1, min_idle=0, transport="http", server_url="http://localhost/mcp", server_uds=path,
+        client_factory=MCPClient,
+    )
+
+    async def turn():
+        async with pool.session() as session:
+            return session.server_id, await session.call_tool("echo", {"text": "hi"})
+
+    try:
+        server_id, result = asyncio.run(turn())
+        assert server_id == f"http:http://localhost/mcp@{path}"
+        assert result.content[0].text == "hi"
+    finally:
+        pool.close()
+        server.should_exit = True
@@ -0,0 +1,202 @@
+"""
+Tests for the shared Slack rate limiter
+"""
+import asyncio
+import json
+
+from slack_bolt import App, Assistant, BoltRequest
+from slack_bolt.async_app import AsyncApp, AsyncAssistant
+from slack_bolt.authorization import AuthorizeResult
+from slack_bolt.request.async_request import AsyncBoltRequest
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.web.slack_response import SlackResponse
+
+import listeners.rate_limiter as rate_limiter_module
+from listeners.rate_limiter import (
+    AsyncRateLimitedWebClient,
+    RateLimitedWebClient,
+    SlackRateLimiter,
+    TokenBucket,
+    async_limit_slack_calls,
+    call_admitted,
+    limit_slack_calls,
+)
+
+
+def _response(status: int, headers: dict = None) -> SlackResponse:
+    return SlackResponse(
+        client=None, http_verb="POST", api_url="", req_args={}, data={"ok": status == 200},
+        headers=headers or {}, status_code=status,
+    )
+
+
+def test_interactive_calls_queue_up_and_status_updates_leave_them_headroom():
+    bucket = TokenBucket(per_minute=60, reserve=0.2)
+    assert (bucket.capacity, bucket.reserve) == (10, 2)
+
+    # Status updates stop while the reserve is all that is left
+    taken = [bucket.take(background=True)[0] for _ in range(10)]
+    assert taken == [True] * 8 + [False] * 2
+
+    # Interactive calls still go out right away, then are spaced at the refill rate
+    waits = [bucket.take()[1] for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert 0.9 < waits[2] < 1.1 and 1.9 < waits[3] < 2.1
+
+
+def test_retry_after_holds_back_the_whole_channel():
+    limiter = SlackRateLimiter(channel_rate=60)
+    limiter.block("chat.appendStream", "C1", 2.0)
+
+    taken, wait = limiter._take("chat.postMessage", "C1")
+    assert taken and 1.9 < wait < 2.1
+    # Other channels and tiers are unaffected
+    assert limiter._take("chat.postMessage", "C2") == (True, 0.0)
+    assert limiter._take("conversations.replies", "C1") == (True, 0.0)
+
+
+def test_client_retries_after_429(monkeypatch):
+    limiter = SlackRateLimiter()
+    monkeypatch.setattr(RateLimitedWebClient, "limiter", limiter)
+    monkeypatch.setattr(rate_limiter_module.time, "sleep", lambda seconds: None)
+    calls = []
+
+    def fake_api_call(self, api_method, **kwargs):
+        calls.append(api_method)
+        if len(calls) == 1:
+            raise SlackApiError("ratelimited", _response(429, {"Retry-After": "3"}))
+        return _response(200)
+
+    monkeypatch.setattr(WebClient, "api_call", fake_api_call)
+
+    response = RateLimitedWebClient(token="xoxb-test").chat_postMessage(channel="C1", text="hi")
+
+    assert response.status_code == 200
+    assert calls == ["chat.postMessage", "chat.postMessage"]
+    assert limiter.stats()["rate_limited"] == 1
+
+
+def test_async_client_waits_for_its_bucket(monkeypatch):
+    limiter = SlackRateLimiter(channel_rate=6)
+    monkeypatch.setattr(AsyncRateLimitedWebClient, "limiter", limiter)
+    slept = []
+
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+
+    async def fake_api_call(self, api_method, **kwargs):
+        return _response(200)
+
+    monkeypatch.setattr(rate_limiter_module.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(AsyncWebClient, "api_call", fake_api_call)
+    client = AsyncRateLimitedWebClient(token="xoxb-test")
+
+    async def _post_twice():
+        for _ in range(2):
+            await client.chat_postMessage(channel="C1", text="hi")
+
+    asyncio.run(_post_twice())
+
+    # One call per ten seconds with a bucket of one
+    assert len(slept) == 1 and 9.9 < slept[0] < 10.1
+
+
+def test_status_cancelled_while_its_bucket_is_empty_is_never_sent(monkeypatch):
+    limiter = SlackRateLimiter(channel_rate=60)
+    monkeypatch.setattr(RateLimitedWebClient, "limiter", limiter)
+    calls = []
+
+    def fake_api_call(self, api_method, **kwargs):
+        calls.append(api_method)
+        return _response(200)
+
+    monkeypatch.setattr(WebClient, "api_call", fake_api_call)
+    client = RateLimitedWebClient(token="xoxb-test")
+
+    async def _main():
+        # Admitted right away, and the client does not take a second token for it
+        await call_admitted("assistant.threads.setStatus", "C1", client.assistant_threads_setStatus,
+                            channel_id="C1", thread_ts="1.0", status="thinking...")
+        assert 8.9 < limiter._buckets[("channel", "C1")].tokens < 9.1
+        limiter.block("chat.appendStream", "C1", 2.0)
+        status = asyncio.ensure_future(call_admitted(
+            "assistant.threads.setStatus", "C1", client.assistant_threads_setStatus,
+            channel_id="C1", thread_ts="1.0", status="waiting in line (1 ahead)...",
+        ))
+        await asyncio.sleep(0.05)
+        status.cancel()
+        await asyncio.sleep(0.05)
+        return status
+
+    status = asyncio.run(_main())
+
+    assert status.cancelled()
+    assert calls == ["assistant.threads.setStatus"]
+    assert limiter.stats()["waited"] == 1
+
+
+def _assistant_message(event_id: str = "Ev1") -> str:
+    return json.dumps({
+        "type": "event_callback",
+        "event_id": event_id,
+        "team_id": "T1",
+        "api_app_id": "A1",
+        "event": {
+            "type": "message", "channel_type": "im", "channel": "D1", "user": "U1",
+            "text": "hi", "ts": "1700000000.000200", "thread_ts": "1700000000.000100",
+        },
+    })
+
+
+def _authorize(**kwargs):
+    return AuthorizeResult(enterprise_id=None, team_id="T1", bot_token="xoxb-test", bot_user_id="UB")
+
+
+def test_assistant_utilities_go_through_the_rate_limiter():
+    app = App(authorize=_authorize, request_verification_enabled=False, process_before_response=True)
+    app.use(limit_slack_calls)
+    assistant = Assistant()
+    seen = {}
+
+    @assistant.user_message
+    def handle(client, say, set_status, set_title, set_suggested_prompts, get_thread_context):
+        seen.update(
+            client=client, say=say.client, set_status=set_status.client, set_title=set_title.client,
+            set_suggested_prompts=set_suggested_prompts.client, store=get_thread_context.thread_context_store.client,
+        )
+
+    app.assistant(assistant)
+    response = app.dispatch(BoltRequest(body=_assistant_message(), headers={"content-type": ["application/json"]}))
+
+    assert response.status == 200
+    assert set(seen) == {"client", "say", "set_status", "set_title", "set_suggested_prompts", "store"}
+    assert all(isinstance(client, RateLimitedWebClient) for client in seen.values())
+
+
+def test_async_assistant_utilities_go_through_the_rate_limiter():
+    async def _authorize_async(**kwargs):
+        return _authorize()
+
+    app = AsyncApp(authorize=_authorize_async, request_verification_enabled=False, process_before_response=True)
+    app.use(async_limit_slack_calls)
+    assistant = AsyncAssistant()
+    seen = {}
+
+    @assistant.user_message
+    async def handle(client, say, set_status):
+        seen.update(client=client, say=say.client, set_status=set_status.client)
+
+    app.assistant(assistant)
+
+    async def _dispatch():
+        return await app.async_dispatch(
+            AsyncBoltRequest(body=_assistant_message(), headers={"content-type": ["application/json"]})
+        )
+
+    response = asyncio.run(_dispatch())
+
+    assert response.status == 200
+    assert len(seen) == 3
+    assert all(isinstance(client, AsyncRateLimitedWebClient) for client in seen.values())
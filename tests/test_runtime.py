@@ -0,0 +1,77 @@
+"""
+Tests for the long-lived agent runtime
+"""
+import asyncio
+import importlib
+
+import pytest
+from slack_bolt import BoltContext
+
+from ai.runtime import AgentRuntime
+
+
+def test_turns_share_one_loop_and_drain_on_shutdown():
+    runtime = AgentRuntime(name="test-runtime")
+    runtime.start()
+    closed = []
+
+    async def _turn(delay):
+        await asyncio.sleep(delay)
+        return asyncio.get_running_loop()
+
+    async def _close():
+        closed.append(runtime.in_flight())
+
+    runtime.add_shutdown_hook(_close)
+    first = runtime.run(_turn(0))
+    slow = runtime.submit(_turn(0.2))
+    assert runtime.run(_turn(0)) is first
+
+    runtime.shutdown(timeout=5)
+
+    # The slow turn finished before resources were closed
+    assert slow.result() is first
+    assert closed == [0]
+    assert first.is_closed()
+    with pytest.raises(RuntimeError):
+        runtime.submit(_turn(0))
+
+
+def test_shutdown_cancels_turns_past_the_drain_timeout():
+    runtime = AgentRuntime(name="test-runtime")
+    runtime.start()
+
+    stuck = runtime.submit(asyncio.sleep(10))
+    runtime.shutdown(timeout=0.1)
+
+    assert stuck.cancelled()
+
+
+class _Runtime:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, coro):
+        self.submitted.append(coro)
+        coro.close()
+
+
+def test_message_listener_returns_without_calling_slack(monkeypatch):
+    # The package re-exports the listener function under the module's name
+    message_module = importlib.import_module("listeners.assistant.message")
+    runtime = _Runtime()
+    monkeypatch.setattr(message_module, "get_runtime", lambda: runtime)
+    slack_calls = []
+
+    message_module.message(
+        client=None,
+        context=BoltContext({"team_id": "T1", "user_id": "U1", "bot_id": "B1"}),
+        logger=None,
+        payload={"channel": "D1", "ts": "1.0", "text": "hi"},
+        say=lambda *args, **kwargs: slack_calls.append("say"),
+        set_status=lambda **kwargs: slack_calls.append("set_status"),
+    )
+
+    # The status update and the turn are queued on the runtime, Bolt's thread made no Slack call
+    assert slack_calls == []
+    assert len(runtime.submitted) == 1
@@ -3,7 +3,8 @@ Test script for Salesforce client_credentials authentication
 """
 import os
 from dotenv import load_dotenv
-from salesforce.client import SalesforceClient
+import salesforce.token_manager as token_manager
+from salesforce.client import SalesforceClient, create_session
 
 # Load environment variables
 load_dotenv()
@@ -61,5 +62,155 @@ def test_client_credentials():
     print("=" * 60)
 
 
+class FakeResponse:
+    def __init__(self, payload: dict, status_code: int = 200):
+        self.payload = payload
+        self.status_code = status_code
+        self.content = b"{}"
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """Records requests instead of sending them, answers 401 INVALID_SESSION_ID to expired tokens"""
+
+    def __init__(self, expired=()):
+        self.calls = []
+        self.expired = set(expired)
+        self.logins = 0
+
+    def post(self, url, **kwargs):
+        self.calls.append(("POST", url, kwargs))
+        self.logins += 1
+        token = "00Dtoken" if self.logins == 1 else f"00Dtoken{self.logins}"
+        return FakeResponse({"access_token": token, "instance_url": "https://acme.my.salesforce.com"})
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        if kwargs["headers"]["Authorization"].split()[-1] in self.expired:
+            return FakeResponse([{"errorCode": "INVALID_SESSION_ID", "message": "Session expired or invalid"}], 401)
+        return FakeResponse({"records": [{"Id": "001A"}]})
+
+
+def test_requests_share_the_pooled_session_with_timeouts(monkeypatch, tmp_path):
+    monkeypatch.setattr(token_manager, "SALESFORCE_TOKEN_CACHE_PATH", str(tmp_path / "token.json"))
+    monkeypatch.setenv("SALESFORCE_CLIENT_ID", "id")
+    monkeypatch.setenv("SALESFORCE_CLIENT_SECRET", "secret")
+    session = FakeSession()
+    client = SalesforceClient(session=session)
+
+    assert client.get_accounts(limit=1) == [{"Id": "001A"}]
+    assert client.get_account_contacts("001A") == [{"Id": "001A"}]
+
+    assert [call[0] for call in session.calls] == ["POST", "GET", "GET"]
+    assert all(call[2]["timeout"] == client.timeout for call in session.calls)
+
+
+def test_invalid_session_is_retried_once_with_a_new_token(monkeypatch, tmp_path):
+    monkeypatch.setattr(token_manager, "SALESFORCE_TOKEN_CACHE_PATH", str(tmp_path / "token.json"))
+    monkeypatch.setenv("SALESFORCE_CLIENT_ID", "id")
+    monkeypatch.setenv("SALESFORCE_CLIENT_SECRET", "secret")
+    session = FakeSession(expired={"00Dtoken"})
+    client = SalesforceClient(session=session)
+
+    assert client.get_accounts(limit=1) == [{"Id": "001A"}]
+
+    assert [call[0] for call in session.calls] == ["POST", "GET", "POST", "GET"]
+    assert client.access_token == "00Dtoken2"
+
+
+class CompositeSession(FakeSession):
+    """Answers /composite with the given subrequest responses"""
+
+    def __init__(self, parts):
+        super().__init__()
+        self.parts = parts
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return FakeResponse({"compositeResponse": self.parts})
+
+
+def _part(ref, body, status=200):
+    return {"referenceId": ref, "body": body, "httpStatusCode": status}
+
+
+def test_account_360_is_one_composite_request(monkeypatch, tmp_path):
+    monkeypatch.setattr(token_manager, "SALESFORCE_TOKEN_CACHE_PATH", str(tmp_path / "token.json"))
+    monkeypatch.setenv("SALESFORCE_CLIENT_ID", "id")
+    monkeypatch.setenv("SALESFORCE_CLIENT_SECRET", "secret")
+    session = CompositeSession([
+        _part("account", {"records": [{"Id": "001A", "Name": "Acme"}, {"Id": "001B", "Name": "Acme Labs"}]}),
+        _part("contacts", {"records": [{"Id": "003A", "Name": "Ada"}]}),
+        _part("opportunities", [{"errorCode": "INVALID_FIELD", "message": "No such column"}], 400),
+    ])
+    client = SalesforceClient(session=session)
+
+    result = client.get_account_360("O'Brien & Acme", contact_limit=5)
+
+    method, url, kwargs = session.calls[-1]
+    assert (method, url.rsplit("/", 1)[-1]) == ("POST", "composite")
+    subrequests = kwargs["json"]["compositeRequest"]
+    assert [r["referenceId"] for r in subrequests] == ["account", "contacts", "opportunities"]
+    assert "O%5C%27Brien" in subrequests[0]["url"]
+    assert "@{account.records[0].Id}" in subrequests[1]["url"] and "LIMIT%205" in subrequests[1]["url"]
+
+    assert result["account"] == {"Id": "001A", "Name": "Acme"}
+    assert result["other_matches"] == [{"Id": "001B", "Name": "Acme Labs"}]
+    assert result["contacts"] == [{"Id": "003A", "Name": "Ada"}]
+    assert result["opportunities"] == [] and result["errors"]["opportunities"][0]["errorCode"] == "INVALID_FIELD"
+
+
+def test_account_360_without_a_match_is_empty(monkeypatch, tmp_path):
+    monkeypatch.setattr(token_manager, "SALESFORCE_TOKEN_CACHE_PATH", str(tmp_path / "token.json"))
+    monkeypatch.setenv("SALESFORCE_CLIENT_ID", "id")
+    monkeypatch.setenv("SALESFORCE_CLIENT_SECRET", "secret")
+    halted = [{"errorCode": "PROCESSING_HALTED", "message": "Invalid reference specified"}]
+    session = CompositeSession([
+        _part("account", {"totalSize": 0, "records": []}),
+        _part("contacts", halted, 400),
+        _part("opportunities", halted, 400),
+    ])
+
+    result = SalesforceClient(session=session).get_account_360("001XXXXXXXXXXXXXXX")
+
+    assert "WHERE%20Id%20%3D%20%27001XXXXXXXXXXXXXXX%27" in session.calls[-1][2]["json"]["compositeRequest"][0]["url"]
+    assert result == {"account": None, "other_matches": [], "contacts": [], "opportunities": []}
+
+
+class CollectionSession(FakeSession):
+    """Answers sObject Collections deletes with a success per ID"""
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return FakeResponse([{"id": i, "success": True, "errors": []} for i in kwargs["params"]["ids"].split(",")])
+
+
+def test_bulk_deletes_are_chunked(monkeypatch, tmp_path):
+    monkeypatch.setattr(token_manager, "SALESFORCE_TOKEN_CACHE_PATH", str(tmp_path / "token.json"))
+    monkeypatch.setenv("SALESFORCE_CLIENT_ID", "id")
+    monkeypatch.setenv("SALESFORCE_CLIENT_SECRET", "secret")
+    session = CollectionSession()
+    ids = [f"001{i:015d}" for i in range(201)]
+
+    results = SalesforceClient(session=session).delete_accounts(ids)
+
+    deletes = [call for call in session.calls if call[0] == "DELETE"]
+    assert [len(call[2]["params"]["ids"].split(",")) for call in deletes] == [200, 1]
+    assert deletes[0][2]["params"]["allOrNone"] == "false"
+    assert [r["id"] for r in results] == ids
+
+
+def test_default_session_keeps_connections_alive():
+    session = create_session(pool_size=7)
+
+    assert session.get_adapter("https://acme.my.salesforce.com")._pool_maxsize == 7
+    assert "gzip" in session.headers["Accept-Encoding"]
+
+
 if __name__ == "__main__":
     test_client_credentials()
@@ -0,0 +1,144 @@
+"""
+Tests for turn admission control
+"""
+import asyncio
+import time
+
+import pytest
+
+from ai.scheduler import TurnRejected, TurnScheduler
+
+
+def _recorder(log, name, delay=0.05):
+    async def _turn():
+        log.append(("start", name))
+        await asyncio.sleep(delay)
+        log.append(("end", name))
+        return name
+    return _turn
+
+
+def test_turns_in_one_thread_run_one_after_another():
+    scheduler = TurnScheduler(max_concurrent=4, max_per_user=4)
+    log = []
+
+    async def _main():
+        return await asyncio.gather(
+            scheduler.run("C1:1", "U1", _recorder(log, "first")),
+            scheduler.run("C1:1", "U2", _recorder(log, "second")),
+            scheduler.run("C1:2", "U3", _recorder(log, "other thread")),
+        )
+
+    assert asyncio.run(_main()) == ["first", "second", "other thread"]
+    # The other thread ran alongside the first turn, the second turn waited for it
+    assert log.index(("start", "other thread")) < log.index(("end", "first"))
+    assert log.index(("end", "first")) < log.index(("start", "second"))
+    assert scheduler.stats()["running"] == 0
+
+
+def test_free_slots_alternate_between_users():
+    scheduler = TurnScheduler(max_concurrent=1, max_per_user=1)
+    log = []
+
+    async def _main():
+        turns = [scheduler.run(f"C1:{i}", "heavy", _recorder(log, f"heavy-{i}", 0.01)) for i in range(3)]
+        turns.append(scheduler.run("C2:1", "light", _recorder(log, "light", 0.01)))
+        await asyncio.gather(*turns)
+
+    asyncio.run(_main())
+    started = [name for event, name in log if event == "start"]
+    # The light user's turn does not wait behind all of the heavy user's turns
+    assert started == ["heavy-0", "light", "heavy-1", "heavy-2"]
+
+
+def test_full_queue_rejects_and_reports_position():
+    scheduler = TurnScheduler(max_concurrent=1, max_per_user=1, max_queued=1)
+    positions = []
+
+    async def _main():
+        first = asyncio.ensure_future(scheduler.run("C1:1", "U1", _recorder([], "a")))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(scheduler.run("C1:2", "U2", _recorder([], "b"), on_queued=positions.append))
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queued"] == 1
+        with pytest.raises(TurnRejected):
+            await scheduler.run("C1:3", "U3", _recorder([], "c"))
+        await asyncio.gather(first, second)
+
+    asyncio.run(_main())
+    assert positions == [0]
+    assert scheduler.stats()["rejected"] == 1
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    scheduler = TurnScheduler(max_concurrent=1, max_per_user=1)
+
+    async def _main():
+        first = asyncio.ensure_future(scheduler.run("C1:1", "U1", _recorder([], "a")))
+        await asyncio.sleep(0)
+        waiting = asyncio.ensure_future(scheduler.run("C1:2", "U2", _recorder([], "b")))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await first
+        assert await scheduler.run("C1:3", "U3", _recorder([], "c")) == "c"
+
+    asyncio.run(_main())
+    stats = scheduler.stats()
+    assert stats["queued"] == 0 and stats["running"] == 0
+
+
+def test_queue_time_is_reported_apart_from_run_time():
+    scheduler = TurnScheduler(max_concurrent=1, max_per_user=1)
+
+    async def _main():
+        received_at = time.monotonic()
+        await asyncio.gather(
+            scheduler.run("C1:1", "U1", _recorder([], "a", 0.1), received_at=received_at),
+            scheduler.run("C1:2", "U2", _recorder([], "b", 0.1), received_at=received_at),
+        )
+
+    asyncio.run(_main())
+    stats = scheduler.stats()
+    # The second turn queued behind the first, both ran for about as long
+    assert stats["queue_seconds"]["max"] >= 0.1
+    assert 0.1 <= stats["run_seconds"]["p50"] < 0.2
+
+
+def test_drain_waits_for_turns_but_not_other_tasks():
+    scheduler = TurnScheduler()
+
+    async def _main():
+        # Stands in for an MCP transport task that lives until its session is closed
+        transport = asyncio.ensure_future(asyncio.Event().wait())
+        turn = asyncio.ensure_future(scheduler.run("C1:1", "U1", _recorder([], "a", 0.1)))
+        await asyncio.sleep(0)
+        started = time.monotonic()
+        await scheduler.drain(timeout=5)
+        elapsed = time.monotonic() - started
+        assert turn.done() and turn.result() == "a"
+        assert not transport.done()
+        transport.cancel()
+        return elapsed
+
+    assert asyncio.run(_main()) < 1
+
+
+def test_queued_status_does_not_hold_back_the_turn():
+    scheduler = TurnScheduler(max_concurrent=1, max_per_user=1)
+    statuses = []
+
+    async def _slow_status(ahead):
+        # Stands in for a status update the rate limiter holds back
+        statuses.append(ahead)
+        await asyncio.sleep(5)
+
+    async def _main():
+        first = asyncio.ensure_future(scheduler.run("C1:1", "U1", _recorder([], "a", 0.05)))
+        await asyncio.sleep(0)
+        started = time.monotonic()
+        await scheduler.run("C1:2", "U2", _recorder([], "b", 0.05), on_queued=_slow_status)
+        await first
+        return time.monotonic() - started
+
+    assert asyncio.run(_main()) < 1
+    assert statuses == [0]
@@ -0,0 +1,113 @@
+"""
+Tests for the coalescing Slack stream writer
+"""
+import asyncio
+import logging
+
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_chat_stream import AsyncChatStream
+from slack_sdk.web.chat_stream import ChatStream
+from slack_sdk.web.slack_response import SlackResponse
+
+from listeners.stream_writer import SlackStreamWriter
+
+logger = logging.getLogger(__name__)
+
+
+def _response(data: dict, status: int = 200, headers: dict = None) -> SlackResponse:
+    return SlackResponse(
+        client=None, http_verb="POST", api_url="", req_args={}, data=data, headers=headers or {}, status_code=status
+    )
+
+
+class _Client:
+    """Records stream calls, answers 429 to the appends listed in rate_limit"""
+
+    def __init__(self, rate_limit=()):
+        self.calls = []
+        self.rate_limit = set(rate_limit)
+
+    def _record(self, method, kwargs):
+        self.calls.append((method, kwargs.get("markdown_text"), kwargs.get("blocks")))
+        if len(self.calls) in self.rate_limit:
+            raise SlackApiError("ratelimited", _response({"ok": False}, 429, {"Retry-After": "0.05"}))
+        return _response({"ok": True, "ts": "2.0"})
+
+    def chat_startStream(self, **kwargs):
+        return self._record("start", kwargs)
+
+    def chat_appendStream(self, **kwargs):
+        return self._record("append", kwargs)
+
+    def chat_stopStream(self, **kwargs):
+        return self._record("stop", kwargs)
+
+
+class _AsyncClient(_Client):
+    async def chat_startStream(self, **kwargs):
+        return self._record("start", kwargs)
+
+    async def chat_appendStream(self, **kwargs):
+        return self._record("append", kwargs)
+
+    async def chat_stopStream(self, **kwargs):
+        return self._record("stop", kwargs)
+
+
+def _stream(cls, client):
+    return cls(client, channel="C1", logger=logger, thread_ts="1.0", buffer_size=1)
+
+
+def _sent_text(client) -> str:
+    return "".join(text or "" for method, text, _ in client.calls if method in ("start", "append", "stop"))
+
+
+async def _write(writer, deltas, pause=0.0):
+    for delta in deltas:
+        await writer.append(delta)
+        await asyncio.sleep(pause)
+    return await writer.stop(blocks=[{"type": "divider"}])
+
+
+def test_small_deltas_are_coalesced():
+    client = _AsyncClient()
+    writer = SlackStreamWriter(_stream(AsyncChatStream, client), max_chars=200, max_delay=0.05, min_interval=0.02)
+    deltas = ["word " for _ in range(100)]
+
+    asyncio.run(_write(writer, deltas, pause=0.001))
+
+    assert _sent_text(client) == "".join(deltas)
+    assert len(client.calls) < 10
+    assert client.calls[-1] == ("stop", client.calls[-1][1], [{"type": "divider"}])
+
+
+def test_batches_end_at_paragraph_breaks():
+    client = _AsyncClient()
+    writer = SlackStreamWriter(_stream(AsyncChatStream, client), max_chars=1000, max_delay=5, min_interval=0)
+
+    async def _run():
+        await writer.append("First paragraph.\n\nSecond ")
+        await asyncio.sleep(0.05)
+        await writer.append("paragraph.")
+        return await writer.stop()
+
+    asyncio.run(_run())
+
+    assert client.calls[0][:2] == ("start", "First paragraph.\n\n")
+    assert client.calls[1][:2] == ("stop", "Second paragraph.")
+
+
+def test_rate_limited_text_is_sent_once_after_retry_after():
+    # The first append after the stream started gets a 429
+    client = _Client(rate_limit={2})
+    writer = SlackStreamWriter(_stream(ChatStream, client), max_chars=10, max_delay=0.01, min_interval=0)
+    deltas = ["0123456789"] * 5
+
+    response = asyncio.run(_write(writer, deltas, pause=0.01))
+
+    assert response["ok"]
+    assert writer.rate_limited == 1
+    rate_limited_text = client.calls[1][1]
+    # Everything arrives exactly once, the rejected batch is resent ahead of newer text
+    assert _sent_text(client) == "".join(deltas) + rate_limited_text
+    assert client.calls[2][1].startswith(rate_limited_text)
@@ -0,0 +1,122 @@
+"""
+Tests for the incremental thread history store
+"""
+import listeners.thread_history as thread_history_module
+from listeners.thread_history import ThreadHistoryStore, build_history, fetch_thread, load_thread
+
+
+class PagedClient:
+    """conversations_replies over several cursor pages"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def conversations_replies(self, channel, ts, inclusive, limit, cursor=None):
+        self.calls.append(cursor)
+        index = int(cursor or 0)
+        next_cursor = str(index + 1) if index + 1 < len(self.pages) else ""
+        return {"messages": self.pages[index], "response_metadata": {"next_cursor": next_cursor}}
+
+
+def _msg(ts, text, bot=False):
+    msg = {"ts": ts, "text": text}
+    msg["bot_id" if bot else "user"] = "B1" if bot else "U1"
+    return msg
+
+
+def test_fetch_follows_cursors():
+    client = PagedClient([[_msg("1.0", "a")], [_msg("2.0", "b")], [_msg("3.0", "c")]])
+
+    messages = fetch_thread(client, "C1", "1.0")
+
+    assert [m["text"] for m in messages] == ["a", "b", "c"]
+    assert client.calls == [None, "1", "2"]
+
+
+def test_events_update_cached_threads_only():
+    store = ThreadHistoryStore(max_threads=2, max_messages=3)
+    store.add("C1", "1.0", _msg("1.0", "ignored, not cached yet"))
+    assert store.get("C1", "1.0") is None
+
+    store.seed("C1", "1.0", [_msg("1.0", "hi")])
+    store.add("C1", "1.0", _msg("3.0", "third"))
+    store.add("C1", "1.0", _msg("2.0", "second", bot=True))
+    store.add("C1", "1.0", _msg("2.0", "duplicate"))
+    assert [m["text"] for m in store.get("C1", "1.0")] == ["hi", "second", "third"]
+
+    # Oldest messages are trimmed, least recently used threads evicted
+    store.add("C1", "1.0", _msg("4.0", "fourth"))
+    assert [m["text"] for m in store.get("C1", "1.0")] == ["second", "third", "fourth"]
+    store.seed("C2", "1.0", [])
+    store.get("C1", "1.0")
+    store.seed("C3", "1.0", [])
+    assert store.get("C2", "1.0") is None
+    assert store.get("C1", "1.0") is not None
+
+
+def test_history_stops_at_the_message_being_answered():
+    messages = [
+        _msg("1.0", "first question"),
+        _msg("2.0", "second question"),
+        # The answer to the first question was posted after the second question arrived
+        _msg("2.5", "first answer", bot=True),
+        _msg("3.0", "third question"),
+    ]
+
+    history, query = build_history(messages, "2.0")
+
+    assert query == "second question"
+    assert [(c.role, c.parts[0].text) for c in history] == [("user", "first question"), ("model", "first answer")]
+    assert build_history(messages)[1] == "third question"
+
+
+def test_history_since_keeps_only_later_user_messages():
+    messages = [
+        _msg("1.0", "first question"),
+        _msg("1.5", "first answer", bot=True),
+        _msg("2.0", "someone else chimes in"),
+        _msg("3.0", "second question"),
+    ]
+
+    history, query = build_history(messages, "3.0", since_ts="1.0")
+
+    assert query == "second question"
+    assert [(c.role, c.parts[0].text) for c in history] == [("user", "someone else chimes in")]
+
+
+class ThreadClient:
+    """conversations_replies over a fixed thread, honoring oldest"""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.calls = []
+
+    def conversations_replies(self, channel, ts, inclusive, limit, cursor=None, oldest=None):
+        self.calls.append(oldest)
+        # The parent message always comes back, like Slack
+        found = [m for m in self.messages if m["ts"] == ts or oldest is None or float(m["ts"]) >= float(oldest)]
+        return {"messages": found, "response_metadata": {"next_cursor": ""}}
+
+
+def test_mention_catches_a_warm_thread_up_with_other_peoples_messages(monkeypatch):
+    store = ThreadHistoryStore()
+    monkeypatch.setattr(thread_history_module, "thread_history", store)
+    thread = [_msg("1.0", "@bot who owns Acme?")]
+    client = ThreadClient(thread)
+    load_thread(client, "C1", "1.0")
+
+    # The bot's reply and the next mention reach the cache, the third-party message does not
+    store.add("C1", "1.0", _msg("1.5", "Jane owns Acme.", bot=True))
+    other = {"ts": "2.0", "user": "U2", "text": "Jane moved teams last week"}
+    mention = _msg("3.0", "@bot who owns it now?")
+    thread.extend([_msg("1.5", "Jane owns Acme.", bot=True), other, mention])
+    store.add("C1", "1.0", mention)
+
+    assert "Jane moved teams last week" not in [m["text"] for m in load_thread(client, "C1", "1.0")]
+    messages = load_thread(client, "C1", "1.0", catch_up=True)
+
+    assert [m["ts"] for m in messages] == ["1.0", "1.5", "2.0", "3.0"]
+    # Only messages from the last read on were asked for
+    assert client.calls == [None, "1.0"]
+    assert store.synced_ts("C1", "1.0") == "3.0"
@@ -0,0 +1,115 @@
+"""
+Tests for the shared Salesforce token cache
+"""
+import os
+import threading
+import time
+
+import salesforce.token_manager as token_manager_module
+from salesforce.token_manager import TokenManager, default_cache_path
+
+
+class FakeLogin:
+    """Token endpoint handing out numbered tokens"""
+
+    def __init__(self, delay: float = 0.0, lifetime: float = 7200):
+        self.delay = delay
+        self.lifetime = lifetime
+        self.count = 0
+
+    def __call__(self):
+        time.sleep(self.delay)
+        self.count += 1
+        return {
+            "access_token": f"token-{self.count}",
+            "instance_url": "https://acme.my.salesforce.com",
+            "issued_at": str(int(time.time() * 1000)),
+            "expires_in": self.lifetime,
+        }
+
+
+def test_processes_share_one_token_through_the_cache_file(tmp_path):
+    path = str(tmp_path / "token.json")
+    login = FakeLogin()
+
+    first = TokenManager(login, cache_path=path).get()
+    # A new process starts with an empty memory cache
+    second = TokenManager(login, cache_path=path).get()
+
+    assert first["access_token"] == second["access_token"] == "token-1"
+    assert login.count == 1
+
+
+def test_concurrent_callers_refresh_once(tmp_path):
+    login = FakeLogin(delay=0.05)
+    manager = TokenManager(login, cache_path=str(tmp_path / "token.json"))
+    tokens = []
+
+    threads = [threading.Thread(target=lambda: tokens.append(manager.get()["access_token"])) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert tokens == ["token-1"] * 8
+    assert login.count == 1
+
+
+def test_token_is_replaced_ahead_of_expiry_and_rejected_ones_once(tmp_path, monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(token_manager_module.time, "time", lambda: now[0])
+    login = FakeLogin(lifetime=600)
+    manager = TokenManager(login, cache_path=str(tmp_path / "token.json"), refresh_margin=300)
+
+    assert manager.get()["access_token"] == "token-1"
+    now[0] += 200
+    assert manager.get()["access_token"] == "token-1"
+    # Inside the refresh margin but not expired yet
+    now[0] += 200
+    assert manager.get()["access_token"] == "token-2"
+
+    # Two callers saw token-2 rejected, only the first logs in again
+    assert manager.refresh(stale="token-2")["access_token"] == "token-3"
+    assert manager.refresh(stale="token-2")["access_token"] == "token-3"
+    assert login.count == 3
+
+
+def test_failed_proactive_refresh_keeps_the_current_token(tmp_path, monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(token_manager_module.time, "time", lambda: now[0])
+    login = FakeLogin(lifetime=600)
+    manager = TokenManager(login, refresh_margin=300)
+    manager.get()
+
+    def _down():
+        raise ConnectionError("login.salesforce.com unreachable")
+
+    manager._fetch = _down
+    now[0] += 400
+
+    assert manager.get()["access_token"] == "token-1"
+
+
+def test_token_files_are_private_and_others_are_ignored(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    path = default_cache_path("id", "https://acme.my.salesforce.com/services/oauth2/token")
+    assert os.path.dirname(path) == str(tmp_path / "cache" / "salesforce-bot")
+    assert os.stat(os.path.dirname(path)).st_mode & 0o777 == 0o700
+
+    # A planted file readable by others is not trusted, however long it claims to live
+    with open(path, "w") as f:
+        f.write('{"access_token": "planted", "instance_url": "https://evil.example", "expires_at": 9999999999}')
+    os.chmod(path, 0o644)
+    login = FakeLogin()
+
+    assert TokenManager(login, cache_path=path).get()["access_token"] == "token-1"
+    assert os.stat(path).st_mode & 0o777 == 0o600
+
+
+def test_lock_file_symlinks_are_not_followed(tmp_path):
+    path = str(tmp_path / "token.json")
+    target = tmp_path / "elsewhere"
+    os.symlink(target, f"{path}.lock")
+
+    assert TokenManager(FakeLogin(), cache_path=path).get()["access_token"] == "token-1"
+    assert not target.exists()
@@ -0,0 +1,48 @@
+"""
+Tests for the cached Gemini tool declarations
+"""
+import asyncio
+from types import SimpleNamespace
+
+from ai.tools import ToolDeclarationCache, sanitize_schema
+
+
+class FakeSession:
+    def __init__(self, tools):
+        self.server_id = "stdio:fake"
+        self.tools = tools
+        self.list_calls = 0
+
+    async def list_tools(self):
+        self.list_calls += 1
+        return SimpleNamespace(tools=self.tools)
+
+
+def _tool(name, schema=None):
+    return SimpleNamespace(name=name, description=f"{name} tool", inputSchema=schema or {"type": "object"})
+
+
+def test_sanitize_schema_drops_unsupported_keys():
+    schema = {"type": "object", "additionalProperties": False, "properties": {"a": {"type": "string", "default": "x"}}}
+    assert sanitize_schema(schema) == {"type": "object", "properties": {"a": {"type": "string"}}}
+
+
+def test_config_is_reused_until_tools_change():
+    cache = ToolDeclarationCache()
+    session = FakeSession([_tool("get_accounts")])
+
+    first = asyncio.run(cache.get_config(session))
+    second = asyncio.run(cache.get_config(session))
+    assert first is second
+    assert session.list_calls == 1
+
+    # Same tool list after a list_changed notification keeps the built config
+    cache.invalidate(session.server_id)
+    assert asyncio.run(cache.get_config(session)) is first
+    assert session.list_calls == 2
+
+    session.tools = [_tool("get_accounts"), _tool("get_account_contacts")]
+    cache.invalidate(session.server_id)
+    changed = asyncio.run(cache.get_config(session))
+    assert changed is not first
+    assert len(changed.tools[0].function_declarations) == 2